@@ -1,5 +1,5 @@
 "use client";
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import Navbar from '../components/Navbar';
 import { useCart } from '../context/CartContext';
 import { useRouter } from 'next/navigation';
@@ -19,6 +19,9 @@ export default function Checkout() {
     instructions: ''
   });
 
+  // 👇 One key per checkout attempt: retrying the same order can never create a duplicate
+  const idempotencyKey = useRef<string>(crypto.randomUUID());
+
   // Calculate Total
   const totalPrice = cart.reduce((sum, item) => sum + (item.price * item.quantity), 0);
 
@@ -31,6 +34,7 @@ export default function Checkout() {
   // Handle Typing in the Form
   const handleChange = (e: React.ChangeEvent<HTMLInputElement | HTMLTextAreaElement>) => {
     setFormData({ ...formData, [e.target.name]: e.target.value });
+    idempotencyKey.current = crypto.randomUUID();
   };
 
   const handlePlaceOrder = async (e: React.FormEvent) => {
@@ -57,7 +61,10 @@ export default function Checkout() {
       };
 
       await axios.post('https://bua-backend.onrender.com/api/orders/create/', orderData, {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: {
+          Authorization: `Bearer ${token}`,
+          'Idempotency-Key': idempotencyKey.current
+        }
       });
 
       alert("Logistics Request Confirmed! 🚚");
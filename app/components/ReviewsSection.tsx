@@ -1,5 +1,5 @@
 "use client";
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import axios from 'axios';
 import { useRouter } from 'next/navigation';
 
@@ -12,16 +12,40 @@ interface Review {
 }
 
 interface Props {
-  reviews: Review[];
   productId: number;
+  reviewCount: number;
 }
 
-export default function ReviewsSection({ reviews, productId }: Props) {
+export default function ReviewsSection({ productId, reviewCount }: Props) {
   const router = useRouter();
+  const [reviews, setReviews] = useState<Review[]>([]);
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [rating, setRating] = useState(5);
   const [comment, setComment] = useState('');
   const [submitting, setSubmitting] = useState(false);
 
+  // 👇 Reviews come a page at a time (newest first), not inside the product payload
+  useEffect(() => {
+    axios.get(`https://bua-backend.onrender.com/api/products/${productId}/reviews/`)
+        .then(res => {
+            setReviews(res.data.results);
+            setNextPage(res.data.next);
+        })
+        .catch(err => console.error(err));
+  }, [productId]);
+
+  const loadMore = async () => {
+    if (!nextPage) return;
+    setLoadingMore(true);
+    try {
+        const res = await axios.get(nextPage);
+        setReviews(prev => [...prev, ...res.data.results]);
+        setNextPage(res.data.next);
+    } catch (err) { console.error(err); }
+    finally { setLoadingMore(false); }
+  };
+
   // Check if user is logged in (client-side only)
   const isLoggedIn = typeof window !== 'undefined' && localStorage.getItem('access_token');
 
@@ -37,7 +61,7 @@ export default function ReviewsSection({ reviews, productId }: Props) {
     const token = localStorage.getItem('access_token');
 
     try {
-      await axios.post('https://bua-backend.onrender.com/api/reviews/create/', 
+      await axios.post('https://bua-backend.onrender.com/api/products/reviews/create/', 
         {
           product_id: productId,
           rating: rating,
@@ -60,7 +84,7 @@ export default function ReviewsSection({ reviews, productId }: Props) {
   return (
     <div className="bg-white p-6 rounded-xl shadow-sm border border-gray-100 mt-6">
       <h3 className="text-xl font-bold text-gray-900 mb-6 flex items-center gap-2">
-        Client Reviews <span className="bg-gray-100 text-gray-600 px-2 py-0.5 rounded-full text-sm">{reviews.length}</span>
+        Client Reviews <span className="bg-gray-100 text-gray-600 px-2 py-0.5 rounded-full text-sm">{reviewCount}</span>
       </h3>
 
       {/* 1. REVIEW LIST */}
@@ -92,6 +116,16 @@ export default function ReviewsSection({ reviews, productId }: Props) {
                 </div>
             ))
         )}
+
+        {nextPage && (
+            <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="w-full text-sm font-bold text-[#8B0000] border border-gray-200 hover:border-[#8B0000] py-2 rounded transition disabled:opacity-50"
+            >
+                {loadingMore ? "Loading..." : "Show more reviews"}
+            </button>
+        )}
       </div>
 
       {/* 2. ADD REVIEW FORM */}
@@ -2,6 +2,7 @@
 import React, { useEffect, useState } from 'react';
 import Navbar from '../components/Navbar';
 import Link from 'next/link';
+import { useRouter } from 'next/navigation';
 import axios from 'axios';
 import { useCart } from '../context/CartContext';
 
@@ -9,44 +10,105 @@ export default function Home() {
   const [products, setProducts] = useState<any[]>([]);
   const [categories, setCategories] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [search, setSearch] = useState("");
+  const [query, setQuery] = useState("");
+  const [suggestions, setSuggestions] = useState<any[]>([]);
   const [selectedCategory, setSelectedCategory] = useState("All");
+  const [priceBand, setPriceBand] = useState("");
+  const [inStockOnly, setInStockOnly] = useState(false);
+  const [facets, setFacets] = useState<any>(null);
   const { addToCart } = useCart();
+  const router = useRouter();
 
+  // 👇 The list sends one cover image per product (absolute URL)
   const getImageUrl = (product: any) => {
-    let path = "";
-    if (product.images && product.images.length > 0) path = product.images[0].image;
-    else if (product.image) path = product.image;
+    const path = product.cover_image;
     if (!path) return null;
     if (path.startsWith("http")) return path;
     return `https://bua-backend.onrender.com${path}`;
   };
 
-  const getRating = (p: any) => {
-    if (!p.reviews || p.reviews.length === 0) return 0;
-    const total = p.reviews.reduce((acc: number, r: any) => acc + r.rating, 0);
-    return Math.round(total / p.reviews.length);
+  const getRating = (p: any) => Math.round(p.rating || 0);
+
+  useEffect(() => {
+    axios.get('https://bua-backend.onrender.com/api/products/categories/')
+        .then(catRes => setCategories([{id: 'all', name: 'All'}, ...catRes.data]))
+        .catch(err => console.error(err));
+  }, []);
+
+  // 👇 Suggestions while typing come from the in-memory index (cheap); the full search runs on submit
+  useEffect(() => {
+    if (!query.trim()) { setSuggestions([]); return; }
+    const timer = setTimeout(() => {
+        axios.get('https://bua-backend.onrender.com/api/products/suggest/', { params: { q: query } })
+            .then(res => setSuggestions(res.data))
+            .catch(err => console.error(err));
+    }, 100);
+    return () => clearTimeout(timer);
+  }, [query]);
+
+  const runSearch = (text: string) => {
+    setSuggestions([]);
+    setSearch(text.trim());
   };
 
+  const pickSuggestion = (s: any) => {
+    if (s.type === 'category') {
+        setQuery("");
+        runSearch("");
+        setSelectedCategory(s.id);
+    } else {
+        setSuggestions([]);
+        router.push(`/product/${s.id}`);
+    }
+  };
+
+  // 👇 Search and filters run on the server; pages come 24 at a time, with the facet counts alongside
   useEffect(() => {
-    const fetchData = async () => {
+    const params: any = {};
+    if (search) params.search = search;
+    if (selectedCategory !== "All") params.category = selectedCategory;
+    if (priceBand) params.price = priceBand;
+    if (inStockOnly) params.in_stock = 'true';
+
+    const timer = setTimeout(async () => {
         try {
-            const prodRes = await axios.get('https://bua-backend.onrender.com/api/products/');
-            setProducts(prodRes.data);
-            const catRes = await axios.get('https://bua-backend.onrender.com/api/products/categories/');
-            setCategories([{id: 'all', name: 'All'}, ...catRes.data]);
-            setLoading(false);
+            const [prodRes, facetRes] = await Promise.all([
+                axios.get('https://bua-backend.onrender.com/api/products/', { params }),
+                axios.get('https://bua-backend.onrender.com/api/products/facets/', { params }),
+            ]);
+            setProducts(prodRes.data.results);
+            setNextPage(prodRes.data.next);
+            setFacets(facetRes.data);
         } catch (err) { console.error(err); }
-    };
-    fetchData();
-  }, []);
+        finally { setLoading(false); }
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [search, selectedCategory, priceBand, inStockOnly]);
 
-  const filteredProducts = products.filter(p => {
-    const matchesSearch = p.name.toLowerCase().includes(search.toLowerCase()) || 
-                          (p.description && p.description.toLowerCase().includes(search.toLowerCase()));
-    const matchesCategory = selectedCategory === "All" || p.category_name === selectedCategory || p.category === Number(selectedCategory);
-    return matchesSearch && matchesCategory;
-  });
+  const categoryCount = (cat: any) => {
+    if (!facets) return null;
+    if (cat.name === 'All') return null;
+    return facets.categories.find((c: any) => c.id === cat.id)?.count ?? 0;
+  };
+
+  const formatBand = (band: any) =>
+    band.max ? `₦${band.min.toLocaleString()} – ₦${band.max.toLocaleString()}` : `₦${band.min.toLocaleString()}+`;
+
+  const loadMore = async () => {
+    if (!nextPage) return;
+    setLoadingMore(true);
+    try {
+        const prodRes = await axios.get(nextPage);
+        setProducts(prev => [...prev, ...prodRes.data.results]);
+        setNextPage(prodRes.data.next);
+    } catch (err) { console.error(err); }
+    finally { setLoadingMore(false); }
+  };
+
+  const filteredProducts = products;
 
   // BUA Theme Colors: Red (#8B0000), Gold (#FFD700), White
   return (
@@ -86,14 +148,33 @@ export default function Home() {
                             type="text" 
                             placeholder="Search Sugar, Cement, Flour..." 
                             className="w-full p-3 md:p-4 text-gray-800 placeholder-gray-400 bg-transparent focus:outline-none text-base md:text-lg"
-                            onChange={(e) => setSearch(e.target.value)}
-                            value={search}
+                            onChange={(e) => setQuery(e.target.value)}
+                            onKeyDown={(e) => { if (e.key === 'Enter') runSearch(query); }}
+                            value={query}
                         />
                         {/* Button is BUA Red */}
-                        <button className="bg-[#8B0000] hover:bg-[#600000] text-white px-6 md:px-8 py-3 rounded-full font-bold transition-all shadow-lg text-sm md:text-base">
+                        <button onClick={() => runSearch(query)} className="bg-[#8B0000] hover:bg-[#600000] text-white px-6 md:px-8 py-3 rounded-full font-bold transition-all shadow-lg text-sm md:text-base">
                             Search
                         </button>
                     </div>
+
+                    {suggestions.length > 0 && (
+                        <ul className="absolute z-20 left-0 right-0 mt-2 bg-white rounded-2xl shadow-2xl overflow-hidden text-left">
+                            {suggestions.map((s) => (
+                                <li key={`${s.type}-${s.id}`}>
+                                    <button
+                                        onClick={() => pickSuggestion(s)}
+                                        className="w-full flex items-center justify-between px-6 py-3 text-gray-800 hover:bg-gray-50 transition"
+                                    >
+                                        <span className="font-medium">{s.name}</span>
+                                        {s.type === 'category' && (
+                                            <span className="text-xs font-bold uppercase text-[#8B0000]">Category</span>
+                                        )}
+                                    </button>
+                                </li>
+                            ))}
+                        </ul>
+                    )}
                 </div>
             </div>
 
@@ -128,10 +209,42 @@ export default function Home() {
                             }`}
                         >
                             {cat.name}
+                            {categoryCount(cat) !== null && (
+                                <span className={`text-xs ${isActive ? 'text-red-100' : 'text-gray-400'}`}>{categoryCount(cat)}</span>
+                            )}
                         </button>
                     );
                 })}
             </div>
+
+            {/* Price bands + stock, with live counts */}
+            {facets && (
+                <div className="flex items-center space-x-2 pb-4 min-w-max">
+                    {facets.prices.map((band: any) => (
+                        <button
+                            key={band.key}
+                            disabled={!band.count && priceBand !== band.key}
+                            onClick={() => setPriceBand(priceBand === band.key ? "" : band.key)}
+                            className={`text-xs font-bold px-4 py-1.5 rounded-full border transition disabled:opacity-40 ${
+                                priceBand === band.key
+                                ? 'bg-yellow-400 text-gray-900 border-yellow-400'
+                                : 'bg-white text-gray-600 border-gray-200 hover:border-yellow-400'
+                            }`}
+                        >
+                            {formatBand(band)} <span className="text-gray-400">({band.count})</span>
+                        </button>
+                    ))}
+                    <label className="flex items-center gap-2 text-xs font-bold text-gray-600 pl-4 cursor-pointer">
+                        <input
+                            type="checkbox"
+                            checked={inStockOnly}
+                            onChange={(e) => setInStockOnly(e.target.checked)}
+                            className="accent-[#8B0000]"
+                        />
+                        In stock only ({facets.in_stock.in_stock})
+                    </label>
+                </div>
+            )}
         </div>
       </div>
 
@@ -140,7 +253,7 @@ export default function Home() {
         <div className="flex flex-col md:flex-row justify-between items-end mb-10 gap-4">
             <div>
                 <h2 className="text-3xl font-bold text-gray-900 tracking-tight">
-                    {selectedCategory === 'All' ? "Product Inventory" : `${selectedCategory}`}
+                    {selectedCategory === 'All' ? "Product Inventory" : (categories.find(c => c.id === selectedCategory)?.name || "Product Inventory")}
                 </h2>
                 <p className="text-gray-500 mt-2 font-medium">Wholesale & Industrial supply.</p>
             </div>
@@ -195,6 +308,18 @@ export default function Home() {
                 })}
             </div>
         )}
+
+        {nextPage && !loading && (
+            <div className="flex justify-center mt-12">
+                <button
+                    onClick={loadMore}
+                    disabled={loadingMore}
+                    className="bg-white border border-gray-200 hover:border-[#8B0000] text-gray-800 hover:text-[#8B0000] font-bold px-10 py-3 rounded-full transition-all shadow-sm disabled:opacity-50"
+                >
+                    {loadingMore ? "Loading..." : "Load More"}
+                </button>
+            </div>
+        )}
       </div>
 
       {/* FOOTER - BUA RED */}
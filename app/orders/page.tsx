@@ -8,6 +8,7 @@ import Link from 'next/link';
 export default function MyOrders() {
   const [orders, setOrders] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextPage, setNextPage] = useState<string | null>(null);
   const router = useRouter();
 
   useEffect(() => {
@@ -19,7 +20,9 @@ export default function MyOrders() {
         const res = await axios.get('https://bua-backend.onrender.com/api/orders/', {
           headers: { Authorization: `Bearer ${token}` }
         });
-        setOrders(res.data);
+        // 👇 The list is paginated now: { results, next }
+        setOrders(res.data.results);
+        setNextPage(res.data.next);
       } catch (err) {
         console.error("Error fetching shipments:", err);
       } finally {
@@ -29,6 +32,18 @@ export default function MyOrders() {
     fetchOrders();
   }, [router]);
 
+  const loadMore = async () => {
+    if (!nextPage) return;
+    const token = localStorage.getItem('access_token');
+    try {
+      const res = await axios.get(nextPage, { headers: { Authorization: `Bearer ${token}` } });
+      setOrders(prev => [...prev, ...res.data.results]);
+      setNextPage(res.data.next);
+    } catch (err) {
+      console.error("Error fetching shipments:", err);
+    }
+  };
+
   // 👇 NEW: Secure PDF Download Function
   const handlePrintWaybill = async (orderId: number) => {
     try {
@@ -155,6 +170,14 @@ export default function MyOrders() {
 
                 </div>
               ))}
+
+              {nextPage && (
+                <div className="text-center">
+                  <button onClick={loadMore} className="bg-white border border-gray-300 text-gray-700 px-8 py-3 rounded-lg font-bold hover:border-[#8B0000] hover:text-[#8B0000] transition shadow-sm">
+                    Load Older Shipments
+                  </button>
+                </div>
+              )}
             </div>
         )}
       </div>
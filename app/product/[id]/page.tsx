@@ -46,8 +46,11 @@ export default function ProductDetail() {
             setActiveImage(res.data.image || ""); 
         }
 
-        const allRes = await axios.get('https://bua-backend.onrender.com/api/products/');
-        const others = allRes.data.filter((p: any) => p.id !== Number(id));
+        // 👇 A few cards from the same category (not the whole catalogue)
+        const params: any = { page_size: 4 };
+        if (res.data.category) params.category = res.data.category;
+        const allRes = await axios.get('https://bua-backend.onrender.com/api/products/', { params });
+        const others = allRes.data.results.filter((p: any) => p.id !== Number(id));
         setRelatedProducts(others.slice(0, 3));
       } catch (error) {
         console.error("Error loading data");
@@ -216,7 +219,7 @@ export default function ProductDetail() {
                     </div>
                 ) : (
                     // 👇 THIS IS THE NEW PART: Using the modular Reviews Component
-                    <ReviewsSection reviews={product.reviews || []} productId={product.id} />
+                    <ReviewsSection productId={product.id} reviewCount={product.review_count || 0} />
                 )}
             </div>
         </div>
@@ -229,8 +232,8 @@ export default function ProductDetail() {
                     <div key={p.id} className="bg-white rounded-lg shadow-sm hover:shadow-xl transition overflow-hidden border border-gray-100 group">
                         <Link href={`/product/${p.id}`} className="block">
                             <div className="h-48 bg-gray-50 flex items-center justify-center p-4 group-hover:bg-red-50 transition">
-                                {p.images && p.images.length > 0 ? (
-                                    <img src={getImageUrl(p.images[0].image)} className="h-full w-full object-contain mix-blend-multiply" />
+                                {p.cover_image ? (
+                                    <img src={getImageUrl(p.cover_image)} className="h-full w-full object-contain mix-blend-multiply" />
                                 ) : (
                                     <span className="text-4xl">📦</span>
                                 )}
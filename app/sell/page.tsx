@@ -14,6 +14,7 @@ export default function SellPage() {
     name: '',
     category: '',
     price: '',
+    stock: '',
     description: '',
   });
 
@@ -51,6 +52,8 @@ export default function SellPage() {
     const data = new FormData();
     data.append('name', formData.name);
     data.append('price', formData.price);
+    // Blank = stock not tracked (never sold out)
+    data.append('stock', formData.stock);
     data.append('description', formData.description);
     if (formData.category) data.append('category', formData.category);
 
@@ -139,6 +142,19 @@ export default function SellPage() {
                     </div>
                 </div>
 
+                {/* Stock */}
+                <div>
+                    <label className="block text-xs font-bold text-gray-700 uppercase mb-2">Units in Stock</label>
+                    <input 
+                        name="stock"
+                        type="number" 
+                        min="0"
+                        onChange={handleChange}
+                        placeholder="Leave blank if you don't track stock"
+                        className="w-full p-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-[#8B0000] outline-none transition bg-gray-50"
+                    />
+                </div>
+
                 {/* Description */}
                 <div>
                     <label className="block text-xs font-bold text-gray-700 uppercase mb-2">Technical Specifications</label>
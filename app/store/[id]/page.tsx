@@ -30,15 +30,12 @@ export default function PublicStore() {
         const profileRes = await axios.get(`https://bua-backend.onrender.com/api/users/vendor/public/${vendorId}/`);
         setProfile(profileRes.data);
 
-        // 2. Get Products
-        const prodRes = await axios.get(`https://bua-backend.onrender.com/api/products/`);
-        
-        const vendorProducts = prodRes.data.filter((p: any) => {
-            const ownerID = p.seller || p.vendor || p.user; 
-            return Number(ownerID) === Number(vendorId);
+        // 2. Get Products (only this distributor's, filtered on the server)
+        const prodRes = await axios.get(`https://bua-backend.onrender.com/api/products/`, {
+            params: { seller: vendorId, page_size: 100 }
         });
 
-        setProducts(vendorProducts);
+        setProducts(prodRes.data.results);
 
       } catch (error) {
         console.error("Error fetching store", error);
@@ -180,9 +177,7 @@ export default function PublicStore() {
         ) : (
             <div className="grid grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-6">
                 {products.map((product) => {
-                    let imgPath = "";
-                    if (product.images && product.images.length > 0) imgPath = product.images[0].image;
-                    else if (product.image) imgPath = product.image;
+                    const imgPath = product.cover_image || "";
 
                     return (
                         <Link key={product.id} href={`/product/${product.id}`} className="bg-white rounded-xl shadow-sm hover:shadow-2xl hover:-translate-y-1 transition duration-300 overflow-hidden group border border-gray-200 block">
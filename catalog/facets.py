@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.db.models import Case, CharField, Count, Q, Value, When
+
+# 👇 FACETED FILTERING
+# Every filter on the product list is also a facet. A facet's counts apply all the
+# *other* active filters, so after picking a category the buyer still sees how many
+# products the other categories hold. Each facet is one grouped query.
+
+# Price band edges (Naira): each band runs from one edge up to (not including) the
+# next, and the last one is open-ended ("100000-": no '+', which a query string reads as a space)
+PRICE_BANDS = getattr(settings, 'PRODUCT_PRICE_BANDS', [1000, 5000, 20000, 100000])
+
+
+def price_bands():
+    """(key, low, high) per band, e.g. ('1000-5000', 1000, 5000) ... ('100000-', 100000, None)."""
+    lows, highs = [0, *PRICE_BANDS], [*PRICE_BANDS, None]
+    return [(f'{low}-{high}' if high else f'{low}-', low, high) for low, high in zip(lows, highs)]
+
+
+# Untracked stock (NULL) never runs out
+IN_STOCK = Q(stock__isnull=True) | Q(stock__gt=0)
+
+
+def _band_q(low, high):
+    return Q(price__gte=low, price__lt=high) if high else Q(price__gte=low)
+
+
+def _ids(param, value):
+    ids = value.split(',')
+    if not all(i.isdigit() for i in ids):
+        raise ValueError(f"{param} must be an id (or ids separated by commas)")
+    return ids
+
+
+def parse_filters(params):
+    """
+    {facet: Q} for the filters in a query string; raises ValueError on garbage.
+
+      ?category=<id>[,<id>...]     ?seller=<id>[,<id>...]
+      ?price=<band>[,<band>...]    (keys from price_bands(): 0-1000, 1000-5000, ... 100000-)
+      ?in_stock=true
+    """
+    filters = {}
+    for param, field in (('category', 'category_id__in'), ('seller', 'seller_id__in')):
+        if params.get(param):
+            filters[param] = Q(**{field: _ids(param, params[param])})
+
+    if params.get('price'):
+        bands = {key: _band_q(low, high) for key, low, high in price_bands()}
+        q = Q()
+        for key in params['price'].split(','):
+            if key not in bands:
+                raise ValueError(f"price must be one of {', '.join(bands)}")
+            q |= bands[key]
+        filters['price'] = q
+
+    in_stock = params.get('in_stock', '').lower()
+    if in_stock in ('1', 'true', 'yes'):
+        filters['in_stock'] = IN_STOCK
+    elif in_stock not in ('', '0', 'false', 'no'):
+        raise ValueError("in_stock must be true or false")
+    return filters
+
+
+def apply_filters(products, filters, skip=None):
+    for facet, q in filters.items():
+        if facet != skip:
+            products = products.filter(q)
+    return products
+
+
+def facet_counts(products, filters):
+    """
+    Counts per category, seller, price band and stock state for `products` (the
+    list's base queryset, search included), plus the total matching every filter.
+    Four grouped queries, whatever the catalogue size.
+    """
+    def grouped(facet, *fields, **annotations):
+        rows = apply_filters(products, filters, skip=facet).annotate(**annotations).values(*fields)
+        return rows.annotate(count=Count('id')).order_by('-count', *fields)
+
+    categories = [
+        {"id": row['category_id'], "name": row['category__name'], "count": row['count']}
+        for row in grouped('category', 'category_id', 'category__name')
+    ]
+    sellers = [
+        {"id": row['seller_id'], "username": row['seller__username'], "count": row['count']}
+        for row in grouped('seller', 'seller_id', 'seller__username')
+    ]
+
+    bands = price_bands()
+    band = Case(*[When(_band_q(low, high), then=Value(key)) for key, low, high in bands], output_field=CharField())
+    by_band = {row['band']: row['count'] for row in grouped('price', 'band', band=band)}
+    prices = [
+        {"key": key, "min": low, "max": high, "count": by_band.get(key, 0)}
+        for key, low, high in bands
+    ]
+
+    stocked = Case(When(IN_STOCK, then=Value('in_stock')), default=Value('out_of_stock'), output_field=CharField())
+    by_stock = {row['stocked']: row['count'] for row in grouped('in_stock', 'stocked', stocked=stocked)}
+
+    in_stock, out_of_stock = by_stock.get('in_stock', 0), by_stock.get('out_of_stock', 0)
+
+    return {
+        # The stock facet ignores only the in_stock filter, so the total falls out of it
+        "total": in_stock if 'in_stock' in filters else in_stock + out_of_stock,
+        "categories": categories,
+        "sellers": sellers,
+        "prices": prices,
+        "in_stock": {"in_stock": in_stock, "out_of_stock": out_of_stock},
+    }
@@ -0,0 +1,107 @@
+import random
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from catalog.models import Category, Product
+from catalog.search import index_products, search_products
+
+BENCH_PREFIX = 'bench_search_'
+
+ADJECTIVES = [
+    'red', 'blue', 'green', 'black', 'white', 'leather', 'cotton', 'wool', 'silk', 'steel', 'wooden', 'glass',
+    'organic', 'vintage', 'classic', 'modern', 'compact', 'portable', 'wireless', 'handmade', 'premium', 'light',
+]
+NOUNS = [
+    'shoe', 'boot', 'sandal', 'bag', 'scarf', 'shirt', 'dress', 'jacket', 'watch', 'lamp', 'chair', 'table',
+    'kettle', 'blender', 'phone', 'charger', 'speaker', 'headphones', 'rice', 'honey', 'tea', 'coffee', 'soap',
+]
+FILLER = [
+    'with', 'for', 'the', 'and', 'daily', 'use', 'quality', 'durable', 'soft', 'strong', 'fresh', 'family',
+    'gift', 'home', 'office', 'travel', 'kitchen', 'outdoor', 'garden', 'kids', 'easy', 'clean', 'size',
+]
+
+# What shoppers type: common words, narrow combinations, a rare word and a miss
+QUERIES = ['shoe', 'leather boots', 'wireless speaker black', 'handmade', 'honey organic fresh', 'zanzibar']
+
+
+class Command(BaseCommand):
+    help = "Seed a large catalogue and time the indexed product search against the old LIKE filter."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000, help="Products to seed")
+        parser.add_argument('--batch', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per query")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded data afterwards")
+        parser.add_argument('--reuse', action='store_true', help="Skip seeding and reuse data from a --keep run")
+
+    def handle(self, *args, **options):
+        if not options['reuse']:
+            self.seed(options)
+
+        if not Product.objects.filter(seller__username=f'{BENCH_PREFIX}vendor').exists():
+            self.stdout.write(self.style.ERROR("No seeded data found (run without --reuse first)"))
+            return
+
+        # The marketplace search box spans the whole catalogue
+        products = Product.objects.all()
+        self.stdout.write(f"Searching {products.count():,} products ({connection.vendor})")
+
+        for text in QUERIES:
+            indexed = search_products(products, text).order_by('-rank', '-id')
+            like = products
+            for word in text.split():
+                like = like.filter(
+                    Q(name__icontains=word) | Q(description__icontains=word) | Q(category__name__icontains=word)
+                )
+            like = like.order_by('-created_at', '-id')
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n'{text}'"))
+            for label, queryset in (('full-text index', indexed), ('LIKE scan', like)):
+                # What one search request runs: the count and the first page
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    hits = queryset.count()
+                    list(queryset[:24])
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"  {label:<16} {hits:>7,} hits  median {statistics.median(timings):8.2f} ms  best {min(timings):8.2f} ms"
+                )
+
+        if not options['keep']:
+            self.stdout.write("\nCleaning up seeded data...")
+            User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+            Category.objects.filter(slug__startswith=BENCH_PREFIX).delete()
+
+    def seed(self, options):
+        count, batch = options['products'], options['batch']
+        self.stdout.write(f"Seeding {count:,} products...")
+        rng = random.Random(42)
+        vendor = User.objects.create(username=f'{BENCH_PREFIX}vendor', is_staff=True)
+        Category.objects.bulk_create([
+            Category(name=name.title(), slug=f'{BENCH_PREFIX}{name}')
+            for name in ('fashion', 'electronics', 'groceries', 'home', 'beauty')
+        ])
+        categories = list(Category.objects.filter(slug__startswith=BENCH_PREFIX))
+
+        vocabulary = ADJECTIVES + NOUNS + FILLER
+        for start in range(0, count, batch):
+            size = min(batch, count - start)
+            with transaction.atomic():
+                # bulk_create skips the save signals, so index each batch by hand
+                Product.objects.bulk_create([
+                    Product(
+                        seller=vendor, category=rng.choice(categories), price=1000, stock=5,
+                        name=f"{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {start + i}",
+                        description=' '.join(rng.choices(vocabulary, k=rng.randint(20, 60))),
+                    )
+                    for i in range(size)
+                ])
+                index_products(
+                    Product.objects.filter(seller=vendor).order_by('-id').values_list('id', flat=True)[:size]
+                )
+            self.stdout.write(f"  {start + size:,} / {count:,} products", ending='\r')
+        self.stdout.write("")
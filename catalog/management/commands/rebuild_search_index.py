@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from catalog.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product search index from scratch (after bulk imports or queryset .update() calls, which skip the save signals)."
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"✅ Indexed {count} products"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from catalog.ratings import rating_mismatches, reconcile
+
+
+class Command(BaseCommand):
+    help = "Compare each product's stored rating count/sum/average with its reviews and fix the ones that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check-only', action='store_true', help="Only report, do not fix")
+
+    def handle(self, *args, **options):
+        mismatches = rating_mismatches()
+        for product_id, (count, total), (stored_count, stored_total) in mismatches[:20]:
+            self.stdout.write(self.style.WARNING(
+                f"product={product_id}: reviews={count} (sum {total}) stored={stored_count} (sum {stored_total})"
+            ))
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("✅ Rating aggregates match the reviews"))
+            return
+        if options['check_only']:
+            raise CommandError(f"❌ {len(mismatches)} products have stale rating aggregates")
+
+        reconcile([product_id for product_id, _, _ in mismatches])
+        self.stdout.write(self.style.SUCCESS(f"✅ Fixed the rating aggregates of {len(mismatches)} products"))
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 16:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_productimage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['seller', '-created_at'], name='product_seller_created_idx'),
+        ),
+    ]
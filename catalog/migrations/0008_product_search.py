@@ -0,0 +1,68 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The search side table lives outside the ORM (see catalog/search.py), one layout per backend.
+# Backends other than PostgreSQL and SQLite get no table and search with LIKE instead.
+CREATE = {
+    'postgresql': [
+        """
+        CREATE TABLE catalog_product_search (
+            -- No foreign key: the delete signal removes rows, and a stale one never matches a live product
+            product_id bigint PRIMARY KEY,
+            document tsvector NOT NULL
+        )
+        """,
+        "CREATE INDEX catalog_product_search_document_idx ON catalog_product_search USING gin (document)",
+        """
+        INSERT INTO catalog_product_search (product_id, document)
+        SELECT p.id,
+               setweight(to_tsvector('english', coalesce(p.name, '')), 'A')
+               || setweight(to_tsvector('english', coalesce(c.name, '')), 'B')
+               || setweight(to_tsvector('english', coalesce(p.description, '')), 'C')
+        FROM catalog_product p LEFT JOIN catalog_category c ON c.id = p.category_id
+        """,
+    ],
+    'sqlite': [
+        # rowid = product_id; the column copy is what the ORM joins on (catalog.ProductSearchDocument)
+        """
+        CREATE VIRTUAL TABLE catalog_product_search
+        USING fts5(product_id UNINDEXED, name, category, description, tokenize = 'porter unicode61')
+        """,
+        """
+        INSERT INTO catalog_product_search (rowid, product_id, name, category, description)
+        SELECT p.id, p.id, p.name, coalesce(c.name, ''), p.description
+        FROM catalog_product p LEFT JOIN catalog_category c ON c.id = p.category_id
+        """,
+    ],
+}
+
+
+def create_search_table(apps, schema_editor):
+    for statement in CREATE.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE:
+        schema_editor.execute("DROP TABLE catalog_product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_product_list_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='catalog.product')),
+            ],
+            options={
+                'db_table': 'catalog_product_search',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-18 16:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_ratings(apps, schema_editor):
+    # Same numbers as catalog.ratings.reconcile(), one UPDATE per reviewed product
+    Product = apps.get_model('catalog', 'Product')
+    Review = apps.get_model('catalog', 'Review')
+    rows = Review.objects.values('product').annotate(n=Count('id'), total=Sum('rating')).order_by()
+    for row in rows.iterator(chunk_size=2000):
+        Product.objects.filter(pk=row['product']).update(
+            rating_count=row['n'], rating_sum=row['total'], average_rating=row['total'] / row['n'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_product_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='average_rating',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', '-created_at', '-id'], name='review_product_created_idx'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 16:44
+
+from django.db import migrations, models
+
+
+def untrack_zero_stock(apps, schema_editor):
+    # Until stock was reserved at checkout, nothing ever set it: every 0 is "never
+    # filled in", not "sold out". Those products stay sellable until a vendor sets stock.
+    Product = apps.get_model('catalog', 'Product')
+    Product.objects.filter(stock=0).update(stock=None)
+
+
+def zero_untracked_stock(apps, schema_editor):
+    Product = apps.get_model('catalog', 'Product')
+    Product.objects.filter(stock__isnull=True).update(stock=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_product_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='stock',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(untrack_zero_stock, zero_untracked_stock),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 6.0 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Joins go through the search table's rowid (see catalog.ProductSearchDocument): PostgreSQL
+# renames its key column to match, SQLite rebuilds its FTS5 table without the stored copy.
+FORWARD = {
+    'postgresql': [
+        "ALTER TABLE catalog_product_search RENAME COLUMN product_id TO rowid",
+    ],
+    'sqlite': [
+        "DROP TABLE catalog_product_search",
+        """
+        CREATE VIRTUAL TABLE catalog_product_search
+        USING fts5(name, category, description, tokenize = 'porter unicode61')
+        """,
+        """
+        INSERT INTO catalog_product_search (rowid, name, category, description)
+        SELECT p.id, p.name, coalesce(c.name, ''), p.description
+        FROM catalog_product p LEFT JOIN catalog_category c ON c.id = p.category_id
+        """,
+    ],
+}
+
+BACKWARD = {
+    'postgresql': [
+        "ALTER TABLE catalog_product_search RENAME COLUMN rowid TO product_id",
+    ],
+    'sqlite': [
+        "DROP TABLE catalog_product_search",
+        """
+        CREATE VIRTUAL TABLE catalog_product_search
+        USING fts5(product_id UNINDEXED, name, category, description, tokenize = 'porter unicode61')
+        """,
+        """
+        INSERT INTO catalog_product_search (rowid, product_id, name, category, description)
+        SELECT p.id, p.id, p.name, coalesce(c.name, ''), p.description
+        FROM catalog_product p LEFT JOIN catalog_category c ON c.id = p.category_id
+        """,
+    ],
+}
+
+
+def key_on_rowid(apps, schema_editor):
+    for statement in FORWARD.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def key_on_product_id(apps, schema_editor):
+    for statement in BACKWARD.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0010_product_stock_untracked'),
+    ]
+
+    operations = [
+        migrations.RunPython(key_on_rowid, key_on_product_id),
+        migrations.AlterField(
+            model_name='productsearchdocument',
+            name='product',
+            field=models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='catalog.product'),
+        ),
+    ]
@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from . import search, typeahead
 
 # 1. CATEGORY
 class Category(models.Model):
@@ -18,9 +21,23 @@ class Product(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
-    stock = models.IntegerField(default=0)
+    # None = the vendor doesn't track stock: never sold out (see orders/stock.py)
+    stock = models.IntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Review aggregates, kept by catalog/ratings.py (never summed at read time)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # A vendor's own catalogue, newest first (also the seller -> products step of order lookups)
+            models.Index(fields=['seller', '-created_at'], name='product_seller_created_idx'),
+            # The marketplace list, newest first (cursor pagination walks this)
+            models.Index(fields=['-created_at', '-id'], name='product_created_id_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -32,6 +49,12 @@ class Review(models.Model):
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # A product's reviews, newest first (cursor pagination walks this)
+            models.Index(fields=['product', '-created_at', '-id'], name='review_product_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.rating} stars for {self.product.name}"
     # catalog/models.py (Add this to the bottom)
@@ -42,4 +65,50 @@ class ProductImage(models.Model):
     image = models.ImageField(upload_to='product_images/')
 
     def __str__(self):
-        return f"Image for {self.product.name}"
\ No newline at end of file
+        return f"Image for {self.product.name}"
+
+# 👇 The full-text search side table (created by migration 0008, written with raw SQL
+# in catalog/search.py). Mapped only so searches can join it through the ORM. The key
+# column is "rowid" on both backends: SQLite's FTS5 table can only be joined fast on
+# its rowid, and the PostgreSQL table names its primary key to match.
+class ProductSearchDocument(models.Model):
+    product = models.OneToOneField(
+        Product, primary_key=True, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='search_document', db_column='rowid',
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'catalog_product_search'
+
+# 👇 Keep the search index (catalog/search.py) and this process's typeahead
+# (catalog/typeahead.py, updated once the change is committed) in step with edits
+SEARCHED_FIELDS = {'name', 'description', 'category', 'category_id'}
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, update_fields=None, **kwargs):
+    # Stock/price-only saves leave the search document as it is
+    if update_fields is None or SEARCHED_FIELDS & set(update_fields):
+        search.index_products([instance.pk])
+        product_id, name = instance.pk, instance.name
+        transaction.on_commit(lambda: typeahead.index.put('product', product_id, name))
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+    product_id = instance.pk
+    transaction.on_commit(lambda: typeahead.index.remove('product', product_id))
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance, created, update_fields=None, **kwargs):
+    # A renamed category changes the documents of all its products (re-indexed in this
+    # request, see catalog/search.py)
+    if not created and (update_fields is None or 'name' in update_fields):
+        search.index_products(instance.products.values_list('id', flat=True))
+    category_id, name = instance.pk, instance.name
+    transaction.on_commit(lambda: typeahead.index.put('category', category_id, name))
+
+@receiver(post_delete, sender=Category)
+def unindex_category(sender, instance, **kwargs):
+    category_id = instance.pk
+    transaction.on_commit(lambda: typeahead.index.remove('category', category_id))
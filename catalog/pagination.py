@@ -0,0 +1,24 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+# 👇 Keyset pagination for the marketplace: each page is an index range scan
+class ProductCursorPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+# 👇 Search results come best match first; relevance is no cursor key, so page by number
+class ProductSearchPagination(PageNumberPagination):
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+# 👇 A product's reviews, newest first (review_product_created_idx)
+class ReviewCursorPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
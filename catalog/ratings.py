@@ -0,0 +1,50 @@
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+from .models import Product, Review
+
+# 👇 RATING AGGREGATES
+# Product.rating_count / rating_sum / average_rating mirror the product's reviews, so
+# lists and detail pages never aggregate reviews at read time. Writes go through
+# record_review(); reconcile() repairs drift from anything that bypassed it.
+
+
+def record_review(product_id, rating):
+    """
+    Count a new review in its product's aggregates: a single UPDATE with F()
+    expressions, so concurrent reviews can't overwrite each other's increments.
+    (Every right-hand side reads the row as it was before this UPDATE.)
+    """
+    Product.objects.filter(pk=product_id).update(
+        rating_count=F('rating_count') + 1,
+        rating_sum=F('rating_sum') + rating,
+        average_rating=Cast(F('rating_sum') + rating, FloatField()) / (F('rating_count') + 1),
+    )
+
+
+def _from_reviews():
+    reviews = Review.objects.filter(product=OuterRef('pk')).values('product')
+    count = Coalesce(Subquery(reviews.annotate(n=Count('id')).values('n')), 0, output_field=IntegerField())
+    total = Coalesce(Subquery(reviews.annotate(s=Sum('rating')).values('s')), 0, output_field=IntegerField())
+    return count, total
+
+
+def rating_mismatches():
+    """[(product_id, (count, sum) from the reviews, (count, sum) stored)] for every product that is off."""
+    count, total = _from_reviews()
+    rows = (
+        Product.objects.annotate(expected_count=count, expected_sum=total)
+        .exclude(rating_count=F('expected_count'), rating_sum=F('expected_sum'))
+        .values_list('id', 'expected_count', 'expected_sum', 'rating_count', 'rating_sum')
+        .order_by('id')
+    )
+    return [(pk, (n, s), (stored_n, stored_s)) for pk, n, s, stored_n, stored_s in rows]
+
+
+def reconcile(product_ids=None):
+    """Recompute the aggregates from the reviews (for `product_ids`, or every product)."""
+    count, total = _from_reviews()
+    products = Product.objects.all() if product_ids is None else Product.objects.filter(pk__in=product_ids)
+    products.update(rating_count=count, rating_sum=total, average_rating=None)
+    return products.filter(rating_count__gt=0).update(
+        average_rating=Cast(F('rating_sum'), FloatField()) / F('rating_count')
+    )
@@ -0,0 +1,136 @@
+import re
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# 👇 FULL-TEXT PRODUCT SEARCH
+# One search document per product (name, category name, description) in a side
+# table, kept in step by the signals at the bottom of models.py:
+#   PostgreSQL: catalog_product_search(rowid = product id, document tsvector) + a GIN index
+#   SQLite:     an FTS5 table of the same name (rowid = product id), for local use
+# Other backends fall back to LIKE matching, unranked.
+#
+# The signals write synchronously, inside the request that saves: one
+# INSERT ... SELECT per product save, and a category rename re-indexes every product
+# in that category (BATCH_SIZE ids per statement) before the response goes out.
+# Categories hold a few thousand products at most, so that stays well under a
+# second; imports and .update() calls skip the signals and are followed by
+# `manage.py rebuild_search_index` instead.
+TABLE = 'catalog_product_search'
+
+# Words past this are ignored (each one is another index probe)
+MAX_TERMS = 8
+
+# Products (re)indexed per statement
+BATCH_SIZE = 500
+
+# Name matches outrank category matches, which outrank description matches
+_PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(p.name, '')), 'A')"
+    " || setweight(to_tsvector('english', coalesce(c.name, '')), 'B')"
+    " || setweight(to_tsvector('english', coalesce(p.description, '')), 'C')"
+)
+_SOURCE = "FROM catalog_product p LEFT JOIN catalog_category c ON c.id = p.category_id"
+
+SQL = {
+    'postgresql': {
+        'index': [
+            f"INSERT INTO {TABLE} (rowid, document) SELECT p.id, {_PG_DOCUMENT} {_SOURCE} WHERE p.id IN ({{ids}}) "
+            "ON CONFLICT (rowid) DO UPDATE SET document = EXCLUDED.document",
+        ],
+        'remove': f"DELETE FROM {TABLE} WHERE rowid IN ({{ids}})",
+        'match': f"{TABLE}.document @@ plainto_tsquery('english', %s)",
+        'rank': f"ts_rank({TABLE}.document, plainto_tsquery('english', %s))",
+    },
+    'sqlite': {
+        'index': [
+            f"DELETE FROM {TABLE} WHERE rowid IN ({{ids}})",
+            f"INSERT INTO {TABLE} (rowid, name, category, description) "
+            f"SELECT p.id, p.name, coalesce(c.name, ''), p.description {_SOURCE} WHERE p.id IN ({{ids}})",
+        ],
+        'remove': f"DELETE FROM {TABLE} WHERE rowid IN ({{ids}})",
+        'match': f"{TABLE} MATCH %s",
+        # bm25() is "lower is better"; the column weights follow name, category, description
+        'rank': f"-bm25({TABLE}, 10.0, 4.0, 1.0)",
+    },
+}
+
+
+def terms(text):
+    """The lower-cased words of a search box entry; punctuation and query syntax are dropped."""
+    return re.findall(r'\w+', text.lower())[:MAX_TERMS]
+
+
+def _query(words):
+    if connection.vendor == 'sqlite':
+        # Quoted, so words like AND/NOT/NEAR are plain words to FTS5
+        return ' '.join(f'"{word}"' for word in words)
+    return ' '.join(words)
+
+
+def search_products(products, text):
+    """
+    `products` narrowed to those matching every word of `text` and annotated with
+    `rank` (higher is more relevant). Words are stemmed: "shoes" finds "shoe".
+    """
+    words = terms(text)
+    if not words:
+        return products.annotate(rank=Value(0.0, output_field=FloatField()))
+
+    sql = SQL.get(connection.vendor)
+    if sql is None:
+        for word in words:
+            products = products.filter(
+                Q(name__icontains=word) | Q(description__icontains=word) | Q(category__name__icontains=word)
+            )
+        return products.annotate(rank=Value(0.0, output_field=FloatField()))
+
+    # Joined through catalog.ProductSearchDocument on the rowid: the index drives and each
+    # match is ranked once. (A correlated rank subquery would redo the match for every
+    # row, and SQLite's bm25() re-reads the whole term list each time; joining FTS5 on a
+    # stored column instead of the rowid reads every matching row's content.)
+    query = _query(words)
+    return (
+        products.filter(search_document__isnull=False)
+        .filter(RawSQL(sql['match'], [query], output_field=BooleanField()))
+        # (bm25() reads the match of the row it is on and takes no parameter)
+        .annotate(rank=RawSQL(sql['rank'], [query] * sql['rank'].count('%s'), output_field=FloatField()))
+    )
+
+
+def _run(statements, ids):
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = ids[start:start + BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            for statement in statements:
+                cursor.execute(statement.format(ids=placeholders), batch)
+
+
+def index_products(ids):
+    """(Re)build the search documents of these products."""
+    sql = SQL.get(connection.vendor)
+    if sql:
+        _run(sql['index'], ids)
+
+
+def remove_products(ids):
+    sql = SQL.get(connection.vendor)
+    if sql:
+        _run([sql['remove']], ids)
+
+
+def rebuild_index():
+    """Re-index every product (after bulk imports or .update() calls, which skip the signals)."""
+    from .models import Product
+
+    if connection.vendor not in SQL:
+        return 0
+    # One transaction, so searches never see a half-empty index
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE}")
+        ids = list(Product.objects.values_list('id', flat=True))
+        index_products(ids)
+    return len(ids)
@@ -9,13 +9,50 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'username', 'product', 'rating', 'comment', 'created_at']
         read_only_fields = ['user', 'product', 'created_at']
 
+    def validate_rating(self, value):
+        # The product's rating_sum/average_rating add these up
+        if not 1 <= value <= 5:
+            raise serializers.ValidationError("Rating must be between 1 and 5")
+        return value
+
 # 2. IMAGE SERIALIZER
 class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
         fields = ['id', 'image']
 
-# 3. PRODUCT SERIALIZER
+# 3. PRODUCT CARD (marketplace lists: no nested reviews, one cover image)
+class ProductCardSerializer(serializers.ModelSerializer):
+    seller_username = serializers.ReadOnlyField(source='seller.username')
+    category_name = serializers.ReadOnlyField(source='category.name')
+    # Annotated by ProductListView; the rating summary is stored on the product
+    description = serializers.ReadOnlyField(source='summary')
+    rating = serializers.SerializerMethodField()
+    review_count = serializers.ReadOnlyField(source='rating_count')
+    cover_image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'seller', 'seller_username',
+            'name', 'description', 'price', 'stock',
+            'category', 'category_name',
+            'cover_image', 'rating', 'review_count', 'created_at'
+        ]
+
+    def get_rating(self, obj):
+        return round(obj.average_rating, 1) if obj.average_rating is not None else None
+
+    def get_cover_image(self, obj):
+        # `cover` holds at most one prefetched ProductImage; fall back to the product's own image
+        covers = getattr(obj, 'cover', None)
+        image = covers[0].image if covers else obj.image
+        if not image:
+            return None
+        request = self.context.get('request')
+        return request.build_absolute_uri(image.url) if request else image.url
+
+# 4. PRODUCT SERIALIZER (full payload: detail, create, edit)
 class ProductSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     uploaded_images = serializers.ListField(
@@ -23,7 +60,8 @@ class ProductSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
-    reviews = ReviewSerializer(many=True, read_only=True)
+    # Reviews themselves are paged separately (ProductReviewListView)
+    review_count = serializers.ReadOnlyField(source='rating_count')
     
     # Read-only fields for display
     seller_username = serializers.ReadOnlyField(source='seller.username')
@@ -33,11 +71,11 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = [
             'id', 'seller', 'seller_username',
-            'name', 'description', 'price', 
+            'name', 'description', 'price', 'stock',
             'category', 'category_name', 
-            'images', 'uploaded_images', 'reviews', 'created_at'
+            'images', 'uploaded_images', 'average_rating', 'review_count', 'created_at'
         ]
-        read_only_fields = ['seller', 'created_at']
+        read_only_fields = ['seller', 'average_rating', 'created_at']
 
     # 👇 LOGIC FOR CREATING NEW PRODUCTS
     def create(self, validated_data):
@@ -52,8 +90,12 @@ class ProductSerializer(serializers.ModelSerializer):
         # 1. Extract the new images (if any)
         uploaded_images = validated_data.pop('uploaded_images', [])
         
-        # 2. Update the standard fields (Name, Price, etc.)
-        instance = super().update(instance, validated_data)
+        # 2. Update the standard fields (Name, Price, etc.). Only those columns are
+        # written: the rating aggregates on `instance` may be stale by now, and a full
+        # save would overwrite reviews counted in the meantime (see catalog/ratings.py)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=list(validated_data))
         
         # 3. IF new images were uploaded, REPLACE the old ones
         if uploaded_images:
@@ -1,3 +1,362 @@
+import importlib
+import sys
+from types import SimpleNamespace
+from io import StringIO
+from unittest import mock, skipUnless
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+from core.query_plans import plan_problems, prefer_indexes
+from core.testing import create_buyer, create_product, create_vendor
+from .models import Category, Product, ProductImage, Review
+from .ratings import reconcile
+from .serializers import ProductSerializer
+from .search import rebuild_index, search_products
+from . import typeahead
+from .views import VendorProductListView
 
-# Create your tests here.
+
+class ProductQueryPlanTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendors = [create_vendor(f'vendor{i}') for i in range(3)]
+        for vendor in cls.vendors:
+            for i in range(20):
+                create_product(vendor, f'Item {i}', price=100, stock=5, description='d')
+
+    def test_vendor_catalogue_needs_no_scan_or_sort(self):
+        view = VendorProductListView(request=SimpleNamespace(user=self.vendors[0]), kwargs={})
+        with prefer_indexes():
+            self.assertEqual(plan_problems(view.get_queryset()), [])
+
+
+class ProductListTest(TestCase):
+    """The marketplace list is the most-hit endpoint: cards only, fixed query count."""
+
+    # products (+ seller + category) and their cover images
+    QUERY_BUDGET = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor()
+        cls.other_vendor = create_vendor('other')
+        cls.buyer = create_buyer()
+        for vendor in (cls.vendor, cls.other_vendor):
+            for i in range(5):
+                product = create_product(vendor, f'Item {i}', price=100, stock=5, description='x' * 500)
+                for n in range(3):
+                    ProductImage.objects.create(product=product, image=f'product_images/{product.id}-{n}.jpg')
+                    Review.objects.create(product=product, user=cls.buyer, rating=n + 3, comment='ok')
+        reconcile()
+
+    def test_cards_stay_within_query_budget(self):
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = APIClient().get('/api/products/')
+        card = response.data['results'][0]
+        self.assertNotIn('reviews', card)
+        self.assertEqual(card['rating'], 4.0)
+        self.assertEqual(card['review_count'], 3)
+        self.assertEqual(len(card['description']), 160)
+        self.assertTrue(card['cover_image'].endswith('-0.jpg'))
+
+    def test_store_pages_filter_by_seller(self):
+        data = APIClient().get(f'/api/products/?seller={self.other_vendor.id}').data
+        self.assertEqual({card['seller'] for card in data['results']}, {self.other_vendor.id})
+        self.assertEqual(APIClient().get('/api/products/?seller=abc').status_code, 400)
+
+
+class ProductSearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor()
+        cls.shoes = Category.objects.create(name='Footwear', slug='footwear')
+
+        def make(name, description, category=None):
+            return create_product(cls.vendor, name, price=100, stock=5, description=description, category=category)
+
+        cls.boot = make('Leather boot', 'Hand stitched, for rain and mud', cls.shoes)
+        cls.bag = make('Travel bag', 'Leather straps and a boot compartment')
+        cls.sandal = make('Summer sandal', 'Light and open', cls.shoes)
+        cls.scarf = make('Wool scarf', 'Warm')
+
+    def search(self, text):
+        response = APIClient().get('/api/products/', {'search': text})
+        self.assertEqual(response.status_code, 200)
+        return [card['id'] for card in response.data['results']]
+
+    def test_every_word_must_match_and_name_matches_rank_first(self):
+        self.assertEqual(self.search('leather boots'), [self.boot.id, self.bag.id])
+        self.assertEqual(self.search('leather sandal'), [])
+
+    def test_category_names_are_searched(self):
+        self.assertEqual(set(self.search('footwear')), {self.boot.id, self.sandal.id})
+
+    def test_query_syntax_is_treated_as_plain_words(self):
+        self.assertEqual(self.search('"wool" -scarf*'), [self.scarf.id])
+        self.assertEqual(self.search('NEAR( "'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.scarf.name = 'Cashmere shawl'
+        self.scarf.save()
+        self.assertEqual(self.search('cashmere'), [self.scarf.id])
+        self.assertEqual(self.search('scarf'), [])
+
+        self.shoes.name = 'Shoes'
+        self.shoes.save()
+        self.assertEqual(set(self.search('shoe')), {self.boot.id, self.sandal.id})
+
+        self.boot.delete()
+        self.assertEqual(self.search('leather'), [self.bag.id])
+
+    def test_rebuild_picks_up_bulk_changes(self):
+        Product.objects.filter(id=self.bag.id).update(name='Canvas tote')
+        self.assertEqual(self.search('canvas'), [])
+        self.assertEqual(rebuild_index(), 4)
+        self.assertEqual(self.search('canvas'), [self.bag.id])
+
+
+@skipUnless(connection.vendor == 'postgresql', "the tsvector branch only runs on PostgreSQL")
+class PostgresProductSearchTest(TestCase):
+    """What only the PostgreSQL branch does (ProductSearchTest covers the shared behaviour)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        vendor = create_vendor()
+        tools = Category.objects.create(name='Hammers', slug='hammers')
+        cls.claw = create_product(vendor, 'Claw hammer', price=100, stock=None, description='Steel', category=tools)
+        cls.kit = create_product(vendor, 'Tool kit', price=100, stock=None, description='Includes a small hammer')
+        cls.saw = create_product(vendor, 'Hand saw', price=100, stock=None, description='For the hammering crowd')
+
+    def ranked(self, text):
+        return list(search_products(Product.objects.all(), text).order_by('-rank', '-id').values_list('id', flat=True))
+
+    def test_name_outweighs_category_outweighs_description(self):
+        # 'hammer' is in the claw hammer's name (A) and category (B), only in the others' descriptions (C)
+        self.assertEqual(self.ranked('hammer')[0], self.claw.id)
+        self.assertEqual(set(self.ranked('hammer')), {self.claw.id, self.kit.id, self.saw.id})
+
+    def test_english_stemming_and_stop_words(self):
+        self.assertEqual(set(self.ranked('the hammers')), {self.claw.id, self.kit.id, self.saw.id})
+        self.assertEqual(self.ranked('sawing'), [self.saw.id])
+
+    def test_matches_are_found_through_the_gin_index(self):
+        with connection.cursor() as cursor:
+            # The tables are tiny; make the planner show the plan it uses at scale
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = search_products(Product.objects.all(), 'hammer').explain()
+        self.assertIn('catalog_product_search_document_idx', plan)
+
+
+class ProductSuggestTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        vendor = create_vendor()
+        cls.flour = Category.objects.create(name='Flour', slug='flour')
+        cls.bag = create_product(vendor, 'Flour bag 50kg', price=100, stock=5, description='d')
+        cls.wheat = create_product(vendor, 'Premium wheat flour', price=100, stock=5, description='d')
+        cls.sugar = create_product(vendor, 'Sugar', price=100, stock=5, description='d')
+
+    def setUp(self):
+        typeahead.rebuild()
+
+    def suggest(self, text, **params):
+        return [(s['type'], s['id']) for s in APIClient().get('/api/products/suggest/', {'q': text, **params}).data]
+
+    def test_word_prefixes_without_touching_the_database(self):
+        with self.assertNumQueries(0):
+            names = self.suggest('FLO')
+        # Name starts first, categories before products; mid-name matches after
+        self.assertEqual(names, [
+            ('category', self.flour.id), ('product', self.bag.id), ('product', self.wheat.id),
+        ])
+        self.assertEqual(self.suggest('whe'), [('product', self.wheat.id)])
+        self.assertEqual(self.suggest('flo', limit='1'), [('category', self.flour.id)])
+        self.assertEqual(self.suggest('  '), [])
+        self.assertEqual(APIClient().get('/api/products/suggest/', {'q': 'f', 'limit': 'all'}).status_code, 400)
+
+    def test_saves_and_deletes_reach_the_index_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sugar.name = 'Cane sugar'
+            self.sugar.save()
+            self.bag.delete()
+        self.assertEqual(self.suggest('cane'), [('product', self.sugar.id)])
+        self.assertEqual(self.suggest('flour'), [('category', self.flour.id), ('product', self.wheat.id)])
+
+    def test_unbuilt_index_answers_at_once_and_loads_in_the_background(self):
+        with mock.patch('catalog.typeahead.index', typeahead.PrefixIndex()), \
+                mock.patch('catalog.typeahead.schedule_reload') as schedule_reload:
+            with self.assertNumQueries(0):
+                self.assertEqual(self.suggest('flo'), [])
+            schedule_reload.assert_called_once_with()
+
+    def test_server_processes_start_loading_at_boot(self):
+        for module in ('core.wsgi', 'core.asgi'):
+            sys.modules.pop(module, None)
+            with mock.patch('catalog.typeahead.schedule_reload') as schedule_reload:
+                importlib.import_module(module)
+            schedule_reload.assert_called_once_with()
+
+    def test_failed_load_is_retried_after_a_delay_not_per_keystroke(self):
+        with mock.patch('catalog.typeahead.index', typeahead.PrefixIndex()), \
+                mock.patch('catalog.typeahead._reload', None), mock.patch('catalog.typeahead._failed_at', None), \
+                mock.patch('catalog.models.Product.objects.values_list', side_effect=DatabaseError):
+            with self.assertLogs('catalog.typeahead', 'ERROR'):
+                typeahead.schedule_reload().result()
+            with mock.patch.object(typeahead._reload_executor, 'submit') as submit:
+                for text in ('f', 'fl', 'flo'):
+                    self.assertEqual(self.suggest(text), [])
+            submit.assert_not_called()
+
+            # The aborted load stops collecting changes to replay
+            typeahead.index.put('product', self.sugar.id, 'Sugar')
+            self.assertIsNone(typeahead.index._replay)
+
+    def test_changes_during_a_reload_are_not_lost(self):
+        typeahead.index.begin_load()
+        typeahead.index.put('product', self.sugar.id, 'Brown sugar')
+        # The reload read the database before the rename
+        typeahead.index.load([('product', self.sugar.id, 'Sugar')])
+        self.assertEqual(self.suggest('brown'), [('product', self.sugar.id)])
+
+
+class ProductFacetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ann = create_vendor('ann')
+        cls.bob = create_vendor('bob')
+        cls.food = Category.objects.create(name='Food', slug='food')
+        cls.tools = Category.objects.create(name='Tools', slug='tools')
+        for seller, category, name, price, stock in [
+            (cls.ann, cls.food, 'Rice', 800, 5),
+            (cls.ann, cls.food, 'Sugar', 1500, 0),
+            (cls.bob, cls.food, 'Flour', 4000, 2),
+            (cls.bob, cls.tools, 'Hammer', 25000, 1),
+            (cls.bob, cls.tools, 'Drill', 150000, 0),
+        ]:
+            create_product(seller, name, price=price, stock=stock, description='d', category=category)
+
+    def facets(self, **params):
+        response = APIClient().get('/api/products/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        return {
+            'total': data['total'],
+            'categories': {c['name']: c['count'] for c in data['categories']},
+            'sellers': {s['username']: s['count'] for s in data['sellers']},
+            'prices': {p['key']: p['count'] for p in data['prices'] if p['count']},
+            'in_stock': data['in_stock']['in_stock'],
+        }
+
+    def test_one_grouped_query_per_facet(self):
+        with self.assertNumQueries(4):
+            facets = self.facets()
+        self.assertEqual(facets, {
+            'total': 5,
+            'categories': {'Food': 3, 'Tools': 2},
+            'sellers': {'ann': 2, 'bob': 3},
+            'prices': {'0-1000': 1, '1000-5000': 2, '20000-100000': 1, '100000-': 1},
+            'in_stock': 3,
+        })
+
+    def test_each_facet_ignores_only_its_own_filter(self):
+        facets = self.facets(category=self.food.id, in_stock='true')
+        self.assertEqual(facets['total'], 2)
+        # Other categories stay visible (with the stock filter applied) ...
+        self.assertEqual(facets['categories'], {'Food': 2, 'Tools': 1})
+        # ... while the other facets narrow down to in-stock food
+        self.assertEqual(facets['sellers'], {'ann': 1, 'bob': 1})
+        self.assertEqual(facets['prices'], {'0-1000': 1, '1000-5000': 1})
+        self.assertEqual(facets['in_stock'], 2)
+
+    def test_untracked_stock_counts_as_in_stock(self):
+        create_product(self.ann, 'Salt', price=100, stock=None, description='d', category=self.food)
+        self.assertEqual(self.facets(in_stock='true')['categories'], {'Food': 3, 'Tools': 1})
+
+    def test_search_narrows_the_counts(self):
+        self.assertEqual(self.facets(search='hammer')['categories'], {'Tools': 1})
+
+    def test_list_takes_the_same_filters(self):
+        data = APIClient().get('/api/products/', {'price': '0-1000,20000-100000', 'seller': f'{self.ann.id},{self.bob.id}'}).data
+        self.assertEqual({card['name'] for card in data['results']}, {'Rice', 'Hammer'})
+        self.assertEqual(APIClient().get('/api/products/', {'price': 'cheap'}).status_code, 400)
+        # Band keys survive being typed straight into a URL
+        data = APIClient().get('/api/products/?price=100000-').data
+        self.assertEqual([card['name'] for card in data['results']], ['Drill'])
+        self.assertEqual(APIClient().get('/api/products/facets/', {'in_stock': 'maybe'}).status_code, 400)
+
+
+class ProductRatingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        vendor = create_vendor()
+        cls.buyer = create_buyer()
+        cls.product = create_product(vendor, 'Rice', price=100, stock=5, description='d')
+
+    def review(self, rating):
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        return client.post('/api/products/reviews/create/', {'product_id': self.product.id, 'rating': rating, 'comment': 'ok'})
+
+    def test_reviews_update_the_aggregates(self):
+        for rating in (5, 4, 2):
+            self.assertEqual(self.review(rating).status_code, 201)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (3, 11))
+        self.assertAlmostEqual(self.product.average_rating, 11 / 3)
+
+        detail = APIClient().get(f'/api/products/{self.product.id}/').data
+        self.assertNotIn('reviews', detail)
+        self.assertEqual(detail['review_count'], 3)
+        self.assertEqual(self.review(6).status_code, 400)
+
+    def test_review_needs_a_real_product(self):
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        url = '/api/products/reviews/create/'
+        self.assertEqual(client.post(url, {'rating': 5, 'comment': 'ok'}).status_code, 400)
+        self.assertEqual(client.post(url, {'product_id': 'rice', 'rating': 5, 'comment': 'ok'}).status_code, 400)
+        self.assertEqual(client.post(url, {'product_id': 999999, 'rating': 5, 'comment': 'ok'}).status_code, 404)
+        self.assertFalse(Review.objects.exists())
+
+    def test_product_edit_keeps_reviews_counted_meanwhile(self):
+        # The vendor's copy was loaded before the review came in
+        stale = Product.objects.get(pk=self.product.pk)
+        self.review(5)
+        serializer = ProductSerializer(stale, data={'price': 250}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, 250)
+        self.assertEqual((self.product.rating_count, self.product.rating_sum, self.product.average_rating), (1, 5, 5.0))
+
+    def test_reviews_are_paged_newest_first(self):
+        for rating in (1, 2, 3):
+            self.review(rating)
+        page = APIClient().get(f'/api/products/{self.product.id}/reviews/', {'page_size': 2}).data
+        self.assertEqual([r['rating'] for r in page['results']], [3, 2])
+        rest = APIClient().get(page['next']).data
+        self.assertEqual([r['rating'] for r in rest['results']], [1])
+        self.assertIsNone(rest['next'])
+        self.assertEqual(APIClient().get('/api/products/999999/reviews/').status_code, 404)
+
+    def test_reconcile_fixes_drift(self):
+        self.review(4)
+        # Written behind record_review()'s back
+        Review.objects.create(product=self.product, user=self.buyer, rating=2, comment='ok')
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_ratings', '--check-only', stdout=StringIO())
+        call_command('reconcile_ratings', stdout=StringIO())
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum, self.product.average_rating), (2, 6, 3.0))
+        out = StringIO()
+        call_command('reconcile_ratings', '--check-only', stdout=out)
+        self.assertIn('match', out.getvalue())
@@ -0,0 +1,196 @@
+import bisect
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# 👇 TYPEAHEAD (search box suggestions)
+# Each server process keeps a sorted array of (key, kind, id, label, ...) entries, one per
+# word start of a product or category name: "Leather boot" gives "leather boot" and
+# "boot". All keys starting with what was typed sit next to each other, so a lookup
+# is one bisect plus a short scan, with no database round-trip.
+# Saves in this process are applied straight away (the signals in models.py); the
+# whole index is reloaded in the background every TYPEAHEAD_REFRESH seconds, which
+# picks up edits made through other processes. The first load starts when a server
+# process boots (core/wsgi.py, core/asgi.py). Lookups never wait for a load: until
+# it lands they answer with no suggestions.
+TYPEAHEAD_REFRESH = getattr(settings, 'TYPEAHEAD_REFRESH', 300)
+
+# After a failed load, wait this long before trying again (not once per keystroke)
+TYPEAHEAD_RETRY_DELAY = getattr(settings, 'TYPEAHEAD_RETRY_DELAY', 30)
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+# Entries looked at per lookup before picking the best `limit` (keeps short prefixes cheap)
+SCAN_LIMIT = 200
+
+# Longer keys only cost memory: nobody types further than this
+MAX_KEY_LENGTH = 40
+
+# Categories first, then products
+KIND_ORDER = {'category': 0, 'product': 1}
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def _entries(kind, obj_id, label):
+    name = normalize(label)
+    starts = {match.start() for match in re.finditer(r'\w+', name)}
+    return [(name[start:start + MAX_KEY_LENGTH], kind, obj_id, label, start == 0) for start in sorted(starts)]
+
+
+class PrefixIndex:
+
+    def __init__(self):
+        self._entries = []
+        self._by_object = {}
+        self._lock = threading.Lock()
+        # Changes that arrive while a reload is reading the database, replayed on top of it
+        self._replay = None
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._by_object)
+
+    def begin_load(self):
+        with self._lock:
+            self._replay = []
+
+    def abort_load(self):
+        # The load never arrives, so stop recording changes for it
+        with self._lock:
+            self._replay = None
+
+    def load(self, objects):
+        """Swap in a fresh index built from (kind, id, label) triples."""
+        by_object = {(kind, obj_id): _entries(kind, obj_id, label) for kind, obj_id, label in objects}
+        entries = sorted(entry for keys in by_object.values() for entry in keys)
+        with self._lock:
+            self._entries, self._by_object = entries, by_object
+            for change in self._replay or []:
+                self._apply(*change)
+            self._replay = None
+            self.built_at = time.monotonic()
+
+    def put(self, kind, obj_id, label):
+        self._change(kind, obj_id, label)
+
+    def remove(self, kind, obj_id):
+        self._change(kind, obj_id, None)
+
+    def _change(self, kind, obj_id, label):
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((kind, obj_id, label))
+            self._apply(kind, obj_id, label)
+
+    def _apply(self, kind, obj_id, label):
+        for entry in self._by_object.pop((kind, obj_id), []):
+            position = bisect.bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+        if label is not None:
+            entries = _entries(kind, obj_id, label)
+            for entry in entries:
+                bisect.insort(self._entries, entry)
+            self._by_object[(kind, obj_id)] = entries
+
+    def suggest(self, text, limit=DEFAULT_LIMIT):
+        """
+        The best `limit` names with a word starting with `text`: names that start
+        with it before names that only contain it, categories before products,
+        shorter names first.
+        """
+        prefix = normalize(text)[:MAX_KEY_LENGTH]
+        if not prefix:
+            return []
+        found = {}
+        with self._lock:
+            position = bisect.bisect_left(self._entries, (prefix,))
+            for key, kind, obj_id, label, name_start in self._entries[position:position + SCAN_LIMIT]:
+                if not key.startswith(prefix):
+                    break
+                score = (not name_start, KIND_ORDER[kind], len(label), label)
+                if (kind, obj_id) not in found or score < found[(kind, obj_id)]:
+                    found[(kind, obj_id)] = score
+        best = heapq.nsmallest(limit, found.items(), key=lambda item: item[1])
+        return [{"type": kind, "id": obj_id, "name": score[3]} for (kind, obj_id), score in best]
+
+
+index = PrefixIndex()
+
+
+def rebuild():
+    """Reload the whole index from the database (names only: two narrow queries)."""
+    from .models import Category, Product
+
+    index.begin_load()
+    try:
+        objects = [('category', pk, name) for pk, name in Category.objects.values_list('id', 'name')]
+        objects += [('product', pk, name) for pk, name in Product.objects.values_list('id', 'name').iterator(chunk_size=5000)]
+    except BaseException:
+        index.abort_load()
+        raise
+    index.load(objects)
+    return len(objects)
+
+
+# 👇 Background reloads: one at a time, the current index keeps answering meanwhile
+_reload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='typeahead-reload')
+_reload_lock = threading.Lock()
+_reload = None
+_failed_at = None
+
+
+def _reset_after_fork():
+    # A server that imports the app before forking its workers (e.g. gunicorn --preload)
+    # hands each child a copy of the parent's reload state but not its thread
+    global _reload_executor, _reload_lock, _reload
+    _reload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='typeahead-reload')
+    _reload_lock = threading.Lock()
+    _reload = None
+    index._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _reload_in_background():
+    global _failed_at
+    try:
+        rebuild()
+        _failed_at = None
+    except Exception:
+        _failed_at = time.monotonic()
+        logger.exception("Typeahead index reload failed")
+    finally:
+        # The worker thread has its own connection; don't leave it open
+        connection.close()
+
+
+def schedule_reload():
+    global _reload
+    with _reload_lock:
+        retry_later = _failed_at is not None and time.monotonic() - _failed_at < TYPEAHEAD_RETRY_DELAY
+        if not retry_later and (_reload is None or _reload.done()):
+            _reload = _reload_executor.submit(_reload_in_background)
+        return _reload
+
+
+def suggest(text, limit=DEFAULT_LIMIT):
+    # The first lookup in a process starts the load and, like every lookup, answers
+    # from whatever is in memory right now (nothing, until the load lands)
+    if index.built_at is None or time.monotonic() - index.built_at > TYPEAHEAD_REFRESH:
+        schedule_reload()
+    return index.suggest(text, limit)
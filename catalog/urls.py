@@ -5,14 +5,20 @@ from .views import (
     ProductCreateView, 
     ReviewCreateView, 
     CategoryListView,
-    VendorProductListView  # 👈 Make sure this is imported!
+    VendorProductListView,  # 👈 Make sure this is imported!
+    ProductSuggestView,
+    ProductFacetView,
+    ProductReviewListView,
 )
 
 urlpatterns = [
     # 1. Public Marketplace URLs
     path('', ProductListView.as_view(), name='product_list'),
     path('<int:pk>/', ProductDetailView.as_view(), name='product_detail'),
+    path('<int:pk>/reviews/', ProductReviewListView.as_view(), name='product_reviews'),
     path('categories/', CategoryListView.as_view(), name='category_list'),
+    path('suggest/', ProductSuggestView.as_view(), name='product_suggest'),
+    path('facets/', ProductFacetView.as_view(), name='product_facets'),
 
     # 2. Buying & Selling URLs
     path('create/', ProductCreateView.as_view(), name='product_create'),
@@ -1,19 +1,55 @@
-from rest_framework import generics, permissions, parsers, filters
+from rest_framework import generics, permissions, parsers
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import Product, Category, Review
-from .serializers import ProductSerializer, ReviewSerializer
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.functions import Substr
+from django.shortcuts import get_object_or_404
+from .models import Product, Category, Review, ProductImage
+from .serializers import ProductSerializer, ProductCardSerializer, ReviewSerializer
+from .pagination import ProductCursorPagination, ProductSearchPagination, ReviewCursorPagination
+from .ratings import record_review
+from .facets import apply_filters, facet_counts, parse_filters
+from .search import search_products
+from . import typeahead
 
 # 👇 IMPORT THE NEW PERMISSION
 from .permissions import IsVendorOrAdmin
 
 # 1. LIST PRODUCTS (Anyone can see this)
+# 👇 Cards only: a fixed number of queries per page (products + seller + category in one,
+# one for the cover images), however many reviews and photos the products have.
+# The rating summary is read straight off the product (catalog/ratings.py).
+# The full nested payload lives on ProductDetailView.
+# ?search= goes through the full-text index (catalog/search.py), best match first;
+# category/seller/price/in_stock filters are the facets in catalog/facets.py.
 class ProductListView(generics.ListAPIView):
-    queryset = Product.objects.all().order_by('-created_at')
-    serializer_class = ProductSerializer
+    serializer_class = ProductCardSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['name', 'description', 'category__name'] 
+
+    @property
+    def search_text(self):
+        return self.request.query_params.get('search', '').strip()
+
+    @property
+    def pagination_class(self):
+        return ProductSearchPagination if self.search_text else ProductCursorPagination
+
+    def get_queryset(self):
+        products = (
+            Product.objects.select_related('seller', 'category')
+            .defer('description')
+            .annotate(summary=Substr('description', 1, 160))
+            .prefetch_related(Prefetch('images', queryset=ProductImage.objects.order_by('id')[:1], to_attr='cover'))
+        )
+        try:
+            products = apply_filters(products, parse_filters(self.request.query_params))
+        except ValueError as e:
+            raise ValidationError({"error": str(e)})
+        if self.search_text:
+            return search_products(products, self.search_text).order_by('-rank', '-id')
+        return products.order_by('-created_at', '-id')
 
 # 2. PRODUCT DETAIL & EDIT (The Fix is Here!) 🛠️
 class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -50,9 +86,14 @@ class ReviewCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        product_id = self.request.data.get('product_id')
-        product = Product.objects.get(id=product_id)
-        serializer.save(user=self.request.user, product=product)
+        product_id = str(self.request.data.get('product_id', ''))
+        if not product_id.isdigit():
+            raise ValidationError({'product_id': "Must be a product id"})
+        product = get_object_or_404(Product, id=product_id)
+        # The review and its product's rating aggregates land together or not at all
+        with transaction.atomic():
+            review = serializer.save(user=self.request.user, product=product)
+            record_review(product.id, review.rating)
 
 # 5. CATEGORIES
 class CategoryListView(APIView):
@@ -68,4 +109,46 @@ class VendorProductListView(generics.ListAPIView):
 
     def get_queryset(self):
         # Filter products to return ONLY the ones created by the current user
-        return Product.objects.filter(seller=self.request.user).order_by('-created_at')
\ No newline at end of file
+        return Product.objects.filter(seller=self.request.user).order_by('-created_at')
+
+# 7. SEARCH BOX SUGGESTIONS (as you type)
+# 👇 Answered from the in-memory prefix index (catalog/typeahead.py): no database query.
+# Anonymous on purpose - authenticating a JWT would cost a user lookup per keystroke.
+class ProductSuggestView(APIView):
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        limit = request.query_params.get('limit', str(typeahead.DEFAULT_LIMIT))
+        if not limit.isdigit():
+            raise ValidationError({'limit': "Must be a number"})
+        limit = min(max(int(limit), 1), typeahead.MAX_LIMIT)
+        return Response(typeahead.suggest(request.query_params.get('q', ''), limit))
+
+# 8. FACET COUNTS (the filter sidebar)
+# 👇 Same filters (and ?search=) as the product list; one grouped query per facet
+class ProductFacetView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            filters = parse_filters(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        products = Product.objects.all()
+        search = request.query_params.get('search', '').strip()
+        if search:
+            products = search_products(products, search)
+        return Response(facet_counts(products, filters))
+
+# 9. A PRODUCT'S REVIEWS (newest first, a page at a time)
+# 👇 Kept out of the product payload, which would otherwise grow with every review
+class ProductReviewListView(generics.ListAPIView):
+    serializer_class = ReviewSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = ReviewCursorPagination
+
+    def get_queryset(self):
+        product = get_object_or_404(Product.objects.only('id'), pk=self.kwargs['pk'])
+        return Review.objects.filter(product=product).select_related('user')
@@ -17,5 +17,11 @@ class Message(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # A conversation's messages in order
+            models.Index(fields=['conversation', 'timestamp'], name='message_conv_time_idx'),
+        ]
+
     def __str__(self):
         return f"Message from {self.sender.username}"
\ No newline at end of file
@@ -1,3 +1,22 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from core.query_plans import plan_problems, prefer_indexes
+from .models import Conversation, Message
+from .views import ConversationDetailView
 
-# Create your tests here.
+
+class MessageQueryPlanTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', password='x')
+        cls.other = User.objects.create_user('vendor', password='x')
+        cls.conversations = [Conversation.objects.create() for _ in range(3)]
+        for conversation in cls.conversations:
+            for i in range(20):
+                Message.objects.create(conversation=conversation, sender=cls.user, recipient=cls.other, body=f'msg {i}')
+
+    def test_conversation_messages_need_no_scan_or_sort(self):
+        view = ConversationDetailView(kwargs={'conversation_id': self.conversations[0].id})
+        with prefer_indexes():
+            self.assertEqual(plan_problems(view.get_queryset()), [])
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Start loading the search box suggestions in the background now, not on the first keystroke
+from catalog import typeahead  # noqa: E402
+typeahead.schedule_reload()
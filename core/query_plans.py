@@ -0,0 +1,53 @@
+import re
+from contextlib import contextmanager
+from django.db import connection
+
+# 👇 QUERY PLAN CHECKS (used by the apps' tests to keep hot lookups on their indexes)
+# What a regressed plan looks like on each backend: a full table scan, or a sort step
+# that the index order should have made unnecessary.
+PROBLEMS = {
+    'sqlite': [
+        (re.compile(r'\bSCAN (?!CONSTANT ROW)(\w+)(?!.*USING (COVERING )?INDEX)'), 'full scan of {}'),
+        (re.compile(r'USE TEMP B-TREE FOR (ORDER BY|RIGHT PART OF ORDER BY)'), 'extra sort ({})'),
+    ],
+    'postgresql': [
+        (re.compile(r'Seq Scan on (\w+)'), 'full scan of {}'),
+        (re.compile(r'(?:->\s+|^\s*)((?:Incremental )?Sort)\s+\('), 'extra sort ({})'),
+    ],
+}
+
+
+def plan_problems(queryset):
+    """
+    Return a list of problems found in the EXPLAIN output for `queryset`
+    (empty when it runs as index lookups/range scans). Backends other than
+    SQLite and PostgreSQL are not checked.
+    """
+    patterns = PROBLEMS.get(connection.vendor)
+    if patterns is None:
+        return []
+    problems = []
+    for line in queryset.explain().splitlines():
+        for pattern, message in patterns:
+            match = pattern.search(line)
+            if match:
+                problems.append(f"{message.format(match.group(1))}: {line.strip()}")
+    return problems
+
+
+@contextmanager
+def prefer_indexes():
+    """
+    Test tables only hold a handful of rows, where PostgreSQL rightly prefers a
+    sequential scan. Price those out so the plan shows which indexes *can* serve
+    the query; a missing index still shows up as a Seq Scan.
+    """
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SET enable_seqscan = off')
+        try:
+            yield
+        finally:
+            cursor.execute('RESET enable_seqscan')
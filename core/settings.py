@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 import dj_database_url  # 👈 Added this for Render
+from corsheaders.defaults import default_headers
 
 """
 Django settings for core project.
@@ -133,6 +134,9 @@ if extra_origin:
 
 # Also allow credentials (important for login cookies)
 CORS_ALLOW_CREDENTIALS = True
+
+# Checkout sends an Idempotency-Key header so retries never double-order
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 # --- UPDATED CORS SETTINGS END ---
 
 # SETTINGS FOR UPLOADED FILES (IMAGES)
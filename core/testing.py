@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from catalog.models import Product
+
+# 👇 SHARED TEST DATA (used by the apps' tests)
+# Vendors are staff accounts, buyers plain ones; everybody's password is 'x'.
+
+
+def create_vendor(username='vendor'):
+    return User.objects.create_user(username, password='x', is_staff=True)
+
+
+def create_buyer(username='buyer'):
+    return User.objects.create_user(username, password='x')
+
+
+def create_product(seller, name='Cement', price=5000, stock=100, description='50kg', **fields):
+    return Product.objects.create(seller=seller, name=name, description=description, price=price, stock=stock, **fields)
+
+
+class MarketplaceTestCase(TestCase):
+    """
+    A vendor selling Cement (5000 a bag) and a buyer. With SECOND_VENDOR, also
+    `other_vendor` selling Sugar (900). Subclasses add their own data after
+    calling super().setUpTestData().
+    """
+    CEMENT_STOCK = 100
+    SECOND_VENDOR = False
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor()
+        cls.buyer = create_buyer()
+        cls.cement = create_product(cls.vendor, stock=cls.CEMENT_STOCK)
+        if cls.SECOND_VENDOR:
+            cls.other_vendor = create_vendor('other')
+            cls.sugar = create_product(cls.other_vendor, 'Sugar', price=900, description='1kg')
@@ -1,13 +1,49 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, IdempotencyKey, OrderStatusEvent, ArchivedOrder, ArchivedOrderItem
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
+    # Status, quantity and price changes go through the API: an edit here would skip the stock,
+    # the sales rollup, the status events and the sub-order status
+    readonly_fields = ['status', 'quantity', 'price']
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     # 👇 FIX: Changed 'buyer' to 'user' to match your model
-    list_display = ['id', 'user', 'total_price', 'is_paid', 'created_at']
-    list_filter = ['is_paid', 'created_at']
-    inlines = [OrderItemInline]
\ No newline at end of file
+    list_display = ['id', 'user', 'total_price', 'is_paid', 'status', 'created_at']
+    list_filter = ['is_paid', 'status', 'created_at']
+    # Derived from the items' statuses (orders/events.py)
+    readonly_fields = ['status']
+    inlines = [OrderItemInline]
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ['key', 'user', 'response_code', 'created_at', 'expires_at']
+    search_fields = ['key']
+
+@admin.register(OrderStatusEvent)
+class OrderStatusEventAdmin(admin.ModelAdmin):
+    list_display = ['order', 'item', 'vendor', 'from_status', 'to_status', 'created_at']
+    list_filter = ['to_status']
+    raw_id_fields = ['order', 'item', 'vendor']
+
+    # 👇 The log is append-only: timelines and SLA figures are computed from it
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'total_price', 'status', 'created_at', 'archived_at']
+    list_filter = ['status']
+    inlines = [ArchivedOrderItemInline]
\ No newline at end of file
@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+GRANULARITIES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# Hard cap on the number of points one request can ask for
+MAX_BUCKETS = 400
+
+
+def bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(weeks=1)
+    if granularity == 'month':
+        return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return day + timedelta(days=1)
+
+
+def buckets(start, end, granularity):
+    current = bucket_start(start, granularity)
+    while current <= end:
+        yield current
+        current = next_bucket(current, granularity)
+
+
+def count_buckets(start, end, granularity):
+    if granularity == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    if granularity == 'week':
+        return (bucket_start(end, 'week') - bucket_start(start, 'week')).days // 7 + 1
+    return (end - start).days + 1
+
+
+def sales_series(daily, start, end, granularity):
+    """
+    Dense revenue / units / orders series over the VendorDailySales rows in `daily`.
+
+    The grouping runs in the database (at most MAX_BUCKETS rows come back);
+    buckets with no sales are filled with zeros here.
+    """
+    trunc = GRANULARITIES[granularity]
+    rows = (
+        daily.filter(day__gte=start, day__lte=end)
+        .annotate(period=trunc('day'))
+        .values('period')
+        .annotate(revenue=Sum('revenue'), units=Sum('units'), orders=Sum('order_count'))
+        .order_by('period')
+    )
+    found = {}
+    for row in rows:
+        period = row['period']
+        if hasattr(period, 'date'):
+            period = period.date()
+        found[period] = row
+
+    series = []
+    for period in buckets(start, end, granularity):
+        row = found.get(period, {})
+        series.append({
+            "period": period.isoformat(),
+            "revenue": row.get('revenue') or Decimal('0'),
+            "units": row.get('units') or 0,
+            "orders": row.get('orders') or 0,
+        })
+    return series
@@ -0,0 +1,62 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, VendorOrder
+from .waybill import invalidate_waybill
+
+# Finished orders older than this many days move to the archive tables
+ARCHIVE_AFTER_DAYS = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180)
+
+# Only orders that can no longer change are archived
+ARCHIVABLE_STATUSES = ('DELIVERED', 'RETURNED')
+
+ORDER_FIELDS = ['id', 'user_id', 'total_price', 'is_paid', 'created_at', 'status', 'phone', 'address']
+ITEM_FIELDS = ['id', 'order_id', 'product_id', 'price', 'quantity', 'status', 'vendor_order_id']
+
+
+def archive_cutoff(days=None):
+    return timezone.now() - timedelta(days=ARCHIVE_AFTER_DAYS if days is None else days)
+
+
+def reaches_archive(start):
+    """Does a list/export starting on `start` (a date, or None) need the archive tables?"""
+    return start is not None and start < timezone.localdate(archive_cutoff())
+
+
+def archivable(cutoff):
+    return Order.objects.filter(created_at__lt=cutoff, status__in=ARCHIVABLE_STATUSES)
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Move up to `batch_size` finished orders created before `cutoff` (and their
+    items) into the archive. Copy and delete happen in one transaction, so an
+    interrupted run never loses or duplicates an order: running again simply
+    continues with whatever is still live. Returns the number of orders moved.
+    """
+    with transaction.atomic():
+        # Skip rows another request is updating right now; the next run gets them
+        orders = list(
+            archivable(cutoff).select_for_update(skip_locked=True)
+            .order_by('id').values(*ORDER_FIELDS)[:batch_size]
+        )
+        if not orders:
+            return 0
+        order_ids = [order['id'] for order in orders]
+        items = OrderItem.objects.filter(order_id__in=order_ids).values(*ITEM_FIELDS)
+
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**order) for order in orders])
+        ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**item) for item in items])
+        # Status events and sub-orders stay where they are (they outlive the rows they point at)
+        VendorOrder.objects.filter(order_id__in=order_ids).update(archived=True)
+        Order.objects.filter(id__in=order_ids).delete()
+
+        # Their cached waybills will not be printed again
+        transaction.on_commit(lambda: _drop_waybills(order_ids))
+    return len(order_ids)
+
+
+def _drop_waybills(order_ids):
+    for order_id in order_ids:
+        invalidate_waybill(order_id)
@@ -0,0 +1,70 @@
+import time
+from django.core.cache import cache
+
+# 👇 DASHBOARD CACHE
+# Payloads are stored under a per-scope version number. Any write that touches a
+# vendor's items bumps that vendor's version (and the marketplace-wide one), so old
+# payloads are simply never read again - even one that a slow recompute stores *after*
+# the invalidation. Works with any Django cache backend (local-memory, file-based...);
+# with several server processes, point CACHES at a shared backend such as file-based.
+
+DASHBOARD_TTL = 300          # seconds a payload may live without any writes
+LOCK_TTL = 30                # seconds a recompute may hold the lock
+WAIT_STEP = 0.05             # how often waiting requests look for the fresh payload
+WAIT_LIMIT = 5               # give up waiting and compute ourselves after this long
+
+
+def scope_for(user):
+    return 'all' if user.is_superuser else str(user.id)
+
+
+def _version(scope):
+    key = f'dashboard:version:{scope}'
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a lost version key can never resurrect an old payload
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(vendor_ids):
+    """Drop the cached dashboards for these vendors (None = the superuser 'all' view)."""
+    for vendor_id in set(vendor_ids):
+        key = f'dashboard:version:{"all" if vendor_id is None else vendor_id}'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def get_dashboard(scope, compute):
+    """
+    Return the cached payload for `scope`, or build it with `compute()`.
+
+    Stampede protection: after an invalidation only the request that wins the
+    cache.add() lock recomputes; the others wait briefly for its result.
+    """
+    payload_key = f'dashboard:{scope}:{_version(scope)}'
+    payload = cache.get(payload_key)
+    if payload is not None:
+        return payload
+
+    lock_key = f'{payload_key}:lock'
+    have_lock = cache.add(lock_key, 1, timeout=LOCK_TTL)
+    if not have_lock:
+        waited = 0
+        while waited < WAIT_LIMIT:
+            time.sleep(WAIT_STEP)
+            waited += WAIT_STEP
+            payload = cache.get(payload_key)
+            if payload is not None:
+                return payload
+
+    try:
+        payload = compute()
+        cache.set(payload_key, payload, timeout=DASHBOARD_TTL)
+    finally:
+        if have_lock:
+            cache.delete(lock_key)
+    return payload
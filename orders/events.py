@@ -0,0 +1,114 @@
+from collections import defaultdict
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, OuterRef, Subquery
+from django.utils import timezone
+from .models import Order, OrderItem, OrderStatusEvent
+
+
+def derive_status(counts, current):
+    """
+    Master status of an order from {item status: count} of its items.
+
+    Returned items no longer hold the box back: it is SHIPPED once everything
+    else has shipped, DELIVERED once everything else has arrived.
+    """
+    live = {status for status, n in counts.items() if n and status != 'RETURNED'}
+    if not live:
+        return 'RETURNED' if counts else current
+    if live == {'DELIVERED'}:
+        return 'DELIVERED'
+    if live <= {'SHIPPED', 'DELIVERED'}:
+        return 'SHIPPED'
+    # Still waiting on items; PAID is set by hand and stays until something ships
+    return 'PAID' if current == 'PAID' else 'PENDING'
+
+
+def record_created_items(order, items):
+    """One event per freshly placed item, stamped with the order's creation time."""
+    OrderStatusEvent.objects.bulk_create([
+        OrderStatusEvent(
+            order=order, item=item, vendor_id=item.product.seller_id,
+            to_status=item.status, created_at=order.created_at,
+        )
+        for item in items
+    ])
+
+
+def record_status_events(items, new_status):
+    """
+    Append the item events for a status change and re-derive the master status
+    of the orders involved. `items` are the changed items as they were *before*
+    the change (each needs `product` loaded).
+    """
+    now = timezone.now()
+    OrderStatusEvent.objects.bulk_create([
+        OrderStatusEvent(
+            order_id=item.order_id, item=item, vendor_id=item.product.seller_id,
+            from_status=item.status, to_status=new_status, created_at=now,
+        )
+        for item in items
+    ])
+    sync_order_status({item.order_id for item in items}, now)
+
+
+def sync_order_status(order_ids, when=None):
+    """
+    Re-derive Order.status for these orders only: one grouped count over their
+    items, at most one UPDATE per resulting status, one INSERT of order events.
+    """
+    when = when or timezone.now()
+    # Lock the orders so two vendors shipping their halves at once both see the other's items
+    current = dict(
+        Order.objects.select_for_update().filter(id__in=order_ids).order_by('id').values_list('id', 'status')
+    )
+    counts = defaultdict(dict)
+    rows = OrderItem.objects.filter(order_id__in=current).values('order_id', 'status').annotate(n=Count('id'))
+    for row in rows:
+        counts[row['order_id']][row['status']] = row['n']
+
+    moves, events = defaultdict(list), []
+    for order_id, status in current.items():
+        derived = derive_status(counts[order_id], status)
+        if derived != status:
+            moves[derived].append(order_id)
+            events.append(OrderStatusEvent(order_id=order_id, from_status=status, to_status=derived, created_at=when))
+
+    for status, ids in moves.items():
+        Order.objects.filter(id__in=ids).update(status=status)
+    OrderStatusEvent.objects.bulk_create(events)
+    return {status: len(ids) for status, ids in moves.items()}
+
+
+# 👇 SLA: how long items take between two statuses, straight from the indexed events
+def transition_times(from_status, to_status, start=None, end=None, vendor=None):
+    """
+    {vendor_id: {"avg_hours": ..., "items": n}} for items that reached `to_status`
+    between `start` and `end` (dates, inclusive), timed from when they entered
+    `from_status`. Items with no recorded `from_status` event are left out.
+    """
+    entered = (
+        OrderStatusEvent.objects.filter(item=OuterRef('item'), to_status=from_status)
+        .order_by('created_at')
+        .values('created_at')[:1]
+    )
+    reached = OrderStatusEvent.objects.filter(item__isnull=False, to_status=to_status)
+    if vendor is not None:
+        reached = reached.filter(vendor=vendor)
+    if start:
+        reached = reached.filter(created_at__date__gte=start)
+    if end:
+        reached = reached.filter(created_at__date__lte=end)
+
+    rows = (
+        reached.annotate(entered_at=Subquery(entered))
+        .filter(entered_at__isnull=False)
+        .values('vendor')
+        .annotate(
+            avg=Avg(ExpressionWrapper(F('created_at') - F('entered_at'), output_field=DurationField())),
+            items=Count('id'),
+        )
+        .order_by('vendor')
+    )
+    return {
+        row['vendor']: {"avg_hours": round(row['avg'].total_seconds() / 3600, 2), "items": row['items']}
+        for row in rows
+    }
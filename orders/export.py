@@ -0,0 +1,81 @@
+import csv
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import OrderItem
+
+# One row per order line, with the order's own fields repeated
+COLUMNS = [
+    ('order_id', 'order_id'),
+    ('order_created_at', 'order__created_at'),
+    ('buyer', 'order__user__username'),
+    ('order_status', 'order__status'),
+    ('phone', 'order__phone'),
+    ('address', 'order__address'),
+    ('item_id', 'id'),
+    ('product_id', 'product_id'),
+    ('product', 'product__name'),
+    ('vendor', 'product__seller__username'),
+    ('quantity', 'quantity'),
+    ('price', 'price'),
+    ('item_status', 'status'),
+]
+
+# Rows fetched per round-trip of the server-side cursor
+CHUNK_SIZE = 2000
+
+
+def export_rows(items):
+    """
+    Yield tuples for the items in `items`, oldest order first.
+
+    values_list() + iterator() streams plain tuples through a server-side cursor
+    (on PostgreSQL), so no model instances or serializers are built and memory
+    stays flat however many rows there are.
+    """
+    return (
+        items.order_by('order__created_at', 'order_id', 'id')
+        .values_list(*[field for _, field in COLUMNS])
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(sources):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in COLUMNS])
+    for items in sources:
+        for row in export_rows(items):
+            yield writer.writerow(value.isoformat() if hasattr(value, 'isoformat') else value for value in row)
+
+
+def ndjson_stream(sources):
+    names = [name for name, _ in COLUMNS]
+    encoder = DjangoJSONEncoder()
+    for items in sources:
+        for row in export_rows(items):
+            yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+FORMATS = {
+    'csv': (csv_stream, 'text/csv'),
+    'ndjson': (ndjson_stream, 'application/x-ndjson'),
+}
+
+
+def items_for(user, scope, model=OrderItem):
+    """
+    The items `user` may export in `scope` (None if the scope is not theirs), from
+    OrderItem or ArchivedOrderItem.
+    """
+    if scope == 'buyer':
+        return model.objects.filter(order__user=user)
+    if scope == 'vendor' and user.is_staff:
+        return model.objects.filter(product__seller=user)
+    if scope == 'manager' and user.is_superuser:
+        return model.objects.all()
+    return None
@@ -0,0 +1,74 @@
+import hashlib
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+# How long a stored response can be replayed (seconds). Default: 24 hours.
+IDEMPOTENCY_KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24)
+
+
+def request_fingerprint(data):
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return Response(
+            {"error": "Idempotency-Key was already used for a different request"},
+            status=422,
+        )
+    response = Response(record.response_body, status=record.response_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def run_idempotent(request, key, handler):
+    """
+    Run `handler()` at most once per (user, Idempotency-Key).
+
+    1. Replays are answered from one indexed lookup on (user, key).
+    2. Otherwise the key row is inserted *before* the handler runs, in the same
+       transaction as the order itself. A retry that arrives while the first
+       request is still in flight blocks on the unique index until that
+       transaction commits, then replays its stored answer instead of racing it.
+       If the first request crashes, its row rolls back and the retry simply
+       runs the handler itself.
+    """
+    user = request.user
+    fingerprint = request_fingerprint(request.data)
+    now = timezone.now()
+
+    # 1. FAST PATH: already answered
+    record = IdempotencyKey.objects.filter(user=user, key=key, expires_at__gt=now).first()
+    if record:
+        return _replay(record, fingerprint)
+
+    with transaction.atomic():
+        # Expired keys may be reused
+        IdempotencyKey.objects.filter(user=user, key=key, expires_at__lte=now).delete()
+
+        # 2. CLAIM THE KEY (waits here if another request holds it)
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=user,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL),
+                )
+        except IntegrityError:
+            record = IdempotencyKey.objects.get(user=user, key=key)
+            return _replay(record, fingerprint)
+
+        # 3. DO THE WORK and remember the answer
+        response = handler()
+        record.response_code = response.status_code
+        record.response_body = response.data
+        record.save(update_fields=['response_code', 'response_body'])
+
+    return response
@@ -0,0 +1,98 @@
+from collections import defaultdict
+from django.db import transaction
+from .models import OrderItem, VendorOrder
+from .stock import release_stock
+from .rollups import record_status_change
+from .events import record_status_events
+from .waybill import invalidate_waybill, schedule_prerender
+
+# Where an item may go next. PENDING -> DELIVERED covers pickup at the depot;
+# RETURNED is final.
+ALLOWED_TRANSITIONS = {
+    'PENDING': {'SHIPPED', 'DELIVERED', 'RETURNED'},
+    'SHIPPED': {'DELIVERED', 'RETURNED'},
+    'DELIVERED': {'RETURNED'},
+    'RETURNED': set(),
+}
+
+VALID_STATUSES = {value for value, _ in OrderItem.STATUS_CHOICES}
+
+
+class StatusUpdateError(Exception):
+    """Raised for a target status that is not one of OrderItem.STATUS_CHOICES."""
+
+
+def update_item_status(seller, order_ids, new_status):
+    """
+    Move `seller`'s items in the given orders to `new_status`.
+
+    All orders are handled in one transaction with a fixed number of statements:
+    SELECT ... FOR UPDATE of the seller's sub-orders and their items, one
+    set-based UPDATE each, then the stock / rollup / status-event bookkeeping.
+    An order whose items cannot make the transition is rejected as a whole and
+    left untouched.
+
+    Returns {order_id: {"result": ..., "items": n}} with result one of
+    updated / unchanged / rejected / not_found.
+    """
+    if new_status not in VALID_STATUSES:
+        raise StatusUpdateError(f"status must be one of: {', '.join(sorted(VALID_STATUSES))}")
+
+    order_ids = set(order_ids)
+    results = {order_id: {"result": "not_found", "items": 0} for order_id in order_ids}
+
+    with transaction.atomic():
+        # Lock the seller's sub-orders (the (order, vendor) unique index), then their items,
+        # remembering what the items looked like before the change
+        sub_orders = dict(
+            VendorOrder.objects.select_for_update()
+            .filter(vendor=seller, order_id__in=order_ids)
+            .order_by('id').values_list('id', 'order_id')
+        )
+        mine = OrderItem.objects.filter(vendor_order_id__in=sub_orders)
+        before = defaultdict(list)
+        for item in mine.select_related('order', 'product').select_for_update(of=('self',)).order_by('id'):
+            before[item.order_id].append(item)
+
+        accepted, changed = [], []
+        for order_id, items in before.items():
+            moving = [item for item in items if item.status != new_status]
+            if not moving:
+                results[order_id] = {"result": "unchanged", "items": 0}
+            elif any(new_status not in ALLOWED_TRANSITIONS[item.status] for item in moving):
+                stuck = sorted({item.status for item in moving if new_status not in ALLOWED_TRANSITIONS[item.status]})
+                results[order_id] = {
+                    "result": "rejected",
+                    "items": 0,
+                    "error": f"Cannot move {'/'.join(stuck)} items to {new_status}",
+                }
+            else:
+                results[order_id] = {"result": "updated", "items": len(moving)}
+                accepted.append(order_id)
+                changed.extend(moving)
+
+        if changed:
+            # 👇 ONE UPDATE for every accepted order's items, one for their sub-orders
+            moved = {item.vendor_order_id for item in changed}
+            mine.filter(vendor_order_id__in=moved).exclude(status=new_status).update(status=new_status)
+            VendorOrder.objects.filter(id__in=moved).update(status=new_status)
+
+            # Returned goods go back into stock (only the first time an item is returned)
+            if new_status == 'RETURNED':
+                release_stock(changed)
+            record_status_change(changed, new_status)
+            # Append the events and bring the orders' master status up to date
+            record_status_events(changed, new_status)
+
+            # The printed statuses changed, so the cached waybills are stale
+            transaction.on_commit(lambda: _after_commit(accepted, new_status))
+
+    return results
+
+
+def _after_commit(order_ids, new_status):
+    for order_id in order_ids:
+        invalidate_waybill(order_id)
+        # 👇 Goods are leaving: have the new waybill ready before the depot prints it
+        if new_status == 'SHIPPED':
+            schedule_prerender(order_id)
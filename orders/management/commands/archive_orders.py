@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand
+from orders.archive import ARCHIVE_AFTER_DAYS, archivable, archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Move DELIVERED/RETURNED orders older than ORDER_ARCHIVE_AFTER_DAYS into the archive tables, "
+        "in small batches. Safe to stop at any time and run again: it carries on where it left off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=500, help="Orders moved per transaction")
+        parser.add_argument('--sleep', type=float, default=0.5, help="Pause between batches (seconds)")
+        parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be archived")
+
+    def handle(self, *args, **options):
+        # Fixed once per run, so orders that age past it mid-run wait for the next run
+        cutoff = archive_cutoff(options['older_than_days'])
+        if options['dry_run']:
+            self.stdout.write(f"{archivable(cutoff).count()} orders created before {cutoff:%Y-%m-%d} would be archived")
+            return
+
+        moved = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            count = archive_batch(cutoff, options['batch_size'])
+            if not count:
+                break
+            moved += count
+            batches += 1
+            self.stdout.write(f"  batch {batches}: {count} orders ({moved} so far)")
+            # 👇 Throttle: give the live traffic room between transactions
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Archived {moved} orders created before {cutoff:%Y-%m-%d}"))
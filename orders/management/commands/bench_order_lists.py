@@ -0,0 +1,128 @@
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from catalog.models import Product
+from orders.models import Order, OrderItem, VendorOrder
+
+BENCH_PREFIX = 'bench_orders_'
+
+
+@contextmanager
+def explicit_created_at():
+    # Seeded orders need spread-out dates, so switch off auto_now_add while inserting
+    field = Order._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Seed a large order history and compare the DISTINCT-join and EXISTS plans for the seller order lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1_000_000, help="Order items to seed")
+        parser.add_argument('--vendors', type=int, default=50)
+        parser.add_argument('--items-per-order', type=int, default=4)
+        parser.add_argument('--batch', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per query")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded data afterwards")
+        parser.add_argument('--reuse', action='store_true', help="Skip seeding and reuse data from a --keep run")
+
+    def handle(self, *args, **options):
+        if not options['reuse']:
+            self.seed(options)
+
+        vendor = User.objects.filter(username__startswith=f'{BENCH_PREFIX}vendor_').order_by('id').first()
+        if vendor is None:
+            self.stdout.write(self.style.ERROR("No seeded data found (run without --reuse first)"))
+            return
+
+        ordering = ('-created_at', '-id')
+        plans = {
+            'DISTINCT join': Order.objects.filter(items__product__seller=vendor).distinct().order_by(*ordering)[:20],
+            'EXISTS semi-join': Order.objects.for_seller(vendor).order_by(*ordering)[:20],
+        }
+
+        # Timing plans that disagree would be meaningless
+        pages = {label: [order.id for order in queryset] for label, queryset in plans.items()}
+        if len({tuple(ids) for ids in pages.values()}) != 1:
+            raise CommandError(f"The plans return different orders: {pages}")
+
+        analyze = connection.vendor == 'postgresql'
+        for label, queryset in plans.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}: median {statistics.median(timings):.2f} ms, best {min(timings):.2f} ms"))
+            self.stdout.write(queryset.explain(analyze=True) if analyze else queryset.explain())
+
+        if not options['keep']:
+            self.stdout.write("\nCleaning up seeded data...")
+            User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+
+    def seed(self, options):
+        per_order = options['items_per_order']
+        order_count = options['items'] // per_order
+        batch = options['batch']
+        self.stdout.write(f"Seeding {order_count * per_order:,} items across {order_count:,} orders...")
+
+        buyer = User.objects.create(username=f'{BENCH_PREFIX}buyer')
+        User.objects.bulk_create([
+            User(username=f'{BENCH_PREFIX}vendor_{i}', is_staff=True) for i in range(options['vendors'])
+        ])
+        vendors = list(User.objects.filter(username__startswith=f'{BENCH_PREFIX}vendor_'))
+        Product.objects.bulk_create([
+            Product(seller=vendor, name=f'Bench product {i}', description='benchmark', price=1000, stock=0)
+            for vendor in vendors for i in range(10)
+        ])
+        sellers = dict(Product.objects.filter(seller__in=vendors).values_list('id', 'seller_id'))
+        product_ids = list(sellers)
+
+        now = timezone.now()
+        rng = random.Random(42)
+        with explicit_created_at():
+            for start in range(0, order_count, batch):
+                size = min(batch, order_count - start)
+                with transaction.atomic():
+                    orders = Order.objects.bulk_create([
+                        Order(user=buyer, total_price=0, created_at=now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60)))
+                        for _ in range(size)
+                    ])
+                    if orders[0].pk is None:
+                        # Backends without RETURNING: fetch the ids we just inserted
+                        orders = list(Order.objects.filter(user=buyer).order_by('-id')[:size])
+                    items = [
+                        OrderItem(order=order, product_id=rng.choice(product_ids), price=1000, quantity=1)
+                        for order in orders for _ in range(per_order)
+                    ]
+                    # One sub-order per (order, seller), like place_order: the vendor lists read these
+                    lines = {}
+                    for item in items:
+                        lines.setdefault((item.order, sellers[item.product_id]), []).append(item)
+                    VendorOrder.objects.bulk_create([
+                        VendorOrder(
+                            order=order, vendor_id=seller_id, buyer=buyer, subtotal=1000 * len(group),
+                            item_count=len(group), created_at=order.created_at,
+                        )
+                        for (order, seller_id), group in lines.items()
+                    ], batch_size=batch)
+                    sub_orders = {
+                        (order_id, vendor_id): pk for order_id, vendor_id, pk in
+                        VendorOrder.objects.filter(order__in=orders).values_list('order_id', 'vendor_id', 'id')
+                    }
+                    for item in items:
+                        item.vendor_order_id = sub_orders[(item.order.id, sellers[item.product_id])]
+                    OrderItem.objects.bulk_create(items, batch_size=batch)
+                self.stdout.write(f"  {start + size:,} / {order_count:,} orders", ending='\r')
+        self.stdout.write("")
@@ -0,0 +1,84 @@
+import threading
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction, OperationalError
+from catalog.models import Product
+from orders.models import Order, OrderStatusEvent
+from orders.rollups import record_deleted_orders
+from orders.services import place_order
+from orders.stock import InsufficientStockError
+
+
+class Command(BaseCommand):
+    help = "Hammer one hot product from many threads and check that stock is never oversold."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--stock', type=int, default=500)
+        parser.add_argument('--quantity', type=int, default=1, help="Units per order")
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        quantity = options['quantity']
+
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                "SQLite serialises all writers; run against Postgres for meaningful numbers."
+            ))
+
+        buyer, _ = User.objects.get_or_create(username='bench_stock_buyer')
+        product = Product.objects.create(
+            name='BENCH Cement 50kg', description='Stock benchmark', price=5000, stock=options['stock']
+        )
+
+        counts = {'placed': 0, 'rejected': 0, 'retried': 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        place_order(buyer, [{'product_id': product.id, 'quantity': quantity}])
+                        key = 'placed'
+                    except InsufficientStockError:
+                        with lock:
+                            counts['rejected'] += 1
+                        return
+                    except OperationalError:
+                        # SQLite "database is locked" - just try again
+                        key = 'retried'
+                    with lock:
+                        counts[key] += 1
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        product.refresh_from_db()
+        sold = counts['placed'] * quantity
+        consistent = product.stock >= 0 and sold + product.stock == options['stock']
+
+        self.stdout.write(f"Threads:        {threads}")
+        self.stdout.write(f"Orders placed:  {counts['placed']}  (rejected: {counts['rejected']}, retried: {counts['retried']})")
+        self.stdout.write(f"Units sold:     {sold} / {options['stock']}  (left: {product.stock})")
+        self.stdout.write(f"Throughput:     {counts['placed'] / elapsed:.1f} orders/sec")
+
+        # Clean up the benchmark data, leaving the sales rollup and status history as they were
+        orders = list(Order.objects.filter(user=buyer).prefetch_related('items__product'))
+        with transaction.atomic():
+            record_deleted_orders(orders)
+            OrderStatusEvent.objects.filter(order_id__in=[order.id for order in orders]).delete()
+            Order.objects.filter(user=buyer).delete()
+            product.delete()
+            buyer.delete()
+
+        if not consistent:
+            raise CommandError("Stock accounting is WRONG (oversold or lost units)")
+        self.stdout.write(self.style.SUCCESS("✅ No overselling"))
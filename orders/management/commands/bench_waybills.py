@@ -0,0 +1,48 @@
+import os
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from orders.waybill import paginate, render_many
+
+
+def fake_waybill(n, lines):
+    order = SimpleNamespace(
+        id=n, created_at=datetime.now(timezone.utc), user=SimpleNamespace(username=f'buyer{n}'),
+        phone='08000000000', address='Depot 4, Apapa, Lagos', total_price=Decimal('125000.00'),
+    )
+    items = [
+        SimpleNamespace(id=i, product=SimpleNamespace(name=f'Cement 50kg #{i}'), quantity=10, price=Decimal('5000.00'), status='SHIPPED')
+        for i in range(lines)
+    ]
+    return order, items
+
+
+class Command(BaseCommand):
+    help = "Render waybills through the process pool at different worker counts and report pages/sec."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=400, help="Waybills to render")
+        parser.add_argument('--lines', type=int, default=8, help="Item lines per waybill")
+
+    def handle(self, *args, **options):
+        waybills = [fake_waybill(n, options['lines']) for n in range(options['pages'])]
+        pages = sum(len(paginate(items)) for _, items in waybills)
+        cores = os.cpu_count() or 1
+
+        workers = 1
+        counts = []
+        while workers < cores:
+            counts.append(workers)
+            workers *= 2
+        counts.append(cores)
+
+        self.stdout.write(f"{len(waybills)} waybills ({pages} pages), {cores} cores")
+        baseline = None
+        for workers in counts:
+            started = time.perf_counter()
+            render_many(waybills, workers=workers)
+            rate = pages / (time.perf_counter() - started)
+            baseline = baseline or rate
+            self.stdout.write(f"  {workers:>3} workers: {rate:8.1f} pages/sec  (x{rate / baseline:.2f})")
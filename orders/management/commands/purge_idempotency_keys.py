@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from orders.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses that are past their TTL."
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f"✅ Purged {deleted} expired idempotency keys"))
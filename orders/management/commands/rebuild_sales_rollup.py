@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from orders.rollups import rebuild_rollup, rollup_mismatches
+
+
+class Command(BaseCommand):
+    # Manual repair only, not part of deploys: the migrations backfill the rollup, and a
+    # rebuild locks it (holding up checkouts) while it aggregates the whole order history
+    help = "Rebuild the VendorDailySales rollup from the live and archived order items and verify it against the live aggregation."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check-only', action='store_true', help="Only compare, do not rebuild")
+
+    def handle(self, *args, **options):
+        if not options['check_only']:
+            rows = rebuild_rollup()
+            self.stdout.write(f"Rebuilt {rows} rollup rows")
+
+        mismatches = rollup_mismatches()
+        for (vendor_id, day), expected, actual in mismatches[:20]:
+            self.stdout.write(self.style.WARNING(f"vendor={vendor_id} day={day}: live={expected} rollup={actual}"))
+        if mismatches:
+            raise CommandError(f"❌ {len(mismatches)} rollup rows differ from the live aggregation")
+        self.stdout.write(self.style.SUCCESS("✅ Rollup matches the live aggregation"))
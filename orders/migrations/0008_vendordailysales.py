@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-18 15:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollup(apps, schema_editor):
+    # Same numbers as orders.rollups.live_daily_sales() for the fields that exist here
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    VendorDailySales = apps.get_model('orders', 'VendorDailySales')
+    counters = dict(
+        order_count=Count('order', distinct=True),
+        pending_count=Count('id', filter=Q(status='PENDING')),
+        delivered_count=Count('id', filter=Q(status='DELIVERED')),
+        delivered_sales=Sum('price', filter=Q(status='DELIVERED'), default=0),
+    )
+    items = OrderItem.objects.annotate(day=TruncDate('order__created_at'))
+    per_vendor = items.filter(product__seller__isnull=False).values('product__seller', 'day').annotate(**counters)
+    rows = [
+        VendorDailySales(vendor_id=row.pop('product__seller'), **row)
+        for row in per_vendor.order_by()
+    ]
+    rows += [VendorDailySales(vendor_id=None, **row) for row in items.values('day').annotate(**counters).order_by()]
+    VendorDailySales.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.IntegerField(default=0)),
+                ('delivered_count', models.IntegerField(default=0)),
+                ('delivered_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vendor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('vendor__isnull', False)), fields=('vendor', 'day'), name='unique_vendor_daily_sales'), models.UniqueConstraint(condition=models.Q(('vendor__isnull', True)), fields=('day',), name='unique_global_daily_sales')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
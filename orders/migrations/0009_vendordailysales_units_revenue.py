@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-18 15:48
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_units_revenue(apps, schema_editor):
+    # Fill the new counters on the rows 0008 backfilled (same numbers as live_daily_sales())
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    VendorDailySales = apps.get_model('orders', 'VendorDailySales')
+    counters = dict(
+        units=Sum('quantity', filter=~Q(status='RETURNED'), default=0),
+        revenue=Sum(
+            F('price') * F('quantity'), filter=~Q(status='RETURNED'), default=0,
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+    )
+    items = OrderItem.objects.annotate(day=TruncDate('order__created_at'))
+    for row in items.filter(product__seller__isnull=False).values('product__seller', 'day').annotate(**counters).order_by():
+        VendorDailySales.objects.filter(vendor_id=row['product__seller'], day=row['day']).update(
+            units=row['units'], revenue=row['revenue'],
+        )
+    for row in items.values('day').annotate(**counters).order_by():
+        VendorDailySales.objects.filter(vendor__isnull=True, day=row['day']).update(
+            units=row['units'], revenue=row['revenue'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_vendordailysales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendordailysales',
+            name='revenue',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='vendordailysales',
+            name='units',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_units_revenue, migrations.RunPython.noop),
+    ]
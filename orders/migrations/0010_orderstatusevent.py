@@ -0,0 +1,72 @@
+# Generated by Django 6.0 on 2026-10-18 16:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from collections import defaultdict
+from django.db import migrations, models
+
+
+def backfill_events(apps, schema_editor):
+    # Existing items only get one event: "in their current status since the order was placed".
+    # With no real PENDING start recorded they stay out of the SLA averages.
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    OrderStatusEvent = apps.get_model('orders', 'OrderStatusEvent')
+
+    events = []
+    counts = defaultdict(lambda: defaultdict(int))
+    items = OrderItem.objects.select_related('order', 'product').order_by('id')
+    for item in items.iterator(chunk_size=2000):
+        counts[item.order_id][item.status] += 1
+        events.append(OrderStatusEvent(
+            order_id=item.order_id, item_id=item.id, vendor_id=item.product.seller_id,
+            to_status=item.status, created_at=item.order.created_at,
+        ))
+        if len(events) >= 2000:
+            OrderStatusEvent.objects.bulk_create(events)
+            events = []
+    OrderStatusEvent.objects.bulk_create(events)
+
+    # Same rules as orders.events.derive_status
+    for order in Order.objects.only('id', 'status').iterator(chunk_size=2000):
+        if order.id not in counts:
+            continue
+        live = {status for status, n in counts[order.id].items() if status != 'RETURNED'}
+        if not live:
+            derived = 'RETURNED'
+        elif live == {'DELIVERED'}:
+            derived = 'DELIVERED'
+        elif live <= {'SHIPPED', 'DELIVERED'}:
+            derived = 'SHIPPED'
+        else:
+            derived = 'PAID' if order.status == 'PAID' else 'PENDING'
+        if derived != order.status:
+            Order.objects.filter(id=order.id).update(status=derived)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_vendordailysales_units_revenue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=20)),
+                ('to_status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='orders.orderitem')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='orders.order')),
+                ('vendor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['order', 'created_at'], name='statusevent_order_time_idx'), models.Index(fields=['item', 'to_status', 'created_at'], name='statusevent_item_status_idx'), models.Index(fields=['vendor', 'to_status', 'created_at'], name='statusevent_vendor_status_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
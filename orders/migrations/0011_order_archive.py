@@ -0,0 +1,64 @@
+# Generated by Django 6.0 on 2026-10-18 16:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_productimage'),
+        ('orders', '0010_orderstatusevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderstatusevent',
+            name='item',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='status_events', to='orders.orderitem'),
+        ),
+        migrations.AlterField(
+            model_name='orderstatusevent',
+            name='order',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='status_events', to='orders.order'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('is_paid', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PAID', 'Paid'), ('SHIPPED', 'Shipped'), ('DELIVERED', 'Delivered'), ('RETURNED', 'Returned')], max_length=20)),
+                ('phone', models.CharField(blank=True, max_length=20, null=True)),
+                ('address', models.TextField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SHIPPED', 'Shipped'), ('DELIVERED', 'Delivered'), ('RETURNED', 'Returned')], max_length=20)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.archivedorder')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_order_items', to='catalog.product')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['-created_at', '-id'], name='archorder_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['user', 'created_at'], name='archorder_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorderitem',
+            index=models.Index(fields=['order', 'product'], name='architem_order_product_idx'),
+        ),
+    ]
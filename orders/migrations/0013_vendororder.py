@@ -0,0 +1,105 @@
+# Generated by Django 6.0 on 2026-10-18 16:10
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import defaultdict
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def sub_order_status(statuses):
+    # Same rules as orders.events.derive_status, on item statuses
+    live = set(statuses) - {'RETURNED'}
+    if not live:
+        return 'RETURNED'
+    if live == {'DELIVERED'}:
+        return 'DELIVERED'
+    if live <= {'SHIPPED', 'DELIVERED'}:
+        return 'SHIPPED'
+    return 'PENDING'
+
+
+def backfill_items(VendorOrder, items, archived):
+    # Items come ordered by order, so each order's sub-orders are built in one go
+    batch = defaultdict(list)
+
+    def flush():
+        sub_orders = []
+        for (order, vendor_id), lines in batch.items():
+            sub_orders.append(VendorOrder(
+                order_id=order.id, vendor_id=vendor_id, buyer_id=order.user_id,
+                subtotal=sum((line.price * line.quantity for line in lines), Decimal('0')),
+                item_count=len(lines), status=sub_order_status(line.status for line in lines),
+                created_at=order.created_at, archived=archived,
+            ))
+        VendorOrder.objects.bulk_create(sub_orders)
+        changed = []
+        for sub_order, lines in zip(sub_orders, batch.values()):
+            for line in lines:
+                line.vendor_order_id = sub_order.id
+                changed.append(line)
+        items.model.objects.bulk_update(changed, ['vendor_order'], batch_size=1000)
+        batch.clear()
+
+    last_order = None
+    for item in items.select_related('order', 'product').order_by('order_id', 'id').iterator(chunk_size=2000):
+        if len(batch) >= 1000 and item.order_id != last_order:
+            flush()
+        batch[(item.order, item.product.seller_id)].append(item)
+        last_order = item.order_id
+    if batch:
+        flush()
+
+
+def backfill_vendor_orders(apps, schema_editor):
+    VendorOrder = apps.get_model('orders', 'VendorOrder')
+    backfill_items(VendorOrder, apps.get_model('orders', 'OrderItem').objects.all(), archived=False)
+    backfill_items(VendorOrder, apps.get_model('orders', 'ArchivedOrderItem').objects.all(), archived=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_hot_lookup_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('item_count', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SHIPPED', 'Shipped'), ('DELIVERED', 'Delivered'), ('RETURNED', 'Returned')], default='PENDING', max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('archived', models.BooleanField(default=False)),
+                ('buyer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendor_purchases', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='vendor_orders', to='orders.order')),
+                ('vendor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='vendor_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='vendor_order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_items', to='orders.vendororder'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='vendor_order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='items', to='orders.vendororder'),
+        ),
+        migrations.AddIndex(
+            model_name='vendororder',
+            index=models.Index(fields=['vendor', '-created_at', '-id'], name='vendororder_vendor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendororder',
+            index=models.Index(fields=['vendor', 'status', 'created_at'], name='vendororder_vendor_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='vendororder',
+            constraint=models.UniqueConstraint(fields=('order', 'vendor'), name='unique_vendor_order'),
+        ),
+        migrations.RunPython(backfill_vendor_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-18 18:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_global_rows(apps, schema_editor):
+    # The marketplace-wide figures are now summed from the vendor rows
+    VendorDailySales = apps.get_model('orders', 'VendorDailySales')
+    VendorDailySales.objects.filter(vendor__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_vendororder'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Going back leaves no global rows: run rebuild_sales_rollup afterwards
+        migrations.RunPython(drop_global_rows, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='vendordailysales',
+            name='unique_global_daily_sales',
+        ),
+        migrations.RemoveConstraint(
+            model_name='vendordailysales',
+            name='unique_vendor_daily_sales',
+        ),
+        migrations.AlterField(
+            model_name='vendordailysales',
+            name='vendor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='vendordailysales',
+            name='order_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='vendordailysales',
+            constraint=models.UniqueConstraint(fields=('vendor', 'day'), name='unique_vendor_daily_sales'),
+        ),
+    ]
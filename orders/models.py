@@ -1,7 +1,21 @@
 from django.db import models
+from django.db.models import Count, Exists, F, OuterRef, Sum
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from catalog.models import Product
 
+# Shared by Order and ArchivedOrder (sub-orders are kept for both)
+class OrderQuerySet(models.QuerySet):
+    # 👇 "Orders containing at least one item sold by `seller`", as an EXISTS probe on the
+    # seller's sub-order. No join fan-out to deduplicate, so the database can walk the
+    # created_at index and stop after one page.
+    def for_seller(self, seller):
+        return self.filter(Exists(
+            VendorOrder.objects.filter(order_id=OuterRef('pk'), vendor=seller)
+        ))
+
+
 class Order(models.Model):
     # Status Options
     STATUS_CHOICES = [
@@ -22,6 +36,16 @@ class Order(models.Model):
     phone = models.CharField(max_length=20, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Newest-first history pages (cursor pagination walks this)
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            # A buyer's own history, newest first, with no sort step
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - {self.status}"
 
@@ -39,6 +63,203 @@ class OrderItem(models.Model):
         ('RETURNED', 'Returned'),
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    # The seller's part of the order this line belongs to
+    vendor_order = models.ForeignKey(
+        'VendorOrder', related_name='items', on_delete=models.SET_NULL, null=True, blank=True,
+    )
+
+    class Meta:
+        indexes = [
+            # Lets the for_seller() EXISTS probe check an order's products from the index alone
+            models.Index(fields=['order', 'product'], name='orderitem_order_product_idx'),
+            # "This vendor's items in status X": seller -> products (catalog index) -> items
+            models.Index(fields=['product', 'status'], name='orderitem_product_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product.name} ({self.status})"
+
+    # 👇 Checkout bulk-creates lines with their sub-order already set. Lines saved one by
+    # one (admin inline, scripts) join or open their seller's sub-order here, otherwise
+    # the vendor lists and status updates, which only read sub-orders, never see them.
+    def save(self, *args, **kwargs):
+        if self.vendor_order_id is None or self.vendor_order.vendor_id != self.product.seller_id:
+            self.vendor_order = VendorOrder.for_line(self)
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'price', 'quantity', 'product', 'vendor_order'} & set(update_fields):
+            self.vendor_order.refresh_totals()
+
+    def delete(self, *args, **kwargs):
+        sub_order = self.vendor_order
+        result = super().delete(*args, **kwargs)
+        if sub_order is not None:
+            sub_order.refresh_totals()
+        return result
+
+# 👇 SUB-ORDERS: one per seller per order, created at checkout by orders/services.py
+# Vendor lists, totals and status updates read this one table instead of joining
+# items -> products -> sellers. Rows outlive archival (flagged `archived`), so the
+# order link is not enforced by the database.
+class VendorOrder(models.Model):
+    order = models.ForeignKey(
+        Order, on_delete=models.DO_NOTHING, db_constraint=False, related_name='vendor_orders',
+    )
+    vendor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='vendor_orders', null=True, blank=True)
+    buyer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='vendor_purchases')
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2)
+    item_count = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=OrderItem.STATUS_CHOICES, default='PENDING')
+    # Copied from the order so a vendor's list is one index range scan
+    created_at = models.DateTimeField()
+    archived = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'vendor'], name='unique_vendor_order'),
+        ]
+        indexes = [
+            # A vendor's sales, newest first
+            models.Index(fields=['vendor', '-created_at', '-id'], name='vendororder_vendor_created_idx'),
+            # A vendor's sub-orders in status X (bulk status filter)
+            models.Index(fields=['vendor', 'status', 'created_at'], name='vendororder_vendor_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.order_id} / {self.vendor or 'no seller'} - {self.status}"
+
+    @classmethod
+    def for_line(cls, item):
+        """The sub-order of `item`'s seller in `item`'s order, opened if it does not exist yet."""
+        order = item.order
+        sub_order, _ = cls.objects.get_or_create(
+            order=order, vendor_id=item.product.seller_id,
+            defaults={'buyer_id': order.user_id, 'subtotal': 0, 'item_count': 0, 'created_at': order.created_at},
+        )
+        return sub_order
+
+    def refresh_totals(self):
+        """Recount subtotal / item_count from the lines (after edits outside checkout)."""
+        totals = self.items.aggregate(
+            count=Count('id'),
+            subtotal=Sum(F('price') * F('quantity'), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+        )
+        self.item_count, self.subtotal = totals['count'], totals['subtotal'] or 0
+        self.save(update_fields=['item_count', 'subtotal'])
+
+# 👇 IDEMPOTENCY: remembers the answer to a POST so client retries replay it
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    # sha256 of the request body, so a key cannot be reused for a different cart
+    fingerprint = models.CharField(max_length=64)
+    response_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} -> {self.response_code}"
+
+# 👇 SALES ROLLUP: one row per vendor per day, kept up to date by orders/rollups.py
+# The superuser's marketplace-wide figures are the sum over all vendors' rows (no
+# shared global row that every checkout would have to lock).
+class VendorDailySales(models.Model):
+    vendor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    # Signed like the other counters: the rollup upsert inserts deltas, which can be negative
+    order_count = models.IntegerField(default=0)
+    pending_count = models.IntegerField(default=0)
+    delivered_count = models.IntegerField(default=0)
+    delivered_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Booked (not returned) items, for the analytics series
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # Also the ON CONFLICT target of the rollup upsert
+            models.UniqueConstraint(fields=['vendor', 'day'], name='unique_vendor_daily_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor} {self.day}: {self.delivered_sales}"
+
+# 👇 STATUS EVENTS: append-only history of every status change, written by orders/events.py
+# Item events carry the vendor so SLA queries never have to join back to products;
+# events with item=None record changes of the order's derived master status.
+# The order/item links are not enforced by the database so the history outlives
+# archival (orders/archive.py moves the rows out but keeps their ids).
+class OrderStatusEvent(models.Model):
+    order = models.ForeignKey(
+        Order, on_delete=models.DO_NOTHING, db_constraint=False, related_name='status_events',
+    )
+    item = models.ForeignKey(
+        OrderItem, on_delete=models.DO_NOTHING, db_constraint=False, related_name='status_events',
+        null=True, blank=True,
+    )
+    vendor = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='status_events', null=True, blank=True)
+    from_status = models.CharField(max_length=20, blank=True)   # '' when the item was created
+    to_status = models.CharField(max_length=20)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # An order's timeline
+            models.Index(fields=['order', 'created_at'], name='statusevent_order_time_idx'),
+            # "When did this item enter status X" (the SLA start/end lookups)
+            models.Index(fields=['item', 'to_status', 'created_at'], name='statusevent_item_status_idx'),
+            # A vendor's deliveries/shipments in a date window
+            models.Index(fields=['vendor', 'to_status', 'created_at'], name='statusevent_vendor_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.order_id}: {self.from_status or '-'} -> {self.to_status}"
+
+# 👇 ARCHIVE: finished orders past ORDER_ARCHIVE_AFTER_DAYS, moved out by orders/archive.py
+# Same columns and ids as the live tables, so serializers and exports read either.
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    is_paid = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    phone = models.CharField(max_length=20, blank=True, null=True)
+    address = models.TextField(blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='archorder_created_id_idx'),
+            models.Index(fields=['user', 'created_at'], name='archorder_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.id} - {self.status}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, related_name='items', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='archived_order_items')
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField(default=1)
+    status = models.CharField(max_length=20, choices=OrderItem.STATUS_CHOICES)
+    vendor_order = models.ForeignKey(
+        VendorOrder, related_name='archived_items', on_delete=models.SET_NULL, null=True, blank=True,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['order', 'product'], name='architem_order_product_idx'),
+        ]
 
     def __str__(self):
         return f"{self.quantity}x {self.product.name} ({self.status})"
\ No newline at end of file
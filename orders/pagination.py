@@ -0,0 +1,60 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+# 👇 Keyset pagination: every page is an indexed range scan, however old the account
+class OrderCursorPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+# 👇 Same newest-first pages, but over several tables at once (live + archived orders).
+# The cursor is the (created_at, id) of the last row shown; each table answers with
+# one indexed range scan of page_size + 1 rows and the results are merged here.
+class MergedOrderCursorPagination(OrderCursorPagination):
+
+    def paginate_querysets(self, querysets, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        after = self.decode_position(request.query_params.get(self.cursor_query_param))
+
+        rows = []
+        for queryset in querysets:
+            if after:
+                created_at, pk = after
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+            rows.extend(queryset.order_by('-created_at', '-id')[:page_size + 1])
+        rows.sort(key=lambda row: (row.created_at, row.id), reverse=True)
+
+        page = rows[:page_size]
+        self.next_position = (page[-1].created_at, page[-1].id) if len(rows) > page_size else None
+        return page
+
+    def decode_position(self, encoded):
+        if not encoded:
+            return None
+        try:
+            created_at, pk = urlsafe_b64decode(encoded.encode()).decode().rsplit('|', 1)
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError(encoded)
+            return created_at, int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        created_at, pk = self.next_position
+        encoded = urlsafe_b64encode(f'{created_at.isoformat()}|{pk}'.encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'previous': None, 'results': data})
\ No newline at end of file
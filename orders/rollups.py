@@ -0,0 +1,183 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import ArchivedOrderItem, OrderItem, VendorDailySales
+from . import dashboard_cache
+
+# Counters kept per (vendor, day) row
+FIELDS = ('order_count', 'pending_count', 'delivered_count', 'delivered_sales', 'units', 'revenue')
+
+# Rows per upsert statement (keeps big record_deleted_orders() calls under the parameter limits)
+UPSERT_BATCH = 500
+
+
+def _empty():
+    return {
+        'order_count': 0, 'pending_count': 0, 'delivered_count': 0,
+        'delivered_sales': Decimal('0'), 'units': 0, 'revenue': Decimal('0'),
+    }
+
+
+def _item_delta(item, status, sign):
+    """How one item in `status` contributes to its day's counters."""
+    delta = _empty()
+    if status == 'PENDING':
+        delta['pending_count'] = sign
+    elif status == 'DELIVERED':
+        delta['delivered_count'] = sign
+        delta['delivered_sales'] = sign * item.price
+    if status != 'RETURNED':
+        delta['units'] = sign * item.quantity
+        delta['revenue'] = sign * item.price * item.quantity
+    return delta
+
+
+def _add(target, delta):
+    for field in FIELDS:
+        target[field] += delta[field]
+
+
+def _upsert_sql(row_count):
+    table = VendorDailySales._meta.db_table
+    columns = ('vendor_id', 'day', *FIELDS)
+    values = ', '.join([f"({', '.join(['%s'] * len(columns))})"] * row_count)
+    increments = ', '.join(f"{field} = {table}.{field} + excluded.{field}" for field in FIELDS)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {values} "
+        f"ON CONFLICT (vendor_id, day) DO UPDATE SET {increments}"
+    )
+
+
+def apply_deltas(deltas):
+    """
+    Add {(vendor_id, day): counters} onto the rollup: one INSERT ... ON CONFLICT DO
+    UPDATE for all the rows (PostgreSQL and SQLite 3.24+), creating missing rows and
+    incrementing the others, in (vendor, day) order so concurrent writers lock rows
+    in the same sequence. Items of products without a seller are not rolled up.
+    """
+    rows = sorted(
+        (vendor_id, day, *(delta[field] for field in FIELDS))
+        for (vendor_id, day), delta in deltas.items()
+        if vendor_id is not None and any(delta.values())
+    )
+    if not rows:
+        return
+
+    # The cached dashboards of every vendor touched here (and the superuser's) are stale once this commits
+    vendor_ids = {row[0] for row in rows} | {None}
+    transaction.on_commit(lambda: dashboard_cache.invalidate(vendor_ids))
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH):
+            batch = rows[start:start + UPSERT_BATCH]
+            cursor.execute(_upsert_sql(len(batch)), [value for row in batch for value in row])
+
+
+def _order_deltas(deltas, order, items, sign):
+    day = timezone.localdate(order.created_at)
+    for item in items:
+        _add(deltas[(item.product.seller_id, day)], _item_delta(item, item.status, sign))
+
+    # An order counts once per vendor that sells something in it
+    for vendor_id in {item.product.seller_id for item in items}:
+        deltas[(vendor_id, day)]['order_count'] += sign
+
+
+def record_new_items(order, items):
+    """Called once when an order is placed, with all of its freshly created items."""
+    deltas = defaultdict(_empty)
+    _order_deltas(deltas, order, items, 1)
+    apply_deltas(deltas)
+
+
+def record_deleted_orders(orders):
+    """
+    Take whole orders back out of the rollup before deleting them in code (each
+    needs `items__product` loaded). Admin deletes still need rebuild_sales_rollup.
+    """
+    deltas = defaultdict(_empty)
+    for order in orders:
+        _order_deltas(deltas, order, list(order.items.all()), -1)
+    apply_deltas(deltas)
+
+
+def record_status_change(items, new_status):
+    """
+    Called with the items as they were *before* their status became `new_status`
+    (each needs `order` and `product` loaded).
+    """
+    deltas = defaultdict(_empty)
+    for item in items:
+        if item.status == new_status:
+            continue
+        key = (item.product.seller_id, timezone.localdate(item.order.created_at))
+        _add(deltas[key], _item_delta(item, item.status, -1))
+        _add(deltas[key], _item_delta(item, new_status, 1))
+    apply_deltas(deltas)
+
+
+# 👇 LIVE AGGREGATION: the slow "source of truth" used to rebuild and verify the rollup
+def live_daily_sales():
+    """Return {(vendor_id, day): counters} computed straight from the live and archived items."""
+    counters = dict(
+        order_count=Count('order', distinct=True),
+        pending_count=Count('id', filter=Q(status='PENDING')),
+        delivered_count=Count('id', filter=Q(status='DELIVERED')),
+        delivered_sales=Sum('price', filter=Q(status='DELIVERED'), default=Decimal('0')),
+        units=Sum('quantity', filter=~Q(status='RETURNED'), default=0),
+        revenue=Sum(
+            F('price') * F('quantity'), filter=~Q(status='RETURNED'), default=Decimal('0'),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+    )
+
+    result = defaultdict(_empty)
+    # An order lives in exactly one of the two tables, so their counters simply add up
+    for model in (OrderItem, ArchivedOrderItem):
+        items = model.objects.annotate(day=TruncDate('order__created_at'))
+        per_vendor = items.filter(product__seller__isnull=False).values('product__seller', 'day').annotate(**counters)
+        for row in per_vendor:
+            _add(result[(row['product__seller'], row['day'])], row)
+    return dict(result)
+
+
+def rebuild_rollup():
+    """
+    Replace the rollup with the live aggregation. The table is locked *before* the
+    aggregation runs: orders placed meanwhile wait to apply their increments on top
+    of the rebuilt rows instead of being counted by neither.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {VendorDailySales._meta.db_table} IN EXCLUSIVE MODE")
+        vendor_ids = set(VendorDailySales.objects.values_list('vendor', flat=True).distinct()) | {None}
+        # (On SQLite this first write is what takes the database write lock)
+        VendorDailySales.objects.all().delete()
+        live = live_daily_sales()
+        vendor_ids |= {vendor_id for vendor_id, _ in live}
+        transaction.on_commit(lambda: dashboard_cache.invalidate(vendor_ids))
+        VendorDailySales.objects.bulk_create(
+            [VendorDailySales(vendor_id=vendor_id, day=day, **counters) for (vendor_id, day), counters in live.items()],
+            batch_size=1000,
+        )
+    return len(live)
+
+
+def rollup_mismatches():
+    """Compare the stored rollup against the live aggregation; returns a list of differing keys."""
+    live = live_daily_sales()
+    stored = {
+        (row['vendor'], row['day']): {field: row[field] for field in FIELDS}
+        for row in VendorDailySales.objects.values('vendor', 'day', *FIELDS)
+    }
+    mismatches = []
+    for key in set(live) | set(stored):
+        expected = live.get(key, _empty())
+        actual = stored.get(key, _empty())
+        if any(expected[field] != actual[field] for field in FIELDS):
+            mismatches.append((key, expected, actual))
+    return sorted(mismatches, key=lambda m: m[0])
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Order, OrderItem
+from .models import Order, OrderItem, VendorOrder
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
@@ -16,31 +16,20 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ['id', 'user', 'total_price', 'is_paid', 'created_at', 'items', 'status', 'phone', 'address']
 
-# 👇 VENDOR SERIALIZER (Updated for Item Status)
+# 👇 VENDOR SERIALIZER (one vendor's sub-order, shaped like an order)
 class VendorOrderSerializer(serializers.ModelSerializer):
-    user = serializers.ReadOnlyField(source='user.username')
+    id = serializers.ReadOnlyField(source='order_id')
+    user = serializers.ReadOnlyField(source='buyer.username')
     items = serializers.SerializerMethodField()
-    total_price = serializers.SerializerMethodField()
-    status = serializers.SerializerMethodField() 
+    total_price = serializers.ReadOnlyField(source='subtotal')
 
     class Meta:
-        model = Order
-        fields = ['id', 'user', 'items', 'total_price', 'status', 'created_at']
+        model = VendorOrder
+        fields = ['id', 'user', 'items', 'total_price', 'status', 'item_count', 'created_at']
 
     def get_items(self, obj):
-        # Only show items belonging to the logged-in Vendor
-        vendor = self.context['request'].user
-        items = obj.items.filter(product__seller=vendor)
-        return OrderItemSerializer(items, many=True).data
-
-    def get_total_price(self, obj):
-        # Calculate total only for this vendor's items
-        vendor = self.context['request'].user
-        items = obj.items.filter(product__seller=vendor)
-        return sum(item.price * item.quantity for item in items)
-
-    def get_status(self, obj):
-        # Return the status of the vendor's item
-        vendor = self.context['request'].user
-        item = obj.items.filter(product__seller=vendor).first()
-        return item.status if item else "PENDING"
\ No newline at end of file
+        # VendorOrderListView prefetches the lines into `lines` (+ `archived_lines` for old ranges)
+        lines = getattr(obj, 'lines', None)
+        if lines is None:
+            lines = list(obj.items.select_related('product').order_by('id'))
+        return OrderItemSerializer([*lines, *getattr(obj, 'archived_lines', [])], many=True).data
@@ -0,0 +1,93 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from .models import Order, OrderItem, VendorOrder
+from .stock import lock_products, reserve_stock
+from .rollups import record_new_items
+from .events import record_created_items
+
+
+class OrderPlacementError(Exception):
+    """Raised when a cart cannot be turned into an order (bad line, missing product...)."""
+
+
+def clean_cart(cart_items):
+    """Turn the raw cart payload into a list of (product_id, quantity) tuples."""
+    if not isinstance(cart_items, list):
+        raise OrderPlacementError("items must be a list of cart lines")
+    lines = []
+    for item in cart_items:
+        try:
+            product_id = int(item['product_id'])
+            quantity = int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise OrderPlacementError("Each cart item needs a valid product_id and quantity")
+        if quantity < 1:
+            raise OrderPlacementError(f"Invalid quantity for product {product_id}")
+        lines.append((product_id, quantity))
+
+    if not lines:
+        raise OrderPlacementError("Cart is empty")
+    return lines
+
+
+# 👇 ORDER PLACEMENT: constant number of queries, no matter how big the cart is
+def place_order(user, cart_items, phone='', address=''):
+    lines = clean_cart(cart_items)
+
+    with transaction.atomic():
+        # 1. One query for every product in the cart, locking their rows until commit
+        products = lock_products({product_id for product_id, _ in lines})
+        for product_id, _ in lines:
+            if product_id not in products:
+                raise OrderPlacementError(f"Product {product_id} not found")
+
+        # 2. Take the stock in one UPDATE (raises InsufficientStockError and rolls everything back)
+        reserve_stock(lines, products)
+
+        # 3. Price the cart from that single snapshot
+        total_price = sum(
+            (products[product_id].price * quantity for product_id, quantity in lines),
+            Decimal('0'),
+        )
+
+        order = Order.objects.create(
+            user=user,
+            total_price=total_price,
+            phone=phone,
+            address=address,
+        )
+
+        # 4. One sub-order per seller (one INSERT), then every line in one INSERT
+        by_seller = defaultdict(list)
+        for product_id, quantity in lines:
+            by_seller[products[product_id].seller_id].append((products[product_id], quantity))
+        vendor_orders = VendorOrder.objects.bulk_create([
+            VendorOrder(
+                order=order,
+                vendor_id=seller_id,
+                buyer=user,
+                subtotal=sum((product.price * quantity for product, quantity in seller_lines), Decimal('0')),
+                item_count=len(seller_lines),
+                created_at=order.created_at,
+            )
+            for seller_id, seller_lines in by_seller.items()
+        ])
+
+        items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                vendor_order=vendor_order,
+                product=product,
+                price=product.price,
+                quantity=quantity,
+            )
+            for vendor_order, seller_lines in zip(vendor_orders, by_seller.values())
+            for product, quantity in seller_lines
+        ])
+
+        # 5. Keep the vendor sales rollup and the status history in step
+        record_new_items(order, items)
+        record_created_items(order, items)
+
+    return order
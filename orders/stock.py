@@ -0,0 +1,69 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from catalog.models import Product
+
+
+class InsufficientStockError(Exception):
+    """Raised when a product does not have enough stock left for a reservation."""
+
+    def __init__(self, product_id):
+        self.product_id = product_id
+        super().__init__(f"Insufficient stock for product {product_id}")
+
+
+def lock_products(product_ids):
+    """
+    {id: product} for these products, their rows locked until the caller's
+    transaction ends (one SELECT ... FOR UPDATE, in id order, so concurrent
+    checkouts queue on each other instead of deadlocking).
+    """
+    products = Product.objects.select_for_update().filter(id__in=product_ids).order_by('id')
+    return {product.id: product for product in products}
+
+
+def reserve_stock(lines, products=None):
+    """
+    Decrement stock for a list of (product_id, quantity) tuples: two queries
+    whatever the cart size.
+
+    Stock is checked against `products`, a lock_products() snapshot (taken here
+    when not given), and every decrement goes out in one CASE-based UPDATE. The
+    UPDATE repeats the stock >= quantity check, so even a backend without row
+    locks (SQLite) can never let two buyers take the last unit. Products with
+    no stock figure (NULL) are not tracked and always pass. Must run inside the
+    caller's transaction so a failure rolls the whole cart back.
+    """
+    wanted = Counter()
+    for product_id, quantity in lines:
+        wanted[product_id] += quantity
+
+    if products is None:
+        products = lock_products(wanted)
+    for product_id in sorted(wanted):
+        product = products.get(product_id)
+        if product is None or (product.stock is not None and product.stock < wanted[product_id]):
+            raise InsufficientStockError(product_id)
+
+    tracked = sorted(product_id for product_id in wanted if products[product_id].stock is not None)
+    if not tracked:
+        return
+    quantity = Case(
+        *[When(id=product_id, then=Value(wanted[product_id])) for product_id in tracked],
+        output_field=IntegerField(),
+    )
+    stocked = Product.objects.filter(id__in=tracked, stock__gte=quantity)
+    if stocked.update(stock=F('stock') - quantity) < len(tracked):
+        short = Product.objects.filter(id__in=tracked, stock__lt=quantity).order_by('id').first()
+        raise InsufficientStockError(short.id if short else tracked[0])
+
+
+def release_stock(items):
+    """Put the quantities of the given OrderItems back on the shelf (e.g. RETURNED)."""
+    returned = Counter()
+    for item in items:
+        returned[item.product_id] += item.quantity
+
+    with transaction.atomic():
+        for product_id in sorted(returned):
+            Product.objects.filter(id=product_id).update(stock=F('stock') + returned[product_id])
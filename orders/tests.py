@@ -1,3 +1,1043 @@
-from django.test import TestCase
+import io
+import json
+import re
+import tempfile
+from io import StringIO
+from pathlib import Path
+import zipfile
+from pypdf import PdfReader
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from unittest import skipUnless
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from catalog.models import Product
+from datetime import date, timedelta
+from django.utils import timezone
+from .models import ArchivedOrder, IdempotencyKey, Order, OrderItem, OrderStatusEvent, VendorDailySales, VendorOrder
+from .services import place_order
+from .stock import InsufficientStockError, lock_products, reserve_stock
+from .dashboard_cache import get_dashboard, invalidate
+from .archive import archive_batch, archive_cutoff
+from .rollups import live_daily_sales, rebuild_rollup, record_deleted_orders, rollup_mismatches
+from .analytics import MAX_BUCKETS
+from . import waybill
+from .views import ManagerOrderListView, OrderListView, VendorOrderListView
+from core.query_plans import plan_problems, prefer_indexes
+from core.testing import MarketplaceTestCase, create_buyer, create_product, create_vendor
 
-# Create your tests here.
+
+class VendorDashboardQueryBudgetTest(MarketplaceTestCase):
+    """The dashboard is polled by every vendor tab, so its round-trips are capped."""
+
+    # 1 grouped pass over the rollup + 1 for recent transactions
+    QUERY_BUDGET = 2
+    SECOND_VENDOR = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        for _ in range(5):
+            place_order(cls.buyer, [
+                {'product_id': cls.cement.id, 'quantity': 2},
+                {'product_id': cls.sugar.id, 'quantity': 1},
+            ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.vendor)
+
+    def test_dashboard_stays_within_query_budget(self):
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get('/api/orders/vendor-stats/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_budget_does_not_grow_with_history(self):
+        for _ in range(20):
+            place_order(self.buyer, [{'product_id': self.cement.id, 'quantity': 1}])
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            self.client.get('/api/orders/vendor-stats/')
+
+    def test_repeat_loads_are_served_from_cache(self):
+        self.client.get('/api/orders/vendor-stats/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/orders/vendor-stats/')
+        self.assertEqual(response.data['total_orders'], 5)
+
+    def test_kpis_only_cover_the_vendors_items(self):
+        order_ids = OrderItem.objects.filter(product=self.cement).values_list('order', flat=True)[:2]
+        for order_id in order_ids:
+            self.client.patch(f'/api/orders/update/{order_id}/', {'status': 'DELIVERED'}, format='json')
+
+        data = self.client.get('/api/orders/vendor-stats/').data
+        self.assertEqual(data['total_orders'], 5)
+        self.assertEqual(data['pending_orders'], 3)
+        self.assertEqual(data['total_sales'], 10000)
+        self.assertEqual(len(data['chart_data']), 1)
+        self.assertEqual(len(data['recent_transactions']), 5)
+
+
+class VendorDashboardCacheTest(MarketplaceTestCase):
+    SECOND_VENDOR = True
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.vendor)
+
+    def place(self, product):
+        # on_commit hooks (the invalidation) only fire when the test captures them
+        with self.captureOnCommitCallbacks(execute=True):
+            return place_order(self.buyer, [{'product_id': product.id, 'quantity': 1}])
+
+    def test_new_items_invalidate_the_vendors_dashboard(self):
+        self.assertEqual(self.client.get('/api/orders/vendor-stats/').data['total_orders'], 0)
+        self.place(self.cement)
+        self.assertEqual(self.client.get('/api/orders/vendor-stats/').data['total_orders'], 1)
+
+    def test_other_vendors_writes_keep_the_cache(self):
+        self.client.get('/api/orders/vendor-stats/')
+        self.place(self.sugar)
+        with self.assertNumQueries(0):
+            self.client.get('/api/orders/vendor-stats/')
+
+    # The background waybill render would open its own connection to the test database
+    @mock.patch('orders.waybill.WAYBILL_PRERENDER', False)
+    def test_status_change_invalidates(self):
+        order = self.place(self.cement)
+        self.assertEqual(self.client.get('/api/orders/vendor-stats/').data['pending_orders'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/orders/update/{order.id}/', {'status': 'SHIPPED'}, format='json')
+        self.assertEqual(self.client.get('/api/orders/vendor-stats/').data['pending_orders'], 0)
+
+
+class VendorAnalyticsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor()
+        cls.other_vendor = create_vendor('other')
+        cls.admin = User.objects.create_superuser('admin', password='x')
+        # 2025-12-29 is a Monday
+        for vendor, day, revenue, units, orders in [
+            (cls.vendor, '2025-12-29', 1000, 2, 1),
+            (cls.vendor, '2025-12-31', 500, 1, 1),
+            (cls.vendor, '2026-01-02', 300, 3, 2),
+            (cls.vendor, '2026-01-20', 700, 1, 1),
+            (cls.other_vendor, '2025-12-31', 9999, 9, 9),
+        ]:
+            VendorDailySales.objects.create(vendor=vendor, day=day, revenue=revenue, units=units, order_count=orders)
+
+    def series(self, user=None, **params):
+        client = APIClient()
+        client.force_authenticate(user or self.vendor)
+        response = client.get('/api/orders/vendor-analytics/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(row['period'], row['revenue'], row['units'], row['orders']) for row in response.data['series']]
+
+    def test_days_are_dense_and_only_the_vendors_own(self):
+        self.assertEqual(self.series(**{'from': '2025-12-30', 'to': '2026-01-02'}), [
+            ('2025-12-30', 0, 0, 0),
+            ('2025-12-31', 500, 1, 1),
+            ('2026-01-01', 0, 0, 0),
+            ('2026-01-02', 300, 3, 2),
+        ])
+
+    def test_superuser_sees_the_marketplace_totals(self):
+        self.assertEqual(self.series(self.admin, **{'from': '2025-12-31', 'to': '2025-12-31'}), [
+            ('2025-12-31', 10499, 10, 10),
+        ])
+
+    def test_weeks_start_on_monday(self):
+        self.assertEqual(self.series(granularity='week', **{'from': '2025-12-31', 'to': '2026-01-12'}), [
+            # Labelled by its Monday, but only the days from `from` on are counted
+            ('2025-12-29', 800, 4, 3),
+            ('2026-01-05', 0, 0, 0),
+            ('2026-01-12', 0, 0, 0),
+        ])
+
+    def test_months_cross_the_year_end(self):
+        self.assertEqual(self.series(granularity='month', **{'from': '2025-11-15', 'to': '2026-02-01'}), [
+            ('2025-11-01', 0, 0, 0),
+            ('2025-12-01', 1500, 3, 2),
+            ('2026-01-01', 1000, 4, 3),
+            ('2026-02-01', 0, 0, 0),
+        ])
+
+    def test_default_range_is_the_last_31_days(self):
+        series = self.series()
+        self.assertEqual(len(series), 31)
+        self.assertEqual(series[-1][0], timezone.localdate().isoformat())
+
+    def test_range_is_capped_at_max_buckets(self):
+        client = APIClient()
+        client.force_authenticate(self.vendor)
+        end = date(2026, 1, 18)
+        widest = {'from': end - timedelta(days=MAX_BUCKETS - 1), 'to': end}
+        self.assertEqual(len(self.series(**widest)), MAX_BUCKETS)
+
+        too_wide = {'from': end - timedelta(days=MAX_BUCKETS), 'to': end}
+        self.assertEqual(client.get('/api/orders/vendor-analytics/', too_wide).status_code, 400)
+        # The cap counts points, so coarser buckets reach further back
+        self.assertEqual(len(self.series(granularity='week', **too_wide)), 58)
+
+    def test_bad_parameters_are_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.vendor)
+        for params in (
+            {'granularity': 'hour'},
+            {'from': 'yesterday'},
+            {'from': '2026-02-30'},
+            {'from': '2026-01-10', 'to': '2026-01-01'},
+        ):
+            self.assertEqual(client.get('/api/orders/vendor-analytics/', params).status_code, 400, params)
+
+
+class DashboardStampedeTest(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"total_orders": 1}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_dashboard('42', compute))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"total_orders": 1}] * 8)
+
+    def test_invalidate_forces_a_recompute(self):
+        get_dashboard('42', lambda: {"v": 1})
+        invalidate([42])
+        self.assertEqual(get_dashboard('42', lambda: {"v": 2}), {"v": 2})
+
+
+class BulkItemStatusUpdateTest(MarketplaceTestCase):
+    """Marking a dispatch costs a fixed number of statements, however many orders it holds."""
+
+    CEMENT_STOCK = 1000
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.vendor)
+
+    def place(self, count):
+        return [place_order(self.buyer, [{'product_id': self.cement.id, 'quantity': 1}]).id for _ in range(count)]
+
+    def ship(self, order_ids):
+        return self.client.post('/api/orders/update/bulk/', {'order_ids': order_ids, 'status': 'SHIPPED'}, format='json')
+
+    def test_statement_count_does_not_grow_with_orders(self):
+        few_orders, many_orders = self.place(3), self.place(30)
+        with CaptureQueriesContext(connection) as few:
+            self.ship(few_orders)
+        with CaptureQueriesContext(connection) as many:
+            response = self.ship(many_orders)
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(response.data['updated'], 30)
+
+    def test_invalid_transitions_are_rejected_per_order(self):
+        returned, pending = self.place(2)
+        self.client.patch(f'/api/orders/update/{returned}/', {'status': 'RETURNED'}, format='json')
+
+        response = self.ship([returned, pending, 99999])
+        results = {r['order_id']: r['result'] for r in response.data['results']}
+        self.assertEqual(results, {returned: 'rejected', pending: 'updated', 99999: 'not_found'})
+        self.assertEqual(OrderItem.objects.get(order_id=returned).status, 'RETURNED')
+
+    def test_unknown_status_is_refused(self):
+        response = self.client.post('/api/orders/update/bulk/', {'order_ids': self.place(1), 'status': 'LOST'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_order_ids_must_be_a_list(self):
+        order_ids = self.place(12)
+        # Iterated, "12" would have meant orders 1 and 2
+        self.assertEqual(self.ship(str(order_ids[-1])).status_code, 400)
+        self.assertEqual(self.ship([order_ids[0], 'x']).status_code, 400)
+        form = self.client.post('/api/orders/update/bulk/', {'order_ids': order_ids[-1], 'status': 'SHIPPED'})
+        self.assertEqual(form.status_code, 400)
+        self.assertFalse(OrderItem.objects.filter(status='SHIPPED').exists())
+
+
+class OrderStatusEventTest(MarketplaceTestCase):
+    SECOND_VENDOR = True
+
+    def setUp(self):
+        cache.clear()
+        self.order = place_order(self.buyer, [
+            {'product_id': self.cement.id, 'quantity': 1},
+            {'product_id': self.sugar.id, 'quantity': 1},
+        ])
+
+    def set_status(self, vendor, new_status):
+        client = APIClient()
+        client.force_authenticate(vendor)
+        client.patch(f'/api/orders/update/{self.order.id}/', {'status': new_status}, format='json')
+        self.order.refresh_from_db()
+
+    def test_master_status_follows_the_items(self):
+        self.set_status(self.vendor, 'SHIPPED')
+        self.assertEqual(self.order.status, 'PENDING')
+        self.set_status(self.other_vendor, 'SHIPPED')
+        self.assertEqual(self.order.status, 'SHIPPED')
+        self.set_status(self.vendor, 'DELIVERED')
+        self.set_status(self.other_vendor, 'RETURNED')
+        self.assertEqual(self.order.status, 'DELIVERED')
+
+    def test_admin_cannot_rewrite_history(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        event = OrderStatusEvent.objects.filter(order=self.order).first()
+        self.assertEqual(self.client.get('/admin/orders/orderstatusevent/add/').status_code, 403)
+        delete = self.client.post(f'/admin/orders/orderstatusevent/{event.id}/delete/', {'post': 'yes'})
+        self.assertEqual(delete.status_code, 403)
+        self.assertTrue(OrderStatusEvent.objects.filter(id=event.id).exists())
+        # Item statuses and quantities are shown, not editable
+        page = self.client.get(f'/admin/orders/order/{self.order.id}/change/')
+        self.assertContains(page, 'name="items-0-product"')
+        self.assertNotContains(page, 'name="items-0-status"')
+        self.assertNotContains(page, 'name="items-0-quantity"')
+
+    def test_every_change_is_appended(self):
+        self.set_status(self.vendor, 'SHIPPED')
+        self.set_status(self.other_vendor, 'SHIPPED')
+        events = list(OrderStatusEvent.objects.filter(order=self.order).values_list('from_status', 'to_status'))
+        # 2 items created, 2 items shipped, 1 master status change
+        self.assertEqual(sorted(events), sorted([
+            ('', 'PENDING'), ('', 'PENDING'), ('PENDING', 'SHIPPED'), ('PENDING', 'SHIPPED'), ('PENDING', 'SHIPPED'),
+        ]))
+
+    def test_sla_is_measured_from_the_events(self):
+        # Pretend the order was placed 30 hours ago
+        OrderStatusEvent.objects.filter(order=self.order).update(created_at=timezone.now() - timedelta(hours=30))
+        self.set_status(self.vendor, 'DELIVERED')
+
+        client = APIClient()
+        client.force_authenticate(self.vendor)
+        data = client.get('/api/orders/vendor-sla/').data
+        self.assertEqual(data['pending_to_delivered']['items'], 1)
+        self.assertAlmostEqual(data['pending_to_delivered']['avg_hours'], 30, delta=0.1)
+        self.assertEqual(data['pending_to_shipped']['items'], 0)
+
+
+class OrderExportTest(MarketplaceTestCase):
+    SECOND_VENDOR = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for _ in range(3):
+            place_order(cls.buyer, [
+                {'product_id': cls.cement.id, 'quantity': 2},
+                {'product_id': cls.sugar.id, 'quantity': 1},
+            ])
+
+    def export(self, user, query=''):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(f'/api/orders/export/{query}')
+        if response.status_code != 200:
+            return response, None
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_vendor_csv_only_has_their_lines(self):
+        response, body = self.export(self.vendor)
+        lines = body.strip().splitlines()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertTrue(lines[0].startswith('order_id,'))
+        self.assertEqual(len(lines), 1 + 3)
+        self.assertTrue(all('Cement' in line for line in lines[1:]))
+
+    def test_buyer_ndjson_has_every_line(self):
+        _, body = self.export(self.buyer, '?type=ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['buyer'], 'buyer')
+
+    def test_scope_must_belong_to_the_user(self):
+        response, _ = self.export(self.buyer, '?scope=manager')
+        self.assertEqual(response.status_code, 403)
+
+
+class OrderArchiveTest(MarketplaceTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+        # Two delivered orders from last year, one still open from last year, one from today
+        self.old = [self.place('DELIVERED', days_ago=400) for _ in range(2)]
+        self.open = self.place('PENDING', days_ago=400)
+        self.new = self.place('DELIVERED', days_ago=0)
+
+    def place(self, status, days_ago):
+        order = place_order(self.buyer, [{'product_id': self.cement.id, 'quantity': 1}])
+        if status != 'PENDING':
+            OrderItem.objects.filter(order=order).update(status=status)
+            Order.objects.filter(id=order.id).update(status=status)
+        Order.objects.filter(id=order.id).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return order.id
+
+    def ids(self, query=''):
+        return {order['id'] for order in self.client.get(f'/api/orders/{query}').data['results']}
+
+    def test_only_old_finished_orders_move(self):
+        self.assertEqual(archive_batch(archive_cutoff(), 500), 2)
+        self.assertEqual(archive_batch(archive_cutoff(), 500), 0)
+        self.assertEqual(set(ArchivedOrder.objects.values_list('id', flat=True)), set(self.old))
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {self.open, self.new})
+        # Their history stays behind
+        self.assertTrue(OrderStatusEvent.objects.filter(order_id=self.old[0]).exists())
+
+    def test_lists_read_the_archive_only_for_old_ranges(self):
+        archive_batch(archive_cutoff(), 500)
+        self.assertEqual(self.ids(), {self.open, self.new})
+
+        start = (timezone.now() - timedelta(days=500)).date()
+        self.assertEqual(self.ids(f'?from={start}'), {*self.old, self.open, self.new})
+
+        # Pages walk across both tables without gaps or repeats
+        seen, url = [], f'/api/orders/?from={start}&page_size=1'
+        while url:
+            data = self.client.get(url).data
+            seen += [order['id'] for order in data['results']]
+            url = data['next']
+        self.assertEqual(sorted(seen), sorted([*self.old, self.open, self.new]))
+
+    def test_rollup_still_counts_archived_orders(self):
+        rebuild_rollup()
+        archive_batch(archive_cutoff(), 500)
+        self.assertEqual(rollup_mismatches(), [])
+
+
+class SalesRollupTest(MarketplaceTestCase):
+    SECOND_VENDOR = True
+
+    def setUp(self):
+        self.orders = [
+            place_order(self.buyer, [
+                {'product_id': self.cement.id, 'quantity': 2},
+                {'product_id': self.sugar.id, 'quantity': 1},
+            ])
+            for _ in range(3)
+        ]
+
+    def test_deleted_orders_are_taken_back_out(self):
+        doomed = Order.objects.filter(id__in=[o.id for o in self.orders[:2]]).prefetch_related('items__product')
+        record_deleted_orders(doomed)
+        doomed.delete()
+        self.assertEqual(rollup_mismatches(), [])
+        self.assertEqual(VendorDailySales.objects.get(vendor=self.vendor).order_count, 1)
+
+    def test_checkout_upserts_the_vendor_rows_in_one_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            place_order(self.buyer, [
+                {'product_id': self.cement.id, 'quantity': 1},
+                {'product_id': self.sugar.id, 'quantity': 1},
+            ])
+        writes = [q['sql'] for q in queries if VendorDailySales._meta.db_table in q['sql']]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(
+            dict(VendorDailySales.objects.values_list('vendor', 'order_count')),
+            {self.vendor.id: 4, self.other_vendor.id: 4},
+        )
+        self.assertEqual(rollup_mismatches(), [])
+
+    def test_rebuild_aggregates_only_once_the_table_is_locked(self):
+        seen = []
+
+        def aggregate():
+            # Anything counted from here on is in the rebuilt rows, not lost between snapshot and swap
+            seen.append(VendorDailySales.objects.count())
+            return live_daily_sales()
+
+        with mock.patch('orders.rollups.live_daily_sales', side_effect=aggregate):
+            rebuild_rollup()
+        self.assertEqual(seen, [0])
+        self.assertEqual(rollup_mismatches(), [])
+
+
+class StockBenchmarkTest(TransactionTestCase):
+
+    def test_benchmark_leaves_the_rollup_and_history_untouched(self):
+        vendor, buyer = create_vendor(), create_buyer()
+        cement = create_product(vendor, stock=10)
+        place_order(buyer, [{'product_id': cement.id, 'quantity': 1}])
+        before = list(VendorDailySales.objects.values().order_by('id'))
+
+        call_command('bench_stock', threads=2, stock=5, stdout=StringIO())
+
+        self.assertEqual(list(VendorDailySales.objects.values().order_by('id')), before)
+        self.assertEqual(OrderStatusEvent.objects.count(), 1)
+        self.assertEqual(rollup_mismatches(), [])
+
+
+class OrderQueryPlanTest(MarketplaceTestCase):
+    """The order lookups the views run on every request must stay index range scans."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        products = [create_product(cls.vendor, f'Cement {i}', stock=1000) for i in range(5)]
+        for i in range(30):
+            place_order(cls.buyer, [{'product_id': products[i % 5].id, 'quantity': 1}])
+
+    def view_queryset(self, view_class, user):
+        return view_class(request=SimpleNamespace(user=user), kwargs={}).get_queryset()
+
+    def assertIndexed(self, queryset):
+        with prefer_indexes():
+            self.assertEqual(plan_problems(queryset), [])
+
+    def test_buyer_history_uses_user_created_index(self):
+        self.assertIndexed(self.view_queryset(OrderListView, self.buyer))
+
+    def test_vendor_and_manager_lists_walk_the_created_index(self):
+        self.assertIndexed(self.view_queryset(VendorOrderListView, self.vendor))
+        self.assertIndexed(self.view_queryset(ManagerOrderListView, self.vendor))
+
+    def test_vendor_items_by_status_use_product_status_index(self):
+        self.assertIndexed(OrderItem.objects.filter(product__seller=self.vendor, status='PENDING'))
+
+
+class VendorOrderTest(MarketplaceTestCase):
+    SECOND_VENDOR = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.blocks = create_product(cls.vendor, 'Blocks', price=300, description='9in')
+
+    def setUp(self):
+        cache.clear()
+        self.order = place_order(self.buyer, [
+            {'product_id': self.cement.id, 'quantity': 2},
+            {'product_id': self.blocks.id, 'quantity': 10},
+            {'product_id': self.sugar.id, 'quantity': 1},
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.vendor)
+
+    def test_checkout_creates_one_sub_order_per_seller(self):
+        sub_orders = {vo.vendor_id: vo for vo in VendorOrder.objects.filter(order=self.order)}
+        self.assertEqual(set(sub_orders), {self.vendor.id, self.other_vendor.id})
+        self.assertEqual(sub_orders[self.vendor.id].subtotal, 2 * 5000 + 10 * 300)
+        self.assertEqual(sub_orders[self.vendor.id].item_count, 2)
+        self.assertEqual(OrderItem.objects.filter(vendor_order=sub_orders[self.vendor.id]).count(), 2)
+
+    def test_vendor_list_shows_only_their_part(self):
+        [row] = self.client.get('/api/orders/vendor-orders/').data['results']
+        self.assertEqual(row['id'], self.order.id)
+        self.assertEqual(row['total_price'], 13000)
+        self.assertEqual({item['product_name'] for item in row['items']}, {'Cement', 'Blocks'})
+
+    def test_status_update_moves_the_sub_order(self):
+        self.client.patch(f'/api/orders/update/{self.order.id}/', {'status': 'SHIPPED'}, format='json')
+        statuses = dict(VendorOrder.objects.filter(order=self.order).values_list('vendor', 'status'))
+        self.assertEqual(statuses, {self.vendor.id: 'SHIPPED', self.other_vendor.id: 'PENDING'})
+
+    def test_lines_saved_outside_checkout_join_a_sub_order(self):
+        # e.g. added through the admin inline: a new seller gets a sub-order, an existing one is topped up
+        third = create_vendor('third')
+        rice = create_product(third, 'Rice', price=700)
+        added = OrderItem.objects.create(order=self.order, product=rice, price=700, quantity=3)
+        OrderItem.objects.create(order=self.order, product=self.cement, price=5000, quantity=1)
+
+        self.assertIn(self.order, Order.objects.for_seller(third))
+        sub_orders = {vo.vendor_id: vo for vo in VendorOrder.objects.filter(order=self.order)}
+        self.assertEqual((sub_orders[third.id].subtotal, sub_orders[third.id].item_count), (2100, 1))
+        self.assertEqual((sub_orders[self.vendor.id].subtotal, sub_orders[self.vendor.id].item_count), (18000, 3))
+
+        added.quantity = 1
+        added.save()
+        self.assertEqual(VendorOrder.objects.get(order=self.order, vendor=third).subtotal, 700)
+        added.delete()
+        self.assertEqual(VendorOrder.objects.get(order=self.order, vendor=third).item_count, 0)
+
+    def test_status_update_without_own_items_is_not_found(self):
+        order = place_order(self.buyer, [{'product_id': self.sugar.id, 'quantity': 1}])
+        response = self.client.patch(f'/api/orders/update/{order.id}/', {'status': 'SHIPPED'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(OrderItem.objects.filter(order=order).exclude(status='PENDING').exists())
+        self.assertEqual(self.client.patch('/api/orders/update/999999/', {'status': 'SHIPPED'}, format='json').status_code, 404)
+
+
+class OrderPlacementQueryBudgetTest(MarketplaceTestCase):
+    """Checkout costs a fixed number of round-trips, whatever the size of the cart."""
+    SECOND_VENDOR = True
+
+    # savepoint + lock the products + stock + order + sub-orders + lines + rollup + events + release
+    QUERY_BUDGET = 9
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.products = [create_product(vendor, f'Item {i}') for i in range(20) for vendor in (cls.vendor, cls.other_vendor)]
+
+    def checkout(self, products):
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = client.post('/api/orders/create/', {
+                'items': [{'product_id': product.id, 'quantity': 1} for product in products],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Order.objects.get(id=response.data['order_id'])
+
+    def test_one_line_and_forty_lines_cost_the_same(self):
+        self.assertEqual(self.checkout(self.products[:1]).items.count(), 1)
+        order = self.checkout(self.products)
+        self.assertEqual(order.items.count(), 40)
+        self.assertEqual(VendorOrder.objects.filter(order=order).count(), 2)
+
+
+class StockReservationTest(MarketplaceTestCase):
+    CEMENT_STOCK = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Never given a stock figure (every product from before stock was tracked)
+        cls.untracked = create_product(cls.vendor, 'Sand', price=2000, stock=None, description='1 ton')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def checkout(self, product, quantity):
+        return self.client.post('/api/orders/create/', {
+            'items': [{'product_id': product.id, 'quantity': quantity}],
+        }, format='json')
+
+    def test_tracked_stock_is_decremented_and_never_oversold(self):
+        self.assertEqual(self.checkout(self.cement, 2).status_code, 201)
+        response = self.checkout(self.cement, 2)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['product_id'], self.cement.id)
+        self.cement.refresh_from_db()
+        self.assertEqual(self.cement.stock, 1)
+
+    def test_untracked_stock_never_runs_out(self):
+        self.assertIsNone(self.untracked.stock)
+        for _ in range(3):
+            self.assertEqual(self.checkout(self.untracked, 1000).status_code, 201)
+        self.untracked.refresh_from_db()
+        self.assertIsNone(self.untracked.stock)
+
+    def test_stock_costs_the_same_queries_for_any_cart_size(self):
+        products = [create_product(self.vendor, f'Cement {i}') for i in range(10)]
+
+        def place(count):
+            # savepoint, lock, stock, order, sub-orders, lines, rollup, events, release
+            with self.assertNumQueries(9):
+                place_order(self.buyer, [{'product_id': product.id, 'quantity': 2} for product in products[:count]])
+
+        place(1)
+        place(10)
+        stock = dict(Product.objects.filter(id__in=[p.id for p in products]).values_list('id', 'stock'))
+        self.assertEqual(stock, {p.id: 96 if p is products[0] else 98 for p in products})
+
+    def test_update_rechecks_stock_behind_a_stale_snapshot(self):
+        # Where rows cannot be locked (SQLite), the snapshot may be out of date by the UPDATE
+        stale = lock_products([self.cement.id])
+        Product.objects.filter(id=self.cement.id).update(stock=1)
+        with self.assertRaises(InsufficientStockError):
+            reserve_stock([(self.cement.id, 2)], stale)
+        self.cement.refresh_from_db()
+        self.assertEqual(self.cement.stock, 1)
+
+    def test_one_short_line_rolls_back_the_whole_cart(self):
+        response = self.client.post('/api/orders/create/', {'items': [
+            {'product_id': self.untracked.id, 'quantity': 5},
+            {'product_id': self.cement.id, 'quantity': 4},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Order.objects.exists())
+        self.cement.refresh_from_db()
+        self.assertEqual(self.cement.stock, 3)
+
+
+class IdempotentOrderTest(MarketplaceTestCase):
+    CEMENT_STOCK = 10
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def checkout(self, quantity=1, key='attempt-1'):
+        return self.client.post(
+            '/api/orders/create/',
+            {'items': [{'product_id': self.cement.id, 'quantity': quantity}]},
+            format='json',
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_the_first_answer(self):
+        first = self.checkout()
+        retry = self.checkout()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.cement.refresh_from_db()
+        self.assertEqual(self.cement.stock, 9)
+
+    def test_same_key_with_a_different_cart_is_rejected(self):
+        self.checkout(quantity=1)
+        response = self.checkout(quantity=2)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_new_key_places_a_new_order(self):
+        self.checkout(key='attempt-1')
+        self.checkout(key='attempt-2')
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_retry_that_loses_the_claim_replays_instead_of_ordering(self):
+        first = self.checkout()
+        # The retry's lookup ran before the first request committed, so only the
+        # unique insert stands between it and a second order
+        lookup = IdempotencyKey.objects.filter
+        missed = lambda **kwargs: IdempotencyKey.objects.none() if 'expires_at__gt' in kwargs else lookup(**kwargs)
+        with mock.patch.object(IdempotencyKey.objects, 'filter', side_effect=missed):
+            retry = self.checkout()
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_expired_key_can_be_reused(self):
+        self.checkout()
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.checkout(quantity=3).status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_malformed_items_are_a_bad_request(self):
+        for items in (None, 'cement', 5, {'product_id': self.cement.id}):
+            response = self.client.post('/api/orders/create/', {'items': items}, format='json')
+            self.assertEqual(response.status_code, 400, items)
+        self.assertEqual(self.client.post('/api/orders/create/', [1, 2], format='json').status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', "needs row-level locking (SQLite serialises writers)")
+class ConcurrentIdempotentOrderTest(TransactionTestCase):
+
+    def test_in_flight_retry_waits_for_the_first_request_and_replays_it(self):
+        vendor, buyer = create_vendor(), create_buyer()
+        cement = create_product(vendor, stock=10)
+        first_in_flight, release_first = threading.Event(), threading.Event()
+        place = place_order
+
+        def slow_place_order(*args, **kwargs):
+            order = place(*args, **kwargs)
+            if threading.current_thread().name == 'first':
+                first_in_flight.set()
+                release_first.wait(5)
+            return order
+
+        responses = {}
+
+        def checkout():
+            client = APIClient()
+            client.force_authenticate(buyer)
+            try:
+                responses[threading.current_thread().name] = client.post(
+                    '/api/orders/create/',
+                    {'items': [{'product_id': cement.id, 'quantity': 1}]},
+                    format='json',
+                    HTTP_IDEMPOTENCY_KEY='attempt-1',
+                )
+            finally:
+                connection.close()
+
+        with mock.patch('orders.views.place_order', side_effect=slow_place_order):
+            first = threading.Thread(target=checkout, name='first')
+            first.start()
+            self.assertTrue(first_in_flight.wait(5))
+            retry = threading.Thread(target=checkout, name='retry')
+            retry.start()
+            # The retry is now blocked on the claimed key
+            time.sleep(0.2)
+            self.assertTrue(retry.is_alive())
+            release_first.set()
+            first.join()
+            retry.join()
+
+        self.assertEqual(responses['retry'].data, responses['first'].data)
+        self.assertEqual(responses['retry']['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+
+@mock.patch('orders.waybill.WAYBILL_PRERENDER', False)
+class WaybillCacheTest(MarketplaceTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.order = place_order(cls.buyer, [{'product_id': cls.cement.id, 'quantity': 2}], address='Lagos')
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        patcher = mock.patch('orders.waybill.WAYBILL_CACHE_DIR', Path(cache_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.folder = Path(cache_dir.name) / str(self.order.id)
+
+        renderer = mock.patch('orders.waybill.render_waybill', wraps=waybill.render_waybill)
+        self.render = renderer.start()
+        self.addCleanup(renderer.stop)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def fetch(self, **headers):
+        response = self.client.get(f'/api/orders/print-waybill/{self.order.id}/', **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_reprints_are_served_from_the_cache(self):
+        first, pdf = self.fetch()
+        again, same_pdf = self.fetch()
+        self.assertEqual((first.status_code, again.status_code), (200, 200))
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertEqual(same_pdf, pdf)
+        self.assertEqual(again['ETag'], first['ETag'])
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_changes_render_a_new_version_and_drop_the_old_one(self):
+        first, _ = self.fetch()
+        Order.objects.filter(id=self.order.id).update(address='Abuja')
+        second, _ = self.fetch()
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.render.call_count, 2)
+        self.assertEqual([path.stem for path in self.folder.glob('*.pdf')], [second['ETag'].strip('"')])
+
+    def test_matching_etags_get_not_modified(self):
+        etag = self.fetch()[0]['ETag']
+        for header in (etag, f'W/{etag}', f'"stale", {etag}', '*'):
+            response, body = self.fetch(HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, 304, header)
+            self.assertEqual(response['ETag'], etag)
+            self.assertEqual(body, b'')
+
+    def test_other_etags_get_the_pdf(self):
+        fingerprint = self.fetch()[0]['ETag'].strip('"')
+        # Tags that merely contain the current one are different tags
+        for header in ('"stale"', f'"{fingerprint}-gzip"', f'"x{fingerprint}", "y"'):
+            response, body = self.fetch(HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, 200, header)
+            self.assertTrue(body.startswith(b'%PDF'))
+
+    def test_file_unlinked_before_it_is_opened_is_rendered_again(self):
+        self.fetch()
+        fingerprint = waybill.waybill_fingerprint
+
+        def unlink_then_fingerprint(order, items):
+            # Another request invalidates the waybill right as this one looks it up
+            waybill.invalidate_waybill(order.id)
+            return fingerprint(order, items)
+
+        with mock.patch('orders.views.waybill_fingerprint', side_effect=unlink_then_fingerprint):
+            response, body = self.fetch()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_open_waybill_stays_readable_after_unlink(self):
+        order = waybill.waybill_queryset(Order.objects).get(id=self.order.id)
+        items = list(order.items.all())
+        fingerprint = waybill.waybill_fingerprint(order, items)
+        with waybill.open_cached_waybill(order.id, fingerprint, order, items) as pdf:
+            waybill.invalidate_waybill(order.id)
+            self.assertFalse(any(self.folder.glob('*.pdf')))
+            self.assertTrue(pdf.read().startswith(b'%PDF'))
+
+        # If every render is unlinked again straight away, a one-off copy is served
+        with mock.patch('orders.waybill.write_waybill'):
+            with waybill.open_cached_waybill(order.id, fingerprint, order, items) as pdf:
+                self.assertTrue(pdf.read().startswith(b'%PDF'))
+
+
+@mock.patch('orders.waybill.WAYBILL_PRERENDER', False)
+@mock.patch('orders.waybill.WAYBILL_WORKERS', 1)
+class BulkWaybillTest(MarketplaceTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.order_ids = [
+            place_order(cls.buyer, [{'product_id': cls.cement.id, 'quantity': n}]).id for n in (1, 2, 3)
+        ]
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        patcher = mock.patch('orders.waybill.WAYBILL_CACHE_DIR', Path(cache_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def fetch(self, output):
+        response = self.client.post('/api/orders/print-waybills/', {'format': output, 'order_ids': self.order_ids}, format='json')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_merged_pdf_and_zip_hold_every_waybill(self):
+        response, body = self.fetch('pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(PdfReader(io.BytesIO(body)).pages), 3)
+
+        response, body = self.fetch('zip')
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertEqual(sorted(archive.namelist()), sorted(f'WB-{order_id}.pdf' for order_id in self.order_ids))
+            self.assertTrue(archive.read(f'WB-{self.order_ids[0]}.pdf').startswith(b'%PDF'))
+
+    def test_waybills_unlinked_after_rendering_are_rendered_again(self):
+        render = waybill.bulk_waybill_files
+
+        def render_then_invalidate(orders):
+            waybills = render(orders)
+            for order in orders:
+                waybill.invalidate_waybill(order.id)
+            return waybills
+
+        for output in ('pdf', 'zip'):
+            with mock.patch('orders.views.bulk_waybill_files', side_effect=render_then_invalidate):
+                response, body = self.fetch(output)
+            self.assertEqual(response.status_code, 200, output)
+
+    def test_order_ids_must_be_a_list(self):
+        url = '/api/orders/print-waybills/'
+        self.assertEqual(self.client.post(url, {'order_ids': str(self.order_ids[0])}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'order_ids': self.order_ids[0]}).status_code, 400)
+
+    def test_failures_are_logged_not_sent_to_the_client(self):
+        with mock.patch('orders.views.merge_pdfs', side_effect=OSError('/srv/waybill_cache is full')):
+            with self.assertLogs('orders.views', 'ERROR'):
+                response, _ = self.fetch('pdf')
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn('waybill_cache', response.data['error'])
+
+
+class WaybillPoolTest(SimpleTestCase):
+
+    def test_concurrent_requests_share_one_pool(self):
+        def slow_pool(**kwargs):
+            time.sleep(0.05)
+            return object()
+
+        pools = []
+        with mock.patch('orders.waybill._pool', None), \
+                mock.patch('orders.waybill.ProcessPoolExecutor', side_effect=slow_pool) as create:
+            threads = [threading.Thread(target=lambda: pools.append(waybill._get_pool())) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(len({id(pool) for pool in pools}), 1)
+        self.assertNotEqual(create.call_args.kwargs['mp_context'].get_start_method(), 'fork')
+
+    def test_workers_render_in_fresh_processes(self):
+        order = SimpleNamespace(
+            id=7, created_at=timezone.now(), user=SimpleNamespace(username='buyer'),
+            phone='0800', address='Lagos', total_price=100,
+        )
+        items = [SimpleNamespace(id=1, product=SimpleNamespace(name='Cement'), quantity=1, price=100, status='PENDING')]
+        pdfs = waybill.render_many([(order, items)] * 3, workers=2)
+        self.assertEqual(len(pdfs), 3)
+        self.assertTrue(all(pdf.startswith(b'%PDF') for pdf in pdfs))
+
+
+class WaybillLayoutTest(SimpleTestCase):
+
+    def waybill(self, item_count):
+        order = SimpleNamespace(
+            id=7, created_at=timezone.now(), user=SimpleNamespace(username='buyer'),
+            phone='0800', address='Lagos', total_price=item_count * 100,
+        )
+        items = [
+            SimpleNamespace(id=n, product=SimpleNamespace(name=f'Item {n:03}'), quantity=1, price=100, status='PENDING')
+            for n in range(item_count)
+        ]
+        pages = PdfReader(io.BytesIO(waybill.render_waybill_bytes(order, items))).pages
+        return [page.extract_text() for page in pages]
+
+    def test_long_orders_continue_on_new_pages(self):
+        pages = self.waybill(60)
+        self.assertEqual(len(pages), 3)
+        for number, text in enumerate(pages, start=1):
+            self.assertIn(f'Page {number} of 3', text)
+            self.assertIn('ITEM DESCRIPTION', text)
+        self.assertIn('Continued from page 1', pages[1])
+        # Every row printed exactly once, in order
+        printed = [name for text in pages for name in re.findall(r'Item \d{3}', text)]
+        self.assertEqual(printed, [f'Item {n:03}' for n in range(60)])
+
+    def test_total_only_on_the_last_page(self):
+        pages = self.waybill(60)
+        self.assertEqual(['TOTAL VALUE' in text for text in pages], [False, False, True])
+        self.assertIn('TOTAL VALUE: N6,000.00', pages[-1])
+
+    def test_total_that_does_not_fit_gets_its_own_page(self):
+        # Exactly one full first page of rows leaves no room for the total under them
+        rows = len(waybill.paginate(range(1000))[0])
+        pages = self.waybill(rows)
+        self.assertEqual(len(pages), 2)
+        self.assertNotIn('TOTAL VALUE', pages[0])
+        self.assertIn('TOTAL VALUE', pages[1])
+        self.assertNotRegex(pages[1], r'Item \d{3}')
+
+
+class WaybillPrerenderTest(SimpleTestCase):
+
+    def setUp(self):
+        for name, value in (('_queued', set()), ('WAYBILL_PRERENDER', True)):
+            patcher = mock.patch(f'orders.waybill.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        submit = mock.patch.object(waybill._prerender_executor, 'submit')
+        self.submit = submit.start()
+        self.addCleanup(submit.stop)
+
+    def test_repeat_requests_queue_one_render(self):
+        for _ in range(3):
+            waybill.schedule_prerender(5)
+        self.assertEqual(self.submit.call_count, 1)
+
+    def test_change_during_a_render_queues_another(self):
+        waybill.schedule_prerender(5)
+
+        def ship_while_loading(**kwargs):
+            # The order ships again after the render has started reading it
+            waybill.schedule_prerender(5)
+            raise Order.DoesNotExist
+
+        orders = mock.Mock(get=mock.Mock(side_effect=ship_while_loading))
+        with mock.patch('orders.waybill.waybill_queryset', return_value=orders):
+            waybill.prerender_waybill(5)
+        self.assertEqual(self.submit.call_count, 2)
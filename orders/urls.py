@@ -2,12 +2,18 @@ from django.urls import path
 from .views import (
     OrderCreateView, 
     OrderListView, 
+    OrderExportView,
     VendorDashboardView, 
+    VendorAnalyticsView,
+    VendorSLAView,
     ManagerOrderListView, 
     VendorOrderListView,
     OrderItemStatusUpdateView,
+    BulkItemStatusUpdateView,
+    OrderTimelineView,
     # 👇 Import the new PDF View
-    GenerateWaybillPDF
+    GenerateWaybillPDF,
+    BulkWaybillView,
 )
 
 urlpatterns = [
@@ -17,18 +23,36 @@ urlpatterns = [
     # 2. Student sees their history
     path('', OrderListView.as_view(), name='order-list'),
 
+    # 2b. Full history as a streamed file (?type=csv|ndjson&scope=buyer|vendor|manager&from=&to=)
+    path('export/', OrderExportView.as_view(), name='order-export'),
+
     # 3. Vendor sees Sales Stats
     path('vendor-stats/', VendorDashboardView.as_view(), name='vendor-stats'),
 
+    # 3b. Vendor sales time series (?from=&to=&granularity=day|week|month)
+    path('vendor-analytics/', VendorAnalyticsView.as_view(), name='vendor-analytics'),
+
+    # 3c. Average hours between statuses (?from=&to=)
+    path('vendor-sla/', VendorSLAView.as_view(), name='vendor-sla'),
+
     # 4. Manager sees ALL orders
     path('all/', ManagerOrderListView.as_view(), name='manager-orders'),
 
     # 5. Updates ONLY your items (Chicken) instead of the whole Order
     path('update/<int:pk>/', OrderItemStatusUpdateView.as_view(), name='order-update'),
 
+    # 5b. Same, for many orders at once (order_ids or a filter + target status)
+    path('update/bulk/', BulkItemStatusUpdateView.as_view(), name='order-bulk-update'),
+
+    # 5c. Status history of one order
+    path('timeline/<int:pk>/', OrderTimelineView.as_view(), name='order-timeline'),
+
     # 6. Vendor sees their specific sales
     path('vendor-orders/', VendorOrderListView.as_view(), name='vendor-orders'),
 
     # 7. 🖨️ PRINT WAYBILL (The new PDF feature)
     path('print-waybill/<int:pk>/', GenerateWaybillPDF.as_view(), name='print-waybill'),
+
+    # 8. 🖨️ BULK WAYBILLS (one merged PDF or a ZIP for the whole dispatch)
+    path('print-waybills/', BulkWaybillView.as_view(), name='print-waybills'),
 ]
\ No newline at end of file
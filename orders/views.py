@@ -1,78 +1,191 @@
+import logging
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Sum, Count
+from datetime import timedelta
+from django.db.models import Sum, Count, Prefetch, Q
 from django.db.models.functions import TruncMonth 
-from .models import Order, OrderItem
-from catalog.models import Product
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, Order, OrderItem, OrderStatusEvent, VendorDailySales, VendorOrder,
+)
+from .services import place_order, OrderPlacementError
+from .stock import InsufficientStockError
+from .idempotency import run_idempotent
+from .pagination import OrderCursorPagination, MergedOrderCursorPagination
+from .item_status import update_item_status, StatusUpdateError
+from .events import transition_times
+from .export import FORMATS, items_for
+from .archive import reaches_archive
+from .dashboard_cache import get_dashboard, scope_for
+from .analytics import sales_series, count_buckets, GRANULARITIES, MAX_BUCKETS
 
 # 👇 PDF IMPORTS
-from django.http import HttpResponse
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors # 👈 This is the key import
-import io
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from .waybill import (
+    waybill_queryset, waybill_fingerprint, open_cached_waybill,
+    bulk_waybill_files, merge_pdfs, zip_waybills, spooled_file,
+)
 
 # 👇 Import the Smart Serializers
 from .serializers import OrderSerializer, VendorOrderSerializer
 
+logger = logging.getLogger(__name__)
+
+def parse_date_range(data):
+    """Optional from/to (YYYY-MM-DD) from a request body or query string; raises ValueError on garbage."""
+    try:
+        start = parse_date(data['from']) if data.get('from') else None
+        end = parse_date(data['to']) if data.get('to') else None
+    except (TypeError, ValueError):
+        start = end = False
+    if (data.get('from') and not start) or (data.get('to') and not end):
+        raise ValueError("from/to must be dates (YYYY-MM-DD)")
+    return start, end
+
+def parse_order_ids(data):
+    """The `order_ids` list of a bulk request body; raises ValueError on anything but a list of ids."""
+    order_ids = data['order_ids']
+    # A string would be read one character at a time ("12" -> orders 1 and 2); form posts only carry strings
+    if not isinstance(order_ids, list) or any(isinstance(order_id, (bool, float)) for order_id in order_ids):
+        raise ValueError("order_ids must be a list of integers")
+    try:
+        return [int(order_id) for order_id in order_ids]
+    except (TypeError, ValueError):
+        raise ValueError("order_ids must be a list of integers")
+
 # 1. CREATE ORDER (Public)
 class OrderCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = OrderSerializer
 
     def create(self, request, *args, **kwargs):
-        user = request.user
+        # 👇 Retries carrying the same Idempotency-Key get the original answer back
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return self.place(request)
+        if len(key) > 255:
+            return Response({"error": "Idempotency-Key is too long"}, status=400)
+        return run_idempotent(request, key, lambda: self.place(request))
+
+    def place(self, request):
         data = request.data
-        cart_items = data.get('items', [])
-        
-        phone_number = data.get('phone', '') 
-        delivery_address = data.get('address', '')
-
-        total_price = 0
-        for item in cart_items:
-            try:
-                product = Product.objects.get(id=item['product_id'])
-                total_price += product.price * item['quantity']
-            except Product.DoesNotExist:
-                return Response({"error": f"Product {item['product_id']} not found"}, status=400)
-
-        order = Order.objects.create(
-            user=user, 
-            total_price=total_price,
-            phone=phone_number,
-            address=delivery_address
-        )
-
-        for item in cart_items:
-            product = Product.objects.get(id=item['product_id'])
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                price=product.price,
-                quantity=item['quantity']
+        if not isinstance(data, dict):
+            return Response({"error": "Expected an object with items"}, status=400)
+        try:
+            order = place_order(
+                user=request.user,
+                cart_items=data.get('items', []),
+                phone=data.get('phone', ''),
+                address=data.get('address', ''),
             )
+        except OrderPlacementError as e:
+            return Response({"error": str(e)}, status=400)
+        except InsufficientStockError as e:
+            return Response({"error": str(e), "product_id": e.product_id}, status=status.HTTP_409_CONFLICT)
 
         return Response({"message": "Order Placed Successfully", "order_id": order.id}, status=status.HTTP_201_CREATED)
 
+# 👇 Shared by the order lists: optional ?from=&to= (order dates). Only a range that
+# starts before the archive horizon pages through the archived orders as well;
+# everything else reads the live tables alone.
+def buyer_orders(user, manager):
+    return manager.filter(user=user).prefetch_related('items__product').order_by('-created_at', '-id')
+
+def managed_orders(user, manager):
+    orders = manager.all() if user.is_superuser else manager.for_seller(user)
+    return orders.prefetch_related('items__product').order_by('-created_at', '-id')
+
+class OrderRangeListMixin:
+    pagination_class = OrderCursorPagination
+    date_range = (None, None)
+    # (user, manager) -> the user's orders from Order.objects or ArchivedOrder.objects,
+    # e.g. staticmethod(buyer_orders)
+    order_source = None
+    # False for lists whose own table already spans live and archived orders
+    merge_archive = True
+
+    def orders(self, manager):
+        assert self.order_source is not None, f"{type(self).__name__} needs an order_source (or its own get_queryset)"
+        return self.order_source(self.request.user, manager)
+
+    def in_range(self, orders):
+        start, end = self.date_range
+        if start:
+            orders = orders.filter(created_at__date__gte=start)
+        if end:
+            orders = orders.filter(created_at__date__lte=end)
+        return orders
+
+    def get_queryset(self):
+        return self.in_range(self.orders(Order.objects))
+
+    def list(self, request, *args, **kwargs):
+        try:
+            self.date_range = parse_date_range(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        if not self.merge_archive or not reaches_archive(self.date_range[0]):
+            return super().list(request, *args, **kwargs)
+
+        paginator = MergedOrderCursorPagination()
+        page = paginator.paginate_querysets(
+            [self.in_range(self.orders(Order.objects)), self.in_range(self.orders(ArchivedOrder.objects))],
+            request,
+        )
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
 # 2. LIST MY ORDERS
-class OrderListView(generics.ListAPIView):
+class OrderListView(OrderRangeListMixin, generics.ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
-
-    def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by('-created_at')
+    order_source = staticmethod(buyer_orders)
 
 # 3. MANAGER LIST
-class ManagerOrderListView(generics.ListAPIView):
+class ManagerOrderListView(OrderRangeListMixin, generics.ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAdminUser]
+    order_source = staticmethod(managed_orders)
 
-    def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Order.objects.all().order_by('-created_at')
-        return Order.objects.filter(items__product__seller=user).distinct().order_by('-created_at')
+# 3b. EXPORT (CSV / NDJSON, streamed row by row)
+class OrderExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        params = request.query_params
+        # ("format" is taken by DRF's content negotiation, hence "type")
+        kind = params.get('type', 'csv')
+        if kind not in FORMATS:
+            return Response({"error": f"type must be one of: {', '.join(FORMATS)}"}, status=400)
+
+        # Same visibility as the list views, defaulting to the widest one the user has
+        default_scope = 'manager' if user.is_superuser else 'vendor' if user.is_staff else 'buyer'
+        scope = params.get('scope', default_scope)
+        items = items_for(user, scope)
+        if items is None:
+            return Response({"error": f"You cannot export the '{scope}' scope"}, status=403)
+
+        try:
+            start, end = parse_date_range(params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        # Archived lines (all older) go first, and only when the range reaches back that far
+        sources = [items]
+        if reaches_archive(start):
+            sources.insert(0, items_for(user, scope, ArchivedOrderItem))
+        if start:
+            sources = [source.filter(order__created_at__date__gte=start) for source in sources]
+        if end:
+            sources = [source.filter(order__created_at__date__lte=end) for source in sources]
+
+        stream, content_type = FORMATS[kind]
+        response = StreamingHttpResponse(stream(sources), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="orders-{scope}.{kind}"'
+        return response
 
 # 4. VENDOR DASHBOARD
 class VendorDashboardView(APIView):
@@ -80,41 +193,129 @@ class VendorDashboardView(APIView):
 
     def get(self, request):
         user = request.user
+        # 👇 Served from cache until one of this vendor's items changes
+        return Response(get_dashboard(scope_for(user), lambda: self.compute(user)))
+
+    def compute(self, user):
+        # 👇 Headline numbers come from the per-day rollup (O(days) rows, not every item ever sold)
         if user.is_superuser:
             items = OrderItem.objects.all()
+            # Summed over every vendor: an order with two sellers counts as two orders here
+            daily = VendorDailySales.objects.all()
         else:
-            items = OrderItem.objects.filter(product__seller=user)
-
-        total_sales = items.filter(status='DELIVERED').aggregate(Sum('price'))['price__sum'] or 0
-        total_orders = items.values('order').distinct().count()
-        pending_orders = items.filter(status='PENDING').count()
-
-        monthly_sales = (
-            items.filter(status='DELIVERED')
-            .annotate(month=TruncMonth('order__created_at'))
+            # The lines of the vendor's 10 latest sub-orders (both steps are index lookups)
+            latest = VendorOrder.objects.filter(vendor=user).order_by('-created_at', '-id').values('id')[:10]
+            items = OrderItem.objects.filter(vendor_order__in=latest)
+            daily = VendorDailySales.objects.filter(vendor=user)
+
+        # 👇 ONE grouped pass over the rollup: the monthly series carries every counter,
+        # and the headline KPIs are just the sum of the months.
+        monthly = (
+            daily.annotate(month=TruncMonth('day'))
             .values('month')
-            .annotate(total=Sum('price'))
+            .annotate(
+                sales=Sum('delivered_sales'),
+                delivered=Sum('delivered_count'),
+                orders=Sum('order_count'),
+                pending=Sum('pending_count'),
+            )
             .order_by('month')
         )
 
+        total_sales = total_orders = pending_orders = 0
         chart_data = []
-        for entry in monthly_sales:
-            if entry['month']:
+        for entry in monthly:
+            total_sales += entry['sales']
+            total_orders += entry['orders']
+            pending_orders += entry['pending']
+            if entry['month'] and entry['delivered']:
                 chart_data.append({
                     "name": entry['month'].strftime('%b'),
-                    "sales": entry['total']
+                    "sales": entry['sales']
                 })
 
-        recent_transactions = items.order_by('-id')[:10].values(
+        recent_transactions = list(items.order_by('-id')[:10].values(
             'id', 'product__name', 'price', 'quantity', 'status', 'order__created_at'
-        )
+        ))
 
-        return Response({
+        return {
             "total_sales": total_sales,
             "total_orders": total_orders,
             "pending_orders": pending_orders,
             "chart_data": chart_data,
             "recent_transactions": recent_transactions
+        }
+
+# 4b. VENDOR ANALYTICS (time series for a date window)
+class VendorAnalyticsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        user = request.user
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            return Response({"error": f"granularity must be one of: {', '.join(GRANULARITIES)}"}, status=400)
+
+        try:
+            end = parse_date(request.query_params['to']) if 'to' in request.query_params else timezone.localdate()
+            start = parse_date(request.query_params['from']) if 'from' in request.query_params else end - timedelta(days=30)
+        except ValueError:
+            start = end = None
+        if not start or not end:
+            return Response({"error": "from/to must be dates (YYYY-MM-DD)"}, status=400)
+        if start > end:
+            return Response({"error": "from must be on or before to"}, status=400)
+        if count_buckets(start, end, granularity) > MAX_BUCKETS:
+            return Response({"error": f"Range too large: at most {MAX_BUCKETS} {granularity} points per request"}, status=400)
+
+        if user.is_superuser:
+            daily = VendorDailySales.objects.all()
+        else:
+            daily = VendorDailySales.objects.filter(vendor=user)
+
+        return Response({
+            "from": start,
+            "to": end,
+            "granularity": granularity,
+            "series": sales_series(daily, start, end, granularity),
+        })
+
+# 4c. VENDOR SLA (average time between statuses, from the status events)
+class VendorSLAView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    TRANSITIONS = {
+        'pending_to_shipped': ('PENDING', 'SHIPPED'),
+        'shipped_to_delivered': ('SHIPPED', 'DELIVERED'),
+        'pending_to_delivered': ('PENDING', 'DELIVERED'),
+    }
+
+    def get(self, request):
+        user = request.user
+        try:
+            start, end = parse_date_range(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        # Vendors see their own numbers; the superuser gets one entry per vendor
+        vendor = None if user.is_superuser else user
+        times = {
+            name: transition_times(from_status, to_status, start, end, vendor)
+            for name, (from_status, to_status) in self.TRANSITIONS.items()
+        }
+        empty = {"avg_hours": None, "items": 0}
+
+        if vendor is not None:
+            return Response({
+                "from": start, "to": end,
+                **{name: per_vendor.get(user.id, empty) for name, per_vendor in times.items()},
+            })
+        vendor_ids = sorted({vendor_id for per_vendor in times.values() for vendor_id in per_vendor if vendor_id})
+        return Response({
+            "from": start, "to": end,
+            "vendors": [
+                {"vendor": vendor_id, **{name: per_vendor.get(vendor_id, empty) for name, per_vendor in times.items()}}
+                for vendor_id in vendor_ids
+            ],
         })
 
 # 5. UPDATE STATUS (Order)
@@ -127,29 +328,117 @@ class OrderStatusUpdateView(generics.UpdateAPIView):
         return self.partial_update(request, *args, **kwargs)
 
 # 6. VENDOR ORDER LIST
-class VendorOrderListView(generics.ListAPIView):
+class VendorOrderListView(OrderRangeListMixin, generics.ListAPIView):
     serializer_class = VendorOrderSerializer 
     permission_classes = [permissions.IsAuthenticated]
+    merge_archive = False
 
     def get_queryset(self):
-        user = self.request.user
-        return Order.objects.filter(items__product__seller=user).distinct().order_by('-created_at')
+        # 👇 One index range scan over the vendor's own sub-orders + one prefetch for their lines
+        sub_orders = VendorOrder.objects.filter(vendor=self.request.user)
+        lines = [Prefetch('items', queryset=OrderItem.objects.select_related('product').order_by('id'), to_attr='lines')]
+        if reaches_archive(self.date_range[0]):
+            lines.append(Prefetch(
+                'archived_items', queryset=ArchivedOrderItem.objects.select_related('product').order_by('id'),
+                to_attr='archived_lines',
+            ))
+        else:
+            sub_orders = sub_orders.filter(archived=False)
+        return (
+            self.in_range(sub_orders)
+            .select_related('buyer')
+            .prefetch_related(*lines)
+            .order_by('-created_at', '-id')
+        )
 
 # 7. UPDATE ITEM STATUS
 class OrderItemStatusUpdateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def patch(self, request, pk):
+        if not Order.objects.filter(id=pk).exists():
+            return Response({"error": "Order not found"}, status=404)
+        try:
+            result = update_item_status(request.user, [pk], request.data.get('status'))[pk]
+        except StatusUpdateError as e:
+            return Response({"error": str(e)}, status=400)
+        if result['result'] == 'not_found':
+            return Response({"error": "No items of yours in this order"}, status=404)
+        if result['result'] == 'rejected':
+            return Response({"error": result['error']}, status=status.HTTP_409_CONFLICT)
+        return Response({"message": "Item Status Updated"}, status=200)
+
+# 7b. BULK UPDATE ITEM STATUS (mark a whole dispatch in one call)
+class BulkItemStatusUpdateView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_ORDERS = 500
+
+    def post(self, request):
         user = request.user
-        new_status = request.data.get('status')
+        data = request.data
+
+        # 👇 Either an explicit list of ids, or a filter on the caller's items
+        if 'order_ids' in data:
+            try:
+                order_ids = parse_order_ids(data)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=400)
+        else:
+            sub_orders = VendorOrder.objects.filter(vendor=user, archived=False)
+            if data.get('current_status'):
+                sub_orders = sub_orders.filter(status=data['current_status'])
+            try:
+                start, end = parse_date_range(data)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=400)
+            if start:
+                sub_orders = sub_orders.filter(created_at__date__gte=start)
+            if end:
+                sub_orders = sub_orders.filter(created_at__date__lte=end)
+            order_ids = list(sub_orders.order_by('order_id').values_list('order_id', flat=True)[:self.MAX_ORDERS + 1])
+
+        if not order_ids:
+            return Response({"error": "No matching orders"}, status=404)
+        if len(set(order_ids)) > self.MAX_ORDERS:
+            return Response({"error": f"At most {self.MAX_ORDERS} orders per request"}, status=400)
+
         try:
-            order = Order.objects.get(id=pk)
-            my_items = order.items.filter(product__seller=user)
-            my_items.update(status=new_status)
-            return Response({"message": "Item Status Updated"}, status=200)
-        except Order.DoesNotExist:
+            results = update_item_status(user, order_ids, data.get('status'))
+        except StatusUpdateError as e:
+            return Response({"error": str(e)}, status=400)
+
+        return Response({
+            "status": data.get('status'),
+            "updated": sum(1 for r in results.values() if r['result'] == 'updated'),
+            "results": [{"order_id": order_id, **results[order_id]} for order_id in sorted(results)],
+        })
+
+# 7c. ORDER TIMELINE (every status change, oldest first)
+class OrderTimelineView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        user = request.user
+        # The events outlive archival, so archived orders keep their timeline
+        order = Order.objects.filter(id=pk).first() or ArchivedOrder.objects.filter(id=pk).first()
+        if order is None:
             return Response({"error": "Order not found"}, status=404)
 
+        events = OrderStatusEvent.objects.filter(order_id=order.id)
+        if not user.is_superuser and order.user_id != user.id:
+            # Vendors see the box's master status and their own items
+            if not VendorOrder.objects.filter(order_id=order.id, vendor=user).exists():
+                return Response({"error": "Order not found"}, status=404)
+            events = events.filter(Q(item__isnull=True) | Q(vendor=user))
+
+        # Product names from the order's own items (live or archived)
+        names = dict(order.items.values_list('id', 'product__name'))
+        timeline = list(events.order_by('created_at', 'id').values('item', 'from_status', 'to_status', 'created_at'))
+        for event in timeline:
+            event['product'] = names.get(event['item'])
+
+        return Response({"order_id": order.id, "status": order.status, "events": timeline})
+
 # 8. GENERATE PDF (✅ FIXED COLOR ERROR)
 class GenerateWaybillPDF(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -157,115 +446,89 @@ class GenerateWaybillPDF(APIView):
     def get(self, request, pk):
         try:
             try:
-                order = Order.objects.get(id=pk)
+                order = waybill_queryset(Order.objects).get(id=pk)
             except Order.DoesNotExist:
                 return Response({"error": "Order not found"}, status=404)
 
-            buffer = io.BytesIO()
-            p = canvas.Canvas(buffer, pagesize=letter)
-            width, height = letter
-
-            # --- HEADER ---
-            p.setFont("Helvetica-Bold", 24)
-            # 👇 FIX: Use colors.HexColor instead of setFillColorHex
-            p.setFillColor(colors.HexColor("#8B0000")) 
-            p.drawString(50, height - 50, "BUA Group")
-            
-            p.setFont("Helvetica", 10)
-            p.setFillColor(colors.black)
-            p.drawString(50, height - 65, "Foods & Infrastructure Ltd.")
-            p.drawString(50, height - 78, "Lagos HQ, Nigeria")
-
-            p.setFont("Helvetica-Bold", 16)
-            p.drawRightString(width - 50, height - 50, "OFFICIAL WAYBILL")
-            
-            wb_num = getattr(order, 'waybill_number', None) or f"WB-{order.id}"
-            p.setFont("Helvetica", 12)
-            p.drawRightString(width - 50, height - 70, f"NO: {wb_num}")
-            
-            if hasattr(order, 'created_at') and order.created_at:
-                date_str = order.created_at.strftime('%Y-%m-%d')
-            else:
-                date_str = "N/A"
-            p.drawRightString(width - 50, height - 85, f"DATE: {date_str}")
-
-            p.setStrokeColor(colors.gray)
-            p.line(50, height - 100, width - 50, height - 100)
-
-            # --- CUSTOMER DETAILS ---
-            y = height - 130
-            p.setFont("Helvetica-Bold", 12)
-            p.drawString(50, y, "CONSIGNEE (BUYER):")
-            p.setFont("Helvetica", 12)
-            
-            buyer_obj = getattr(order, 'user', getattr(order, 'buyer', None))
-            if buyer_obj:
-                 buyer_name = getattr(buyer_obj, 'username', 'Valued Customer')
-            else:
-                 buyer_name = "Guest Customer"
-            
-            phone = getattr(order, 'phone', 'N/A') or 'N/A'
-            address = getattr(order, 'address', 'Pickup at Depot') or 'Pickup at Depot'
-
-            p.drawString(50, y - 15, f"Name: {buyer_name}") 
-            p.drawString(50, y - 30, f"Phone: {str(phone)}")
-            p.drawString(50, y - 45, f"Destination: {str(address)}")
-
-            # --- ITEMS TABLE ---
-            y = y - 80
-            # 👇 FIX: Use colors.HexColor here too
-            p.setFillColor(colors.HexColor("#eeeeee")) 
-            p.rect(50, y, width - 100, 20, fill=1, stroke=0)
-            p.setFillColor(colors.black)
-            p.setFont("Helvetica-Bold", 10)
-            p.drawString(60, y + 6, "ITEM DESCRIPTION")
-            p.drawString(300, y + 6, "QTY")
-            p.drawString(350, y + 6, "UNIT PRICE")
-            p.drawString(450, y + 6, "STATUS")
-
-            y = y - 20
-            p.setFont("Helvetica", 10)
-            
-            items_manager = getattr(order, 'items', getattr(order, 'orderitem_set', None))
-            
-            if items_manager:
-                items = items_manager.all()
-                if not items:
-                     p.drawString(60, y, "No Items in Order")
-                for item in items:
-                    product = getattr(item, 'product', None)
-                    p_name = getattr(product, 'name', "Unknown Item") if product else "Unknown Item"
-                    p_status = str(getattr(item, 'status', 'PENDING') or 'PENDING')
-                    p_qty = str(getattr(item, 'quantity', 0))
-                    p_price = getattr(item, 'price', 0)
-
-                    p.drawString(60, y, str(p_name))
-                    p.drawString(300, y, p_qty)
-                    p.drawString(350, y, f"N{p_price:,.2f}")
-                    p.drawString(450, y, p_status)
-                    y -= 20
-            else:
-                p.drawString(60, y, "No Items Found (Database Error)")
-
-            # --- FOOTER ---
-            y -= 20
-            p.line(50, y, width - 50, y)
-            y -= 20
-            p.setFont("Helvetica-Bold", 14)
-            
-            total_val = getattr(order, 'total_price', 0)
-            p.drawRightString(width - 50, y, f"TOTAL VALUE: N{total_val:,.2f}")
-
-            p.setFont("Helvetica-Oblique", 8)
-            p.setFillColor(colors.gray)
-            p.drawCentredString(width / 2, 50, "This is a computer-generated document. No signature required.")
-            p.drawCentredString(width / 2, 40, "Powered by BUA Group Logistics System.")
-
-            p.showPage()
-            p.save()
-            buffer.seek(0)
-            return HttpResponse(buffer, content_type='application/pdf')
-
-        except Exception as e:
-            print(f"❌ PDF GENERATION ERROR: {e}")
-            return Response({"error": f"Server Error: {str(e)}"}, status=500)
\ No newline at end of file
+            # 👇 Reprints are a file read: the PDF is cached on disk under a fingerprint
+            # of everything printed on it, which doubles as a strong ETag.
+            items = list(order.items.all())
+            fingerprint = waybill_fingerprint(order, items)
+            etag = f'"{fingerprint}"'
+
+            # If-None-Match parsed as a list of entity tags (weak comparison, "*")
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                not_modified['ETag'] = etag
+                return not_modified
+
+            # Rendered straight to disk, then streamed to the client in chunks
+            waybill = open_cached_waybill(order.id, fingerprint, order, items)
+            response = FileResponse(waybill, content_type='application/pdf')
+            response['ETag'] = etag
+            return response
+
+        except Exception:
+            logger.exception("Waybill generation failed for order %s", pk)
+            return Response({"error": "Could not generate the waybill"}, status=500)
+
+# 9. BULK WAYBILLS (dispatch-time printing)
+class BulkWaybillView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_ORDERS = 500
+
+    def post(self, request):
+        user = request.user
+        data = request.data
+        output = data.get('format', 'pdf')
+        if output not in ('pdf', 'zip'):
+            return Response({"error": "format must be 'pdf' or 'zip'"}, status=400)
+
+        # Same visibility as the list views: managers see all, vendors their sales, buyers their own
+        if user.is_superuser:
+            orders = Order.objects.all()
+        elif user.is_staff:
+            orders = Order.objects.for_seller(user)
+        else:
+            orders = Order.objects.filter(user=user)
+
+        # 👇 Either an explicit list of ids, or a filter
+        if 'order_ids' in data:
+            try:
+                orders = orders.filter(id__in=parse_order_ids(data))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=400)
+        else:
+            if data.get('status'):
+                orders = orders.filter(status=data['status'])
+            try:
+                start, end = parse_date_range(data)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=400)
+            if start:
+                orders = orders.filter(created_at__date__gte=start)
+            if end:
+                orders = orders.filter(created_at__date__lte=end)
+
+        # Orders, items and products in three queries, however many waybills
+        orders = list(waybill_queryset(orders).order_by('id')[:self.MAX_ORDERS + 1])
+        if not orders:
+            return Response({"error": "No matching orders"}, status=404)
+        if len(orders) > self.MAX_ORDERS:
+            return Response({"error": f"At most {self.MAX_ORDERS} waybills per request"}, status=400)
+
+        try:
+            waybills = bulk_waybill_files(orders)
+            # 👇 Built in a spooled temp file and streamed out in chunks, never held whole in memory
+            out = spooled_file()
+            if output == 'zip':
+                zip_waybills(waybills, out)
+                out.seek(0)
+                return FileResponse(out, content_type='application/zip', as_attachment=True, filename='waybills.zip')
+            merge_pdfs(waybills, out)
+            out.seek(0)
+            return FileResponse(out, content_type='application/pdf', filename='waybills.pdf')
+
+        except Exception:
+            logger.exception("Bulk waybill generation failed")
+            return Response({"error": "Could not generate the waybills"}, status=500)
\ No newline at end of file
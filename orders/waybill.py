@@ -0,0 +1,426 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from django.conf import settings
+from django.db import close_old_connections, connection
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from pypdf import PdfWriter
+
+# Bump when the layout changes so every cached waybill is re-rendered
+LAYOUT_VERSION = 2
+
+# Rendered waybills live here, one folder per order: <dir>/<order id>/<fingerprint>.pdf
+WAYBILL_CACHE_DIR = Path(getattr(settings, 'WAYBILL_CACHE_DIR', settings.BASE_DIR / 'waybill_cache'))
+
+# Processes used for bulk rendering (defaults to one per core)
+WAYBILL_WORKERS = getattr(settings, 'WAYBILL_WORKERS', None) or os.cpu_count() or 1
+
+# Render waybills in the background as soon as items ship (set False to only render on demand)
+WAYBILL_PRERENDER = getattr(settings, 'WAYBILL_PRERENDER', True)
+
+# Bulk PDFs / ZIPs stay in memory up to this size, then spill to a temp file
+SPOOL_MAX_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def waybill_queryset(queryset):
+    """Everything the renderer and the fingerprint read, in a fixed number of queries."""
+    return queryset.select_related('user').prefetch_related('items__product')
+
+
+def waybill_fingerprint(order, items):
+    """
+    Content address of a waybill: changes whenever anything printed on it changes
+    (buyer, address, totals, any item's name / quantity / price / status).
+    """
+    parts = [
+        f"v{LAYOUT_VERSION}",
+        str(order.id),
+        order.created_at.isoformat() if order.created_at else '',
+        getattr(order.user, 'username', '') if order.user_id else '',
+        str(order.phone or ''),
+        str(order.address or ''),
+        str(order.total_price),
+    ]
+    for item in items:
+        parts.append(f"{item.id}|{item.product.name}|{item.quantity}|{item.price}|{item.status}")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+# 👇 LAYOUT ENGINE
+# Item rows run down the page 20pt at a time; when the next row would cross BOTTOM
+# the page is closed and the table continues on a new page under a repeated header.
+PAGE_WIDTH, PAGE_HEIGHT = letter
+ROW_HEIGHT = 20
+BOTTOM = 80                          # keep rows clear of the page footer
+FIRST_PAGE_ROWS_TOP = PAGE_HEIGHT - 230
+NEXT_PAGE_ROWS_TOP = PAGE_HEIGHT - 150
+TOTAL_BLOCK = 40                     # room the closing line + TOTAL VALUE need
+NAME_WIDTH = 230                     # ITEM DESCRIPTION column, before QTY
+
+
+def paginate(items):
+    """Split the item rows into pages; returns a list of per-page item lists."""
+    pages, current, y = [], [], FIRST_PAGE_ROWS_TOP
+    for item in items:
+        if y < BOTTOM:
+            pages.append(current)
+            current, y = [], NEXT_PAGE_ROWS_TOP
+        current.append(item)
+        y -= ROW_HEIGHT
+    pages.append(current)
+
+    # The total goes under the last row; if it does not fit, it gets a page of its own
+    if y - TOTAL_BLOCK < BOTTOM:
+        pages.append([])
+    return pages
+
+
+def _fit(text, font, size, width):
+    if stringWidth(text, font, size) <= width:
+        return text
+    while text and stringWidth(text + "...", font, size) > width:
+        text = text[:-1]
+    return text + "..."
+
+
+def _draw_letterhead(p, order):
+    width, height = letter
+
+    p.setFont("Helvetica-Bold", 24)
+    # 👇 FIX: Use colors.HexColor instead of setFillColorHex
+    p.setFillColor(colors.HexColor("#8B0000"))
+    p.drawString(50, height - 50, "BUA Group")
+
+    p.setFont("Helvetica", 10)
+    p.setFillColor(colors.black)
+    p.drawString(50, height - 65, "Foods & Infrastructure Ltd.")
+    p.drawString(50, height - 78, "Lagos HQ, Nigeria")
+
+    p.setFont("Helvetica-Bold", 16)
+    p.drawRightString(width - 50, height - 50, "OFFICIAL WAYBILL")
+
+    wb_num = getattr(order, 'waybill_number', None) or f"WB-{order.id}"
+    p.setFont("Helvetica", 12)
+    p.drawRightString(width - 50, height - 70, f"NO: {wb_num}")
+
+    if getattr(order, 'created_at', None):
+        date_str = order.created_at.strftime('%Y-%m-%d')
+    else:
+        date_str = "N/A"
+    p.drawRightString(width - 50, height - 85, f"DATE: {date_str}")
+
+    p.setStrokeColor(colors.gray)
+    p.line(50, height - 100, width - 50, height - 100)
+
+
+def _draw_consignee(p, order):
+    y = PAGE_HEIGHT - 130
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(50, y, "CONSIGNEE (BUYER):")
+    p.setFont("Helvetica", 12)
+
+    buyer_obj = getattr(order, 'user', None)
+    if buyer_obj:
+        buyer_name = getattr(buyer_obj, 'username', 'Valued Customer')
+    else:
+        buyer_name = "Guest Customer"
+
+    phone = getattr(order, 'phone', 'N/A') or 'N/A'
+    address = getattr(order, 'address', 'Pickup at Depot') or 'Pickup at Depot'
+
+    p.drawString(50, y - 15, f"Name: {buyer_name}")
+    p.drawString(50, y - 30, f"Phone: {str(phone)}")
+    p.drawString(50, y - 45, _fit(f"Destination: {str(address)}", "Helvetica", 12, PAGE_WIDTH - 100))
+
+
+def _draw_table_header(p, y):
+    # 👇 FIX: Use colors.HexColor here too
+    p.setFillColor(colors.HexColor("#eeeeee"))
+    p.rect(50, y, PAGE_WIDTH - 100, 20, fill=1, stroke=0)
+    p.setFillColor(colors.black)
+    p.setFont("Helvetica-Bold", 10)
+    p.drawString(60, y + 6, "ITEM DESCRIPTION")
+    p.drawString(300, y + 6, "QTY")
+    p.drawString(350, y + 6, "UNIT PRICE")
+    p.drawString(450, y + 6, "STATUS")
+
+
+def _draw_page_footer(p, page_number, page_count):
+    p.setFont("Helvetica-Oblique", 8)
+    p.setFillColor(colors.gray)
+    p.drawCentredString(PAGE_WIDTH / 2, 50, "This is a computer-generated document. No signature required.")
+    p.drawCentredString(PAGE_WIDTH / 2, 40, "Powered by BUA Group Logistics System.")
+    p.drawRightString(PAGE_WIDTH - 50, 40, f"Page {page_number} of {page_count}")
+    p.setFillColor(colors.black)
+
+
+def render_waybill(order, items, out):
+    """Draw the waybill for `order` (as many pages as its items need) into the file object `out`."""
+    # invariant=1: same input -> byte-identical PDF, so the fingerprint is a true strong ETag
+    p = canvas.Canvas(out, pagesize=letter, invariant=1)
+    pages = paginate(items)
+
+    for number, page_items in enumerate(pages, start=1):
+        _draw_letterhead(p, order)
+        if number == 1:
+            _draw_consignee(p, order)
+            header_y = FIRST_PAGE_ROWS_TOP + ROW_HEIGHT
+        else:
+            p.setFont("Helvetica-Oblique", 10)
+            p.drawString(50, PAGE_HEIGHT - 115, f"Continued from page {number - 1}")
+            header_y = NEXT_PAGE_ROWS_TOP + ROW_HEIGHT
+
+        y = header_y - ROW_HEIGHT
+        if page_items or number == 1:
+            _draw_table_header(p, header_y)
+            p.setFont("Helvetica", 10)
+            if not items:
+                p.drawString(60, y, "No Items in Order")
+            for item in page_items:
+                product = getattr(item, 'product', None)
+                p_name = getattr(product, 'name', "Unknown Item") if product else "Unknown Item"
+                p_status = str(getattr(item, 'status', 'PENDING') or 'PENDING')
+                p_qty = str(getattr(item, 'quantity', 0))
+                p_price = getattr(item, 'price', 0)
+
+                p.drawString(60, y, _fit(str(p_name), "Helvetica", 10, NAME_WIDTH))
+                p.drawString(300, y, p_qty)
+                p.drawString(350, y, f"N{p_price:,.2f}")
+                p.drawString(450, y, p_status)
+                y -= ROW_HEIGHT
+
+        # --- TOTAL (last page only) ---
+        if number == len(pages):
+            y -= 20
+            p.line(50, y, PAGE_WIDTH - 50, y)
+            y -= 20
+            p.setFont("Helvetica-Bold", 14)
+            total_val = getattr(order, 'total_price', 0)
+            p.drawRightString(PAGE_WIDTH - 50, y, f"TOTAL VALUE: N{total_val:,.2f}")
+
+        _draw_page_footer(p, number, len(pages))
+        p.showPage()
+
+    p.save()
+
+
+def render_waybill_bytes(order, items):
+    buffer = io.BytesIO()
+    render_waybill(order, items, buffer)
+    return buffer.getvalue()
+
+
+# 👇 DISK CACHE
+def cached_waybill_path(order_id, fingerprint):
+    return WAYBILL_CACHE_DIR / str(order_id) / f"{fingerprint}.pdf"
+
+
+def write_waybill(order_id, fingerprint, order, items):
+    """Render straight into the cache (atomically), then drop older versions of the same order's waybill."""
+    path = cached_waybill_path(order_id, fingerprint)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            render_waybill(order, items, f)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+    for old in path.parent.glob('*.pdf'):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return path
+
+
+def open_cached_waybill(order_id, fingerprint, order, items):
+    """
+    Open the cached waybill for reading, rendering it only on a cache miss.
+
+    Callers get an open file rather than a path: a newer version of the waybill or
+    invalidate_waybill() may unlink the file at any moment, and an open file stays
+    readable after that.
+    """
+    path = cached_waybill_path(order_id, fingerprint)
+    for _ in range(2):
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            write_waybill(order_id, fingerprint, order, items)
+    # Unlinked again straight after rendering (the order keeps changing): serve a one-off copy
+    return io.BytesIO(render_waybill_bytes(order, items))
+
+
+def invalidate_waybill(order_id):
+    """Forget every cached version of an order's waybill."""
+    folder = WAYBILL_CACHE_DIR / str(order_id)
+    for old in folder.glob('*.pdf'):
+        old.unlink(missing_ok=True)
+
+
+# 👇 BULK RENDERING
+def snapshot(order, items):
+    """
+    Plain, picklable copy of what the renderer reads, so pages can be drawn in
+    worker processes without touching the ORM or the database connection.
+    """
+    buyer = SimpleNamespace(username=order.user.username) if order.user_id else None
+    order_data = SimpleNamespace(
+        id=order.id, created_at=order.created_at, user=buyer,
+        phone=order.phone, address=order.address, total_price=order.total_price,
+    )
+    items_data = [
+        SimpleNamespace(
+            id=item.id, product=SimpleNamespace(name=item.product.name),
+            quantity=item.quantity, price=item.price, status=item.status,
+        )
+        for item in items
+    ]
+    return order_data, items_data
+
+
+def _render_job(job):
+    # Workers write the PDF into the cache themselves and only send the path back
+    order_id, fingerprint, (order, items) = job
+    return write_waybill(order_id, fingerprint, order, items)
+
+
+def _render_to_bytes(waybill):
+    return render_waybill_bytes(*waybill)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Workers start from a clean process, never a fork of this one: a fork copies the
+# locks held by this process's other threads (prerender, typeahead reloads) and can
+# leave a child waiting on one forever
+_MP_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+
+def _get_pool():
+    # One long-lived pool per server process; forking a new one per request costs more than it saves
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WAYBILL_WORKERS, mp_context=_MP_CONTEXT)
+        return _pool
+
+
+def _run(func, jobs, workers=None):
+    workers = workers or WAYBILL_WORKERS
+    if workers == 1 or len(jobs) < 2:
+        return [func(job) for job in jobs]
+    if workers == WAYBILL_WORKERS:
+        pool = _get_pool()
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=_MP_CONTEXT)
+    chunksize = max(1, len(jobs) // (workers * 4))
+    try:
+        return list(pool.map(func, jobs, chunksize=chunksize))
+    finally:
+        if pool is not _pool:
+            pool.shutdown()
+
+
+def render_many(waybills, workers=None):
+    """Render a list of (order, items) snapshots to PDF bytes, in parallel when it is worth it."""
+    return _run(_render_to_bytes, waybills, workers)
+
+
+def bulk_waybill_files(orders):
+    """
+    Return [(order_id, fingerprint, snapshot)] for the given orders (items + products
+    prefetched), after rendering the cache misses across the process pool.
+    merge_pdfs() and zip_waybills() open them through open_cached_waybill().
+    """
+    waybills = []
+    for order in orders:
+        items = list(order.items.all())
+        waybills.append((order.id, waybill_fingerprint(order, items), snapshot(order, items)))
+
+    misses = [job for job in waybills if not cached_waybill_path(job[0], job[1]).exists()]
+    _run(_render_job, misses)
+    return waybills
+
+
+def spooled_file():
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+
+def merge_pdfs(waybills, out):
+    # The sources stay open until the merged file is written: pages are copied lazily
+    with ExitStack() as stack:
+        writer = PdfWriter()
+        for order_id, fingerprint, (order, items) in waybills:
+            writer.append(stack.enter_context(open_cached_waybill(order_id, fingerprint, order, items)))
+        writer.write(out)
+
+
+def zip_waybills(waybills, out):
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for order_id, fingerprint, (order, items) in waybills:
+            with open_cached_waybill(order_id, fingerprint, order, items) as pdf:
+                with archive.open(f"WB-{order_id}.pdf", 'w') as entry:
+                    shutil.copyfileobj(pdf, entry)
+
+
+# 👇 BACKGROUND PRE-RENDERING
+# A single in-process worker thread: no broker, nothing extra to deploy. If the
+# process dies before the job runs, print-waybill simply renders on demand.
+_prerender_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='waybill-prerender')
+_queued = set()
+_queued_lock = threading.Lock()
+
+
+def prerender_waybill(order_id):
+    """Load the order and make sure its current waybill is in the disk cache."""
+    from .models import Order
+
+    # Off the queue before reading the order: a change that lands while this render
+    # runs queues a fresh one instead of being swallowed by this (already stale) one
+    with _queued_lock:
+        _queued.discard(order_id)
+
+    close_old_connections()
+    try:
+        order = waybill_queryset(Order.objects).get(id=order_id)
+        items = list(order.items.all())
+        fingerprint = waybill_fingerprint(order, items)
+        if not cached_waybill_path(order_id, fingerprint).exists():
+            write_waybill(order_id, fingerprint, order, items)
+    except Order.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception("Background waybill render failed for order %s", order_id)
+    finally:
+        connection.close()
+
+
+def schedule_prerender(order_id):
+    """Queue a background render (once per order, however many times it is asked for)."""
+    if not WAYBILL_PRERENDER:
+        return
+    with _queued_lock:
+        if order_id in _queued:
+            return
+        _queued.add(order_id)
+    _prerender_executor.submit(prerender_waybill, order_id)
\ No newline at end of file